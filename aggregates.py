@@ -0,0 +1,199 @@
+"""
+Aggregate statistics of every indicator over a selection of SPORES, shown
+in the "Selection" tab.
+
+Selections of up to ``exact_limit`` SPORES are gathered into one block of
+rows, from which all statistics are computed at once. Larger selections,
+up to all SPORES, are never copied: the count, minimum, maximum and mean
+are accumulated over chunks of rows, and the quantiles are read from a
+sorted order of each column, built once per version of the data or taken
+from the range index, by counting the selected rows in it. Both give the
+same results as ``np.nanquantile``. The columns are read where they are,
+e.g. in the memory map of the data, rather than copied.
+
+"""
+
+import html
+import threading
+import warnings
+
+import numpy as np
+
+QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+# Rows of the array returned by SelectionStats.compute
+STATISTICS = ["count", "min", *(f"q{q:g}" for q in QUANTILES), "max", "mean"]
+LABELS = ["SPORES", "Min", "5%", "25%", "Median", "75%", "95%", "Max", "Mean"]
+
+TABLE_HEAD = (
+    '<table border="1" class="dataframe">\n'
+    "  <thead>\n"
+    '    <tr style="text-align: right;">\n'
+    "      <th></th>\n"
+    "      <th>Unit</th>\n"
+    "{}"
+    "    </tr>\n"
+    "  </thead>\n"
+    "  <tbody>\n"
+)
+TABLE_TAIL = "  </tbody>\n</table>"
+
+
+class SelectionStats:
+    """
+    Statistics of ``columns`` of ``df_spores`` over any selection of its
+    rows. Selections larger than ``exact_limit`` rows are aggregated in
+    chunks of ``chunk_size`` rows.
+
+    The sorted orders that large selections need are taken from ``index``,
+    a ``filtering.ColumnRangeIndex``, for the columns it covers. Those of
+    the other columns are built right away, unless ``lazy`` is given, in
+    which case they are built on first use.
+
+    """
+
+    def __init__(
+        self,
+        df_spores,
+        columns,
+        index=None,
+        exact_limit=100000,
+        chunk_size=65536,
+        lazy=False,
+    ):
+        self.columns = list(columns)
+        # Views of the columns where they can be, not copies
+        self.values = [
+            df_spores[col].to_numpy(dtype=np.float64, copy=False)
+            for col in self.columns
+        ]
+        self.n_rows = len(df_spores)
+        self.exact_limit = exact_limit
+        self.chunk_size = chunk_size
+        self._orders = [None] * len(self.columns)
+        if index is not None:
+            for j, col in enumerate(self.columns):
+                if col in index.columns:
+                    self._orders[j] = index.order(col)
+        self._lock = threading.Lock()
+        if not lazy and len(self) > exact_limit:
+            for j in range(len(self.columns)):
+                self.order(j)
+
+    def __len__(self):
+        return self.n_rows
+
+    def order(self, j):
+        """Row positions of column ``j`` in ascending order, NaNs last."""
+        with self._lock:
+            if self._orders[j] is None:
+                dtype = np.min_scalar_type(max(len(self) - 1, 0))
+                self._orders[j] = np.argsort(self.values[j]).astype(dtype)
+            return self._orders[j]
+
+    def _rows(self, positions):
+        # The values at ``positions`` as one row each
+        return np.column_stack([values[positions] for values in self.values])
+
+    def compute(self, positions):
+        """
+        Statistics over the rows at the sorted, unique ``positions``, as an
+        array with one row per entry of ``STATISTICS`` and one column per
+        column. Statistics of columns without values are NaN.
+
+        """
+        positions = np.asarray(positions, dtype=np.intp)
+        if len(positions) == 0:
+            stats = np.full((len(STATISTICS), len(self.columns)), np.nan)
+            stats[0] = 0
+            return stats
+        if len(positions) <= self.exact_limit:
+            return self._compute_block(self._rows(positions))
+        return self._compute_large(positions)
+
+    def _compute_block(self, block):
+        count = (~np.isnan(block)).sum(axis=0)
+        with warnings.catch_warnings():
+            # Columns without values
+            warnings.simplefilter("ignore", RuntimeWarning)
+            return np.vstack(
+                [
+                    count,
+                    np.nanmin(block, axis=0),
+                    np.nanquantile(block, QUANTILES, axis=0),
+                    np.nanmax(block, axis=0),
+                    np.nanmean(block, axis=0),
+                ]
+            )
+
+    def _compute_large(self, positions):
+        n_cols = len(self.columns)
+        count = np.zeros(n_cols, dtype=np.int64)
+        total = np.zeros(n_cols)
+        low = np.full(n_cols, np.inf)
+        high = np.full(n_cols, -np.inf)
+        for start in range(0, len(positions), self.chunk_size):
+            chunk = self._rows(positions[start : start + self.chunk_size])
+            valid = ~np.isnan(chunk)
+            count += valid.sum(axis=0)
+            total += np.where(valid, chunk, 0).sum(axis=0)
+            low = np.minimum(low, np.where(valid, chunk, np.inf).min(axis=0))
+            high = np.maximum(high, np.where(valid, chunk, -np.inf).max(axis=0))
+
+        selected = np.zeros(len(self), dtype=bool)
+        selected[positions] = True
+        quantiles = np.full((len(QUANTILES), n_cols), np.nan)
+        for j in range(n_cols):
+            if count[j]:
+                order = self.order(j)
+                quantiles[:, j] = self._quantiles(selected[order], order, j, count[j])
+
+        empty = count == 0
+        low[empty] = high[empty] = np.nan
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = total / count
+        return np.vstack([count, low, quantiles, high, mean])
+
+    def _quantiles(self, selected, order, j, count):
+        # Same linear interpolation between the closest ranks as np.quantile.
+        # NaNs are sorted last, so the first ``count`` selected rows in
+        # ``order`` hold the values of the column in ascending order
+        h = (count - 1) * np.asarray(QUANTILES)
+        ranks = np.unique(np.concatenate([np.floor(h), np.ceil(h)]).astype(np.int64))
+        # Rows selected up to the start of each chunk of the order, so that
+        # only the chunks holding the ranks are searched
+        starts = np.arange(0, len(selected), self.chunk_size)
+        before = np.concatenate(
+            [[0], np.cumsum(np.add.reduceat(selected, starts, dtype=np.int64))]
+        )
+        values = {}
+        for rank in ranks:
+            c = np.searchsorted(before, rank, side="right") - 1
+            chunk = selected[starts[c] : starts[c] + self.chunk_size]
+            offset = np.flatnonzero(chunk)[rank - before[c]]
+            values[rank] = self.values[j][order[starts[c] + offset]]
+        low = np.array([values[r] for r in np.floor(h).astype(np.int64)])
+        high = np.array([values[r] for r in np.ceil(h).astype(np.int64)])
+        return low + (h - np.floor(h)) * (high - low)
+
+
+def render(rows, stats):
+    """
+    Render the table of ``stats``, as returned by ``SelectionStats.compute``,
+    for ``rows``, the ``(column, unit)`` of each of its columns.
+
+    """
+    head = TABLE_HEAD.format("".join(f"      <th>{label}</th>\n" for label in LABELS))
+    body = []
+    for (col, unit), column_stats in zip(rows, stats.T):
+        if not column_stats[0]:
+            continue
+        cells = [f"{int(column_stats[0])}"]
+        cells += ["{:.2f}".format(value) for value in column_stats[1:]]
+        body.append(
+            "    <tr>\n"
+            f"      <th>{html.escape(str(col))}</th>\n"
+            f"      <td>{html.escape(str(unit))}</td>\n"
+            + "".join(f"      <td>{cell}</td>\n" for cell in cells)
+            + "    </tr>\n"
+        )
+    return head + "".join(body) + TABLE_TAIL
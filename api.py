@@ -0,0 +1,228 @@
+"""
+JSON API over the SPORES dataset, for automated studies that need to
+evaluate many indicator range combinations at once.
+
+``POST /api/filter`` with a body like::
+
+    {
+        "queries": [
+            {"storage": [0, 0.5], "Curtailment": [0.1, 0.3]},
+            {"transport": [0.9, 1]}
+        ],
+        "result": "ids",
+        "format": "json"
+    }
+
+Each query maps indicators, by slider id or column name, to inclusive
+``[low, high]`` ranges; indicators not given are unrestricted. ``result`` is
+``"ids"`` (default) for the matching SPORE ids of each query, or ``"counts"``
+for their numbers only. ``format`` is ``"json"`` (default) or ``"arrow"``
+for an Arrow IPC stream with one row per query and match (or per query for
+counts), which is better suited for large results.
+
+``POST /api/similar`` finds the nearest SPORES in the space of the
+indicators for a batch of SPORES at once::
+
+    {"ids": [12, 345], "k": 10, "filter": {"storage": [0, 0.5]}}
+
+The optional ``filter``, given like one of the queries above, restricts the
+neighbours to the SPORES within its ranges. The ``neighbours`` and their
+``distances`` are returned in the order of ``ids``, nearest first.
+
+"""
+
+import os
+
+import flask
+import numpy as np
+
+MAX_QUERIES = int(os.environ.get("API_MAX_QUERIES", 10000))
+MAX_RESULT_IDS = int(os.environ.get("API_MAX_RESULT_IDS", 10_000_000))
+MAX_NEIGHBOURS = int(os.environ.get("API_MAX_NEIGHBOURS", 1000))
+
+# Upper bound on the number of elements in one (queries, rows) block of the
+# evaluation, to bound memory use for large batches
+BLOCK_ELEMENTS = 2**24
+
+ARROW_MIMETYPE = "application/vnd.apache.arrow.stream"
+
+
+class APIError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def parse_queries(queries, cols):
+    """
+    Lower and upper bounds with shape ``(n_queries, n_columns)`` for the
+    ``queries`` from a request, given ``cols`` as in ``app.COLS``.
+
+    """
+    if not isinstance(queries, list) or not queries:
+        raise APIError("'queries' must be a non-empty list")
+    if len(queries) > MAX_QUERIES:
+        raise APIError(f"At most {MAX_QUERIES} queries are allowed per request", 413)
+
+    columns = [v["col"] for v in cols.values()]
+    aliases = {k: v["col"] for k, v in cols.items()}
+    aliases.update({col: col for col in columns})
+
+    lower = np.full((len(queries), len(columns)), -np.inf)
+    upper = np.full((len(queries), len(columns)), np.inf)
+    for i, query in enumerate(queries):
+        if not isinstance(query, dict):
+            raise APIError(f"Query {i} must be an object")
+        for key, range_ in query.items():
+            if key not in aliases:
+                raise APIError(f"Unknown indicator {key!r} in query {i}")
+            try:
+                low, high = (float(x) for x in range_)
+            except (TypeError, ValueError):
+                raise APIError(f"Range for {key!r} in query {i} must be [low, high]")
+            j = columns.index(aliases[key])
+            lower[i, j], upper[i, j] = low, high
+
+    return columns, lower, upper
+
+
+def evaluate(values, lower, upper):
+    """
+    Boolean matches of shape ``(n_queries, n_rows)`` for all queries at once,
+    given the indicator ``values`` as a list of one array per column, yielded
+    in blocks of consecutive queries as ``(first_query, matches)``.
+
+    """
+    n_rows = len(values[0]) if values else 0
+    block = max(1, BLOCK_ELEMENTS // max(n_rows, 1))
+    for start in range(0, len(lower), block):
+        lo, hi = lower[start : start + block], upper[start : start + block]
+        matches = np.ones((len(lo), n_rows), dtype=bool)
+        for j, col in enumerate(values):
+            matches &= col[np.newaxis, :] >= lo[:, j, np.newaxis]
+            matches &= col[np.newaxis, :] <= hi[:, j, np.newaxis]
+        yield start, matches
+
+
+def arrow_response(columns):
+    import pyarrow as pa
+
+    table = pa.table(columns)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return flask.Response(sink.getvalue().to_pybytes(), mimetype=ARROW_MIMETYPE)
+
+
+def create_blueprint(registry, cols):
+    """
+    API blueprint serving the current data from the ``dataset.DatasetRegistry``
+    ``registry``, with the indicators in ``cols`` as in ``app.COLS``.
+
+    """
+    blueprint = flask.Blueprint("api", __name__, url_prefix="/api")
+
+    @blueprint.errorhandler(APIError)
+    def handle_api_error(e):
+        return flask.jsonify(error=e.message), e.status
+
+    @blueprint.route("/filter", methods=["POST"])
+    def filter_spores():
+        body = flask.request.get_json(silent=True)
+        if not isinstance(body, dict):
+            raise APIError("Request body must be a JSON object")
+        result = body.get("result", "ids")
+        output_format = body.get("format", "json")
+        if result not in ("ids", "counts"):
+            raise APIError("'result' must be 'ids' or 'counts'")
+        if output_format not in ("json", "arrow"):
+            raise APIError("'format' must be 'json' or 'arrow'")
+
+        data = registry.current
+        columns, lower, upper = parse_queries(body.get("queries"), cols)
+        values = [data.df_spores[col].to_numpy() for col in columns]
+        ids = data.df_spores.index.to_numpy()
+
+        if result == "counts":
+            counts = np.concatenate(
+                [matches.sum(axis=1) for _, matches in evaluate(values, lower, upper)]
+            )
+            if output_format == "arrow":
+                return arrow_response(
+                    {"query": np.arange(len(counts), dtype=np.int32), "count": counts}
+                )
+            return flask.jsonify(version=data.version, counts=counts.tolist())
+
+        query_idx, id_values = [], []
+        n_ids = 0
+        for start, matches in evaluate(values, lower, upper):
+            q, rows = np.nonzero(matches)
+            n_ids += len(rows)
+            if n_ids > MAX_RESULT_IDS:
+                raise APIError(
+                    f"Result exceeds {MAX_RESULT_IDS} ids;"
+                    " narrow down the queries or request counts instead",
+                    413,
+                )
+            query_idx.append(q.astype(np.int32) + start)
+            id_values.append(ids[rows])
+        query_idx = np.concatenate(query_idx)
+        id_values = np.concatenate(id_values)
+
+        if output_format == "arrow":
+            return arrow_response({"query": query_idx, "id": id_values})
+        # Matches come out sorted by query, so split them at query boundaries
+        bounds = np.searchsorted(query_idx, np.arange(1, len(lower)))
+        return flask.jsonify(
+            version=data.version,
+            ids=[chunk.tolist() for chunk in np.split(id_values, bounds)],
+        )
+
+    @blueprint.route("/similar", methods=["POST"])
+    def similar_spores():
+        body = flask.request.get_json(silent=True)
+        if not isinstance(body, dict):
+            raise APIError("Request body must be a JSON object")
+        ids = body.get("ids")
+        k = body.get("k", 10)
+        if not isinstance(ids, list) or not ids:
+            raise APIError("'ids' must be a non-empty list")
+        if len(ids) > MAX_QUERIES:
+            raise APIError(f"At most {MAX_QUERIES} ids are allowed per request", 413)
+        if not isinstance(k, int) or not 0 < k <= MAX_NEIGHBOURS:
+            raise APIError(f"'k' must be an integer from 1 to {MAX_NEIGHBOURS}")
+        if len(ids) * k > MAX_RESULT_IDS:
+            raise APIError(f"Result exceeds {MAX_RESULT_IDS} ids", 413)
+
+        data = registry.current
+        index = data.df_spores.index
+        positions = index.get_indexer(ids)
+        if (positions == -1).any():
+            unknown = [i for i, pos in zip(ids, positions) if pos == -1]
+            raise APIError(f"Unknown SPORE ids: {unknown[:10]}")
+
+        allowed = None
+        if body.get("filter") is not None:
+            columns, lower, upper = parse_queries([body["filter"]], cols)
+            ranges = {
+                col: [lower[0, j], upper[0, j]]
+                for j, col in enumerate(columns)
+                if np.isfinite(lower[0, j]) or np.isfinite(upper[0, j])
+            }
+            allowed = data.index.positions(ranges)
+
+        neighbours, distances = data.similarity.neighbours(positions, k, allowed)
+        found = neighbours != -1
+        neighbour_ids = index.to_numpy()[np.where(found, neighbours, 0)]
+        return flask.jsonify(
+            version=data.version,
+            neighbours=[
+                row[mask].tolist() for row, mask in zip(neighbour_ids, found)
+            ],
+            distances=[
+                row[mask].round(6).tolist() for row, mask in zip(distances, found)
+            ],
+        )
+
+    return blueprint
@@ -4,18 +4,32 @@ import dash_dangerously_set_inner_html
 import flask
 import numpy as np
 import pandas as pd
-import plotly.express as px
-from dash import Dash, Input, Output, dcc, html
+from dash import ALL, ClientsideFunction, Dash, Input, Output, Patch, State, dcc, html
 from dash.exceptions import PreventUpdate
+import hashlib
 import json
-
+import os
+
+import aggregates
+import api
+import caching
+import coalescing
+import compression
+import dataset
+import dimensions
+import export
+import filtering
+import images
+import layout_cache
+import metrics
+import pareto
+import payload
+import similarity
+import startup
+import summary
 import url_helpers
 
-
-df_spores = pd.read_csv("./data/data.csv", index_col=0)
-# The dummy column is used to make space for the "rest axes" button
-df_spores["dummy"] = 0
-df_units = pd.read_csv("./data/units.csv", index_col=0)
+DATA_DIR = "./data"
 
 try:
     with open("./external_scripts.json", "r") as f:
@@ -23,85 +37,107 @@ try:
 except FileNotFoundError:
     EXTERNAL_SCRIPTS = {}
 
-COLS = {
-    "storage": dict(
-        label="Storage capacity",
-        col="Storage discharge capacity",
-        help_text="Total capacity of all storage technologies to discharge energy in any given hour,"
-        " including low temperature heat,hydrogen and electricity. Scaled relative to its maximum value"
-        "(range 0.08 – 11 TW)",
-    ),
-    "curtailment": dict(
-        label="Curtailment",
-        col="Curtailment",
-        help_text="Percentage of maximum available renewable electricity production"
-        " from wind and solar photovoltaic technologies that is curtailed"
-        " Scaled relative to its maximum value (range 0.1 – 6 %)",
-    ),
-    "biofuel": dict(
-        label="Biofuel utilisation",
-        col="Biofuel utilisation",
-        help_text="Percentage of available residual biofuels that are consumed",
-    ),
-    "import": dict(
-        label="National import",
-        col="Average national import",
-        help_text="Average annual import of electricity across all countries in the study area."
-        " Scaled relative to its maximum value (range 4 – 73 TWh)",
-    ),
-    "elec-gini": dict(
-        label="Electricity gini",
-        col="Electricity production Gini coefficient",
-        help_text="Degree of inequality of spatial distribution of electricity across all model regions,"
-        " measured by the Gini coefficient of regional electricity production."
-        " Scaled relative to its maximum value (range 0.53 – 0.74)",
-    ),
-    "fuel-gini": dict(
-        label="Fuel autarky",
-        col="Fuel autarky Gini coefficient",
-        help_text="Degree of inequality of spatial distribution of industry"
-        " synthetic fuel production relative to industry fuel demand across all model regions,"
-        " measured by the Gini coefficient of regional over-production."
-        " Scaled relative to its maximum value (range 0.63 – 0.93)",
-    ),
-    "ev": dict(
-        label="EV as flexibility",
-        col="EV as flexibility",
-        help_text="Pearson correlation between timeseries of electric vehicle"
-        " charging against that of primary electricity supply."
-        " Scaled relative to its maximum value (range 0.52 – 0.92)",
-    ),
-    "heat": dict(
-        label="Heat electr.",
-        col="Heat electrification",
-        help_text="Percentage of heat demand met by electricity-consuming, heat-producing technologies",
-    ),
-    "transport": dict(
-        label="Transport electr.",
-        col="Transport electrification",
-        help_text="Percentage of road passenger and freight transport demand met by electric vehicles",
-    ),
-}
+# The indicators that SPORES are filtered by, in the order of their sliders,
+# from the units of the data and dimensions.json (see dimensions.py)
+COLS = dimensions.load(DATA_DIR)
 
 COL_NAMES = [v["col"] for k, v in COLS.items()]
 
-SLIDER_DEFAULTS = {
-    col: [df_spores[col].min(), df_spores[col].max()] for col in COL_NAMES
+# Columns shown as rows of the scatter plot, in the order of its traces
+TRACE_COLUMNS = ["dummy"] + COL_NAMES
+
+SLIDER_STEP = 0.01
+
+# Filter and draw the scatter plot in the browser rather than on the server
+CLIENTSIDE_FILTERING = os.environ.get("CLIENTSIDE_FILTERING", "0") == "1"
+
+# Start workers quickly: state that is slow to compute, such as the figure
+# template and page layout, is read from the artifact written by startup.py
+# (or by the first start), and slow parts of the data preparation are
+# deferred until they are first needed
+FAST_START = os.environ.get("FAST_START", "0") == "1"
+STARTUP_ARTIFACT = os.environ.get("STARTUP_ARTIFACT", "./cache/startup.json")
+
+# Above these numbers of filtered SPORES, the scatter plot is drawn with WebGL,
+# and then as binned densities for each indicator rather than individual points
+FIGURE_WEBGL_THRESHOLD = int(os.environ.get("FIGURE_WEBGL_THRESHOLD", 20000))
+FIGURE_DENSITY_THRESHOLD = int(os.environ.get("FIGURE_DENSITY_THRESHOLD", 200000))
+FIGURE_DENSITY_BINS = int(os.environ.get("FIGURE_DENSITY_BINS", 100))
+# Decimals sent of the indicator values in the scatter plot, which are scaled
+# to 0–1, so that the default is finer than a pixel of the plot
+FIGURE_DECIMALS = int(os.environ.get("FIGURE_DECIMALS", 4))
+
+# Number of rendered summary tables kept in memory by each worker
+SUMMARY_CACHE_SIZE = int(os.environ.get("SUMMARY_CACHE_SIZE", 1024))
+
+# Number of page layouts for distinct URL states kept in memory by each worker
+LAYOUT_CACHE_SIZE = int(os.environ.get("LAYOUT_CACHE_SIZE", 256))
+
+# Bins of the histogram shown above each slider
+HISTOGRAM_BINS = int(os.environ.get("HISTOGRAM_BINS", 20))
+# Number of sessions whose histogram state is kept in memory by each worker,
+# and the memory it may take in total, as it grows with the number of SPORES;
+# a session whose state was dropped or is held by another worker starts over
+HISTOGRAM_SESSIONS = int(os.environ.get("HISTOGRAM_SESSIONS", 64))
+HISTOGRAM_SESSIONS_MAX_BYTES = int(
+    os.environ.get("HISTOGRAM_SESSIONS_MAX_BYTES", 64 * 1024**2)
+)
+
+# Selections of SPORES up to this size are aggregated in one block of rows;
+# larger ones in chunks, with quantiles from presorted columns
+SELECTION_EXACT_LIMIT = int(os.environ.get("SELECTION_EXACT_LIMIT", 100000))
+
+# Number of similar SPORES listed for the selected one
+SIMILAR_COUNT = int(os.environ.get("SIMILAR_COUNT", 10))
+# Weights of the indicators in the distance between SPORES, given as e.g.
+# "storage=2,import=0.5" with the keys of COLS; all others have weight 1
+SIMILARITY_WEIGHTS = dict(
+    (key.strip(), float(weight))
+    for key, weight in (
+        item.split("=")
+        for item in os.environ.get("SIMILARITY_WEIGHTS", "").split(",")
+        if item.strip()
+    )
+)
+
+# Variants of the overview images built by images.py, served with hashed
+# names from IMAGE_URL_PREFIX
+IMAGE_URL_PREFIX = "img/"
+IMAGE_MAX_AGE = 365 * 24 * 3600
+# The overview image fills the results column, 8 of 12 columns from "md" up
+OVERVIEW_IMAGE_SIZES = "(min-width: 768px) 66vw, 100vw"
+image_manifest = images.Manifest()
+
+# Limits on prefetching the overview images of hovered and nearby SPORES in
+# the browser (see assets/prefetch.js)
+IMAGE_PREFETCH = {
+    # SPORES next to the hovered one in the plot
+    "neighbours": int(os.environ.get("IMAGE_PREFETCH_NEIGHBOURS", 4)),
+    "max_concurrent": int(os.environ.get("IMAGE_PREFETCH_CONCURRENCY", 2)),
+    # Images waiting to be prefetched; older ones are dropped first
+    "max_queue": int(os.environ.get("IMAGE_PREFETCH_QUEUE", 8)),
+    # Total per page load
+    "max_bytes": int(os.environ.get("IMAGE_PREFETCH_MAX_BYTES", 20 * 1024**2)),
 }
+IMAGE_SOURCES_MAX_IDS = 32
 
-SLIDER_DEFAULTS_LIST = [v for k, v in SLIDER_DEFAULTS.items()]
+figure_cache = caching.SharedLRUCache(
+    os.environ.get("FIGURE_CACHE_PATH", "./cache/figures.sqlite"),
+    max_bytes=int(os.environ.get("FIGURE_CACHE_MAX_BYTES", 64 * 1024**2)),
+)
 
+# Drops filter requests from a browser session once a newer one has arrived,
+# optionally waiting FILTER_DEBOUNCE seconds for one to arrive first
+request_tracker = coalescing.RequestTracker(
+    os.environ.get("REQUEST_TRACKER_PATH", "./cache/requests.sqlite"),
+    debounce=float(os.environ.get("FILTER_DEBOUNCE", 0)),
+)
+
+# Components whose state is kept in the URL. The sliders have pattern-matching
+# ids, which are keyed here as in url_helpers.component_key
 COMPONENT_IDS = {
     "spore-id": ["data"],
-    "slider-storage": ["value"],
-    "slider-curtailment": ["value"],
-    "slider-biofuel": ["value"],
-    "slider-import": ["value"],
-    "slider-elec-gini": ["value"],
-    "slider-fuel-gini": ["value"],
-    "slider-ev": ["value"],
-    "slider-heat": ["value"],
-    "slider-transport": ["value"],
+    **{f"slider-{id_}": ["value"] for id_ in COLS},
 }
 
 server = flask.Flask(__name__)
@@ -120,6 +156,10 @@ app = Dash(
     title=TITLE,
 )
 
+metrics.instrument(app)
+# Registered after the metrics, so that the sizes they record are those sent
+compression.instrument(app)
+
 
 url_bar_and_content_div = html.Div(
     [dcc.Location(id="url", refresh=False), html.Div(id="page-layout")]
@@ -148,35 +188,45 @@ navbar = dbc.NavbarSimple(
 )
 
 
-def row_label_from_id(params, id_, default_marks=False):
+def row_label_from_id(params, id_, slider_defaults, default_marks=False):
     return row_label(
         params=params,
         label=COLS[id_]["label"],
-        id=f"slider-{id_}",
-        col=COLS[id_]["col"],
+        id={"type": "slider", "index": id_},
+        histogram_id={"type": "histogram", "index": id_},
         help_text=COLS[id_]["help_text"],
+        default_value=slider_defaults[COLS[id_]["col"]],
+        color=COLS[id_]["color"],
         default_marks=default_marks,
     )
 
 
-def row_label(params, label, id, col, help_text, default_marks=False):
+def row_label(
+    params,
+    label,
+    id,
+    histogram_id,
+    help_text,
+    default_value,
+    color,
+    default_marks=False,
+):
     if default_marks:
         kwargs = {}
     else:
         kwargs = {"marks": {0: "", 0.2: "", 0.4: "", 0.6: "", 0.8: "", 1: ""}}
 
-    min_, max_ = df_spores[col].min(), df_spores[col].max()
     return dbc.Row(
         [
             dbc.Col(
                 [
                     dbc.Label(
                         [f"{label} ", html.I(className="bi-question-circle")],
-                        id=f"tgt-{id}",
+                        id=f"tgt-{url_helpers.component_key(id)}",
                     ),
                     dbc.Popover(
                         dbc.PopoverBody(help_text),
-                        target=f"tgt-{id}",
+                        target=f"tgt-{url_helpers.component_key(id)}",
                         trigger="hover",
                     ),
                 ],
@@ -184,22 +234,33 @@ def row_label(params, label, id, col, help_text, default_marks=False):
                 class_name="slider-label",
             ),
             dbc.Col(
-                url_helpers.apply_default_value(params)(dcc.RangeSlider)(
-                    min=0,
-                    max=1,
-                    value=[min_, max_],
-                    id=id,
-                    className="slider",
-                    **kwargs,
-                ),
+                [
+                    dcc.Graph(
+                        id=histogram_id,
+                        figure=HISTOGRAM_FIGURE,
+                        config={"staticPlot": True},
+                        className="slider-histogram",
+                    ),
+                    url_helpers.apply_default_value(params)(dcc.RangeSlider)(
+                        min=0,
+                        max=1,
+                        step=SLIDER_STEP,
+                        value=list(default_value),
+                        id=id,
+                        className="slider",
+                        **kwargs,
+                    ),
+                ],
                 class_name="slider-col",
+                # Picked up by the slider styles in styles.css
+                style={"--slider-color": color},
             ),
         ],
         class_name="slider-group",
     )
 
 
-def controls(params):
+def controls(params, slider_defaults):
     return html.Div(
         [
             dbc.Row(
@@ -217,22 +278,56 @@ def controls(params):
                             id="reset-spore",
                             outline=True,
                         ),
+                        dbc.DropdownMenu(
+                            [
+                                dbc.DropdownMenuItem(
+                                    "CSV",
+                                    id="export-csv",
+                                    href=app.get_relative_path("/export.csv"),
+                                    external_link=True,
+                                ),
+                                dbc.DropdownMenuItem(
+                                    "Parquet",
+                                    id="export-parquet",
+                                    href=app.get_relative_path("/export.parquet"),
+                                    external_link=True,
+                                ),
+                            ],
+                            label="Export",
+                            color="primary",
+                            group=True,
+                        ),
                         html.Span("Results: "),
                         html.Span(id="num-results"),
                     ]
                 ),
                 class_name="buttons",
             ),
-            row_label_from_id(params=params, id_="storage"),
-            row_label_from_id(params=params, id_="curtailment"),
-            row_label_from_id(params=params, id_="biofuel"),
-            row_label_from_id(params=params, id_="import"),
-            row_label_from_id(params=params, id_="elec-gini"),
-            row_label_from_id(params=params, id_="fuel-gini"),
-            row_label_from_id(params=params, id_="ev"),
-            row_label_from_id(params=params, id_="heat"),
-            row_label_from_id(params=params, id_="transport", default_marks=True),
         ]
+        # Only the last slider shows the marks of its scale
+        + [
+            row_label_from_id(
+                params, id_, slider_defaults, default_marks=i == len(COLS) - 1
+            )
+            for i, id_ in enumerate(COLS)
+        ]
+        # The front is computed on the server
+        + ([] if CLIENTSIDE_FILTERING else [pareto_control()])
+    )
+
+
+def pareto_control():
+    options = []
+    for id_, col in COLS.items():
+        label = col["label"].lower()
+        options.append({"label": f"Lowest {label}", "value": f"{id_}:min"})
+        options.append({"label": f"Highest {label}", "value": f"{id_}:max"})
+    return dcc.Dropdown(
+        id="pareto-objectives",
+        options=options,
+        multi=True,
+        placeholder="Highlight the Pareto front for...",
+        className="pareto-objectives",
     )
 
 
@@ -309,18 +404,18 @@ PLOT_CONFIG = {
     "modeBarButtonsToRemove": [
         "pan",
         "zoom",
-        "select",
         "zoomIn",
         "zoomOut",
         "autoScale",
-        "lasso2d",
         "toImage",
     ],
 }
 
 
-def page_layout(params=None):
+def page_layout(params=None, slider_defaults=None):
     params = params or {}
+    if slider_defaults is None:
+        slider_defaults = spores_data.current.slider_defaults
 
     results = (
         html.Details(
@@ -335,7 +430,19 @@ def page_layout(params=None):
                 dbc.Tab(
                     html.Div(
                         [
-                            html.Img(id="overview-image"),
+                            html.Picture(
+                                [
+                                    html.Source(
+                                        id="overview-image-webp",
+                                        type="image/webp",
+                                        sizes=OVERVIEW_IMAGE_SIZES,
+                                    ),
+                                    html.Img(
+                                        id="overview-image",
+                                        sizes=OVERVIEW_IMAGE_SIZES,
+                                    ),
+                                ]
+                            ),
                             html.Div(id="overview-help-div"),
                         ],
                         className="relcontainer",
@@ -348,6 +455,43 @@ def page_layout(params=None):
                     label="Summary data",
                     tab_id="summary",
                 ),
+                dbc.Tab(
+                    html.Div(
+                        [
+                            dbc.Checkbox(
+                                id="similar-restrict",
+                                label="Only SPORES within the slider ranges",
+                                value=False,
+                            ),
+                            html.Div(id="similar-spores"),
+                        ],
+                        className="similar-container",
+                    ),
+                    label="Similar SPORES",
+                    tab_id="similar",
+                ),
+                dbc.Tab(
+                    html.Div(
+                        [
+                            dbc.RadioItems(
+                                id="selection-mode",
+                                options=[
+                                    {"label": "Selected SPORES", "value": "selected"},
+                                    {
+                                        "label": "All SPORES within the slider ranges",
+                                        "value": "filtered",
+                                    },
+                                ],
+                                value="selected",
+                                inline=True,
+                            ),
+                            html.Div(id="selection-stats"),
+                        ],
+                        className="selection-container",
+                    ),
+                    label="Selection",
+                    tab_id="selection",
+                ),
             ],
             id="tabs",
             active_tab="overview",
@@ -358,6 +502,8 @@ def page_layout(params=None):
         [
             navbar,
             url_helpers.apply_default_value(params)(dcc.Store)(id="spore-id"),
+            # Ids of the SPORES selected in the plot, set from its selectedData
+            dcc.Store(id="selected-spores"),
             dbc.Container(
                 [
                     dbc.Row(
@@ -365,10 +511,17 @@ def page_layout(params=None):
                             dbc.Col(
                                 html.Div(
                                     [
-                                        controls(params=params),
+                                        controls(params, slider_defaults),
                                         dcc.Graph(
-                                            id="spores-scatter", config=PLOT_CONFIG
+                                            id="spores-scatter",
+                                            figure=FIGURE_TEMPLATE,
+                                            config=PLOT_CONFIG,
                                         ),
+                                        # Next to the sliders and the plot, so
+                                        # that they and the callbacks using
+                                        # them appear at the same time
+                                        dcc.Store(id="filter-sequence"),
+                                        dcc.Store(id="figure-points"),
                                     ]
                                 ),
                                 md=4,
@@ -414,13 +567,52 @@ def page_layout(params=None):
 
 @app.callback(
     Output("overview-image", "src"),
+    Output("overview-image", "srcSet"),
+    Output("overview-image-webp", "srcSet"),
     Input("spore-id", "data"),
 )
 def update_overview_image(spore_id):
-    if spore_id is None:
-        return "assets/img/empty.jpg"
-    else:
-        return f"assets/img/{spore_id}.jpg"
+    sources = overview_image_sources("empty" if spore_id is None else spore_id)
+    return sources["src"], sources["jpeg"], sources["webp"]
+
+
+def overview_image_sources(name):
+    """``src`` and the JPEG and WebP ``srcset`` of the overview image ``name``."""
+    entry = image_manifest.get(str(name))
+    if entry is None:
+        return {"src": f"assets/img/{name}.jpg", "jpeg": None, "webp": None}
+    return {
+        # The largest JPEG for browsers without srcset support
+        "src": IMAGE_URL_PREFIX + entry["jpeg"][-1][0],
+        "jpeg": images.srcset(entry["jpeg"], IMAGE_URL_PREFIX),
+        "webp": images.srcset(entry["webp"], IMAGE_URL_PREFIX),
+    }
+
+
+@server.route(f"/{IMAGE_URL_PREFIX}sources")
+def image_sources():
+    # Looked up by assets/prefetch.js for the SPORES it prefetches images of
+    ids = flask.request.args.get("ids", "").split(",")[:IMAGE_SOURCES_MAX_IDS]
+    sources = {id_: overview_image_sources(id_) for id_ in ids if id_}
+    response = flask.jsonify(sources)
+    response.cache_control.max_age = 60
+    return response
+
+
+@server.route(f"/{IMAGE_URL_PREFIX}<filename>")
+def image_variant(filename):
+    match = images.VARIANT_NAME.fullmatch(filename)
+    if match is None:
+        # Any other file is revalidated as usual
+        return flask.send_from_directory(os.path.abspath(images.BUILD_DIR), filename)
+    response = flask.send_from_directory(
+        os.path.abspath(images.BUILD_DIR), filename, max_age=IMAGE_MAX_AGE
+    )
+    # File names contain a hash of their content, which never changes
+    response.cache_control.immutable = True
+    response.cache_control.public = True
+    response.set_etag(match.group(1))
+    return response.make_conditional(flask.request)
 
 
 @app.callback(
@@ -442,11 +634,8 @@ def update_summary(spore_id):
     if spore_id is None:
         return None
     else:
-        df_ = pd.concat([df_spores.loc[spore_id, :], df_units], axis=1)
-        df_.columns = ["Indicator", "Unit"]
-        df_ = df_.dropna()  # Drop if indicator or unit are NaN
         return dash_dangerously_set_inner_html.DangerouslySetInnerHTML(
-            df_.to_html(float_format=lambda x: "{:.2f}".format(x))
+            spores_data.current.summaries.get(spore_id)
         )
 
 
@@ -454,9 +643,12 @@ def update_summary(spore_id):
     Output("spore-id", "data"),
     Input("spores-scatter", "clickData"),
     Input("reset-spore", "n_clicks"),
+    Input({"type": "similar-spore", "index": ALL}, "n_clicks"),
     Input("spore-id", "data"),
 )
-def update_spore_id(scatter_clickdata, reset_n_clicks, old_spore_id):
+def update_spore_id(
+    scatter_clickdata, reset_n_clicks, similar_n_clicks, old_spore_id
+):
     ctx = dash.callback_context
 
     if not ctx.triggered:
@@ -464,8 +656,20 @@ def update_spore_id(scatter_clickdata, reset_n_clicks, old_spore_id):
     else:
         _id = ctx.triggered[0]["prop_id"].split(".")[0]
 
-    if _id == "spores-scatter":
-        return scatter_clickdata["points"][0]["customdata"][0]
+    if isinstance(ctx.triggered_id, dict):
+        # Items of a new list of similar SPORES trigger without a click
+        if not ctx.triggered[0]["value"]:
+            raise PreventUpdate
+        return ctx.triggered_id["index"]
+    elif _id == "spores-scatter":
+        try:
+            spore_id = scatter_clickdata["points"][0]["customdata"]
+        except (KeyError, IndexError, TypeError):
+            raise PreventUpdate
+        # E.g. a click on an empty bin in density mode
+        if spore_id is None:
+            raise PreventUpdate
+        return spore_id
     elif _id == "reset-spore":
         return None
     elif _id is None:
@@ -479,90 +683,54 @@ def update_spore_id(scatter_clickdata, reset_n_clicks, old_spore_id):
     #     return old_spore_id
 
 
-@app.callback(
-    Output("num-results", "children"),
-    Input("spores-scatter", "figure"),
-)
-def update_num_results(figure):
-    return len(figure["data"][0]["y"])
+# The ranges of all sliders as one list, in the order of COLS as that is the
+# order of the sliders in the layout
+SLIDER_RANGES = Input({"type": "slider", "index": ALL}, "value")
+SLIDER_RANGES_STATE = State({"type": "slider", "index": ALL}, "value")
+
+# Number of the latest change of the sliders in the browser since the page
+# was loaded, counted by a clientside callback. The filter callbacks are
+# triggered by it rather than by the sliders, so that request_tracker can
+# tell which of their requests is the latest one in the order the browser
+# sent them.
+if not CLIENTSIDE_FILTERING:
+    app.clientside_callback(
+        ClientsideFunction(namespace="spores", function_name="next_sequence"),
+        Output("filter-sequence", "data"),
+        SLIDER_RANGES,
+        State("filter-sequence", "data"),
+    )
 
 
-@app.callback(
-    Output("spores-scatter", "figure"),
-    Input("slider-storage", "value"),
-    Input("slider-curtailment", "value"),
-    Input("slider-biofuel", "value"),
-    Input("slider-import", "value"),
-    Input("slider-elec-gini", "value"),
-    Input("slider-fuel-gini", "value"),
-    Input("slider-ev", "value"),
-    Input("slider-heat", "value"),
-    Input("slider-transport", "value"),
-)
-def update_figure(
-    storage_range,
-    curtailment_range,
-    biofuel_range,
-    import_range,
-    elec_gini_rance,
-    fuel_gini_range,
-    ev_range,
-    heat_range,
-    transport_range,
-):
-    df_spores_filtered = df_spores[
-        df_spores["Transport electrification"].between(
-            transport_range[0], transport_range[1]
-        )
-        & df_spores["Heat electrification"].between(heat_range[0], heat_range[1])
-        & df_spores["Storage discharge capacity"].between(
-            storage_range[0], storage_range[1]
-        )
-        & df_spores["Curtailment"].between(curtailment_range[0], curtailment_range[1])
-        & df_spores["Biofuel utilisation"].between(biofuel_range[0], biofuel_range[1])
-        & df_spores["Average national import"].between(import_range[0], import_range[1])
-        & df_spores["Electricity production Gini coefficient"].between(
-            elec_gini_rance[0], elec_gini_rance[1]
-        )
-        & df_spores["Fuel autarky Gini coefficient"].between(
-            fuel_gini_range[0], fuel_gini_range[1]
-        )
-        & df_spores["EV as flexibility"].between(ev_range[0], ev_range[1])
-    ]
+def strip_figure(df):
+    # Imported here, as it is slow to import and not needed with FAST_START
+    import plotly.express as px
 
-    df_spores_filtered = pd.melt(
-        df_spores_filtered.loc[:, ["dummy"] + COL_NAMES], ignore_index=False
-    ).reset_index(drop=False)
+    df_melted = pd.melt(df.loc[:, TRACE_COLUMNS], ignore_index=False).reset_index(
+        drop=False
+    )
 
     fig = px.strip(
-        df_spores_filtered,
+        df_melted,
         y="variable",
         x="value",
         custom_data=["id"],
         hover_name="id",
         color="variable",
-        hover_data={c: False for c in df_spores_filtered.columns},
+        hover_data={c: False for c in df_melted.columns},
         template="plotly_white",
         orientation="h",
-        height=350,
-        color_discrete_sequence=[
-            "#ffffff",
-            "#0440fe",
-            "#ff7c02",
-            "#32ce4d",
-            "#e9111c",
-            "#933ae2",
-            "#7f3901",
-            "#f69adb",
-            "#ffd85b",
-            "#58e5fe",
-        ],
+        height=35 * len(TRACE_COLUMNS),
+        color_discrete_sequence=["#ffffff"] + [dim["color"] for dim in COLS.values()],
     )
 
     fig.update_layout(
         showlegend=False,
         margin=dict(l=0, r=0, t=0, b=0),
         transition_duration=500,
+        # Clicks still select a single SPORE, and also start a selection
+        # that shift-clicks add to, as do the box and lasso tools
+        clickmode="event+select",
         yaxis=dict(showticklabels=False, title=None, fixedrange=True),
         xaxis=dict(title=None),
     )
@@ -570,13 +738,601 @@ def update_figure(
     return fig
 
 
+def figure_template():
+    """
+    The strip plot with all its traces, styling and layout, but without any
+    points. Each trace is placed on its row by a numeric ``y0`` rather than
+    by a per-point ``y`` array, so only ``x`` and ``customdata`` (the SPORE
+    ids, which are also shown on hover) need to be filled in to show a set
+    of SPORES, and the other trace types used for large sets can be drawn
+    on the same rows.
+
+    """
+    df_empty = pd.DataFrame(
+        [[0] * len(TRACE_COLUMNS)],
+        columns=TRACE_COLUMNS,
+        index=pd.Index([0], name="id"),
+    )
+    template = json.loads(strip_figure(df_empty).to_json())
+    n_rows = len(template["data"])
+    for i, trace in enumerate(template["data"]):
+        for key in ["x", "y", "customdata", "hovertext"]:
+            trace.pop(key, None)
+        trace["hovertemplate"] = trace["hovertemplate"].replace(
+            "%{hovertext}", "%{customdata}"
+        )
+        # Rows are numbered from the bottom up, the first trace is at the top
+        trace["y0"] = n_rows - 1 - i
+    yaxis = template["layout"]["yaxis"]
+    yaxis.pop("categoryorder", None)
+    yaxis.pop("categoryarray", None)
+    yaxis.update(type="linear", range=[-0.5, n_rows - 0.5])
+    return template
+
+
+if FAST_START:
+    startup_artifact = startup.Artifact(
+        STARTUP_ARTIFACT,
+        startup.code_version(
+            # The modules that build, serialise and store the figure template
+            # and page layout
+            [__file__, layout_cache.__file__, url_helpers.__file__, startup.__file__],
+            {
+                "clientside_filtering": CLIENTSIDE_FILTERING,
+                "histogram_bins": HISTOGRAM_BINS,
+                "dimensions": COLS,
+            },
+        ),
+    )
+    FIGURE_TEMPLATE = startup_artifact.get("figure_template")
+    if FIGURE_TEMPLATE is None:
+        FIGURE_TEMPLATE = figure_template()
+        startup_artifact.set("figure_template", FIGURE_TEMPLATE)
+else:
+    FIGURE_TEMPLATE = figure_template()
+
+# Bars over the range of the sliders, aligned with their tracks, whose heights
+# are filled in by update_histograms
+HISTOGRAM_FIGURE = {
+    "data": [
+        {
+            "type": "bar",
+            "x": ((np.arange(HISTOGRAM_BINS) + 0.5) / HISTOGRAM_BINS).round(6).tolist(),
+            "y": [0] * HISTOGRAM_BINS,
+            "marker": {"color": "#adb5bd"},
+            "hoverinfo": "skip",
+        }
+    ],
+    "layout": {
+        "height": 30,
+        "margin": {"l": 25, "r": 25, "t": 0, "b": 0},
+        "bargap": 0.1,
+        "xaxis": {"range": [0, 1], "visible": False},
+        "yaxis": {"visible": False},
+        "paper_bgcolor": "rgba(0,0,0,0)",
+        "plot_bgcolor": "rgba(0,0,0,0)",
+    },
+}
+
+
+def clientside_filter_data(df_spores):
+    """
+    Data shipped once to the browser for client-side filtering: the indicator
+    columns and SPORE ids, from which ``spores.filter_figure`` in
+    assets/clientside.js fills in the points of ``FIGURE_TEMPLATE`` and
+    ``spores.filter_histograms`` the bars of ``HISTOGRAM_FIGURE``.
+
+    """
+    return {
+        "figure": FIGURE_TEMPLATE,
+        "histogram": HISTOGRAM_FIGURE,
+        "columns": COL_NAMES,
+        "ids": df_spores.index.tolist(),
+        "values": {col: df_spores[col].round(6).tolist() for col in COL_NAMES},
+    }
+
+
+def prepare_data(data):
+    """
+    Compute all state derived from a newly loaded version of the data,
+    before it replaces the previous version.
+
+    """
+    df_spores = data.df_spores
+    # The dummy column is used to make space for the "rest axes" button
+    df_spores["dummy"] = 0
+
+    data.slider_defaults = None
+    if FAST_START:
+        data.slider_defaults = startup_artifact.get("slider_defaults", data.version)
+    if data.slider_defaults is None:
+        data.slider_defaults = {
+            col: [float(df_spores[col].min()), float(df_spores[col].max())]
+            for col in COL_NAMES
+        }
+        if FAST_START:
+            startup_artifact.set("slider_defaults", data.slider_defaults, data.version)
+    data.index = filtering.ColumnRangeIndex(df_spores, COL_NAMES)
+    data.spore_ids = df_spores.index.to_numpy()
+    # Per-trace point arrays in row order, so that the points for any filtered
+    # set of rows can be taken directly from them
+    data.trace_values = [df_spores[col].to_numpy() for col in TRACE_COLUMNS]
+    # Fixed vertical offsets of each SPORE within its row in WebGL mode,
+    # so points do not jump around when the filter changes
+    data.jitter = np.random.default_rng(0).uniform(-0.35, 0.35, len(df_spores))
+    if CLIENTSIDE_FILTERING:
+        data.clientside = clientside_filter_data(df_spores)
+    data.summaries = summary.SummaryTables(
+        df_spores, data.df_units, data_dir=DATA_DIR, cache_size=SUMMARY_CACHE_SIZE
+    )
+    if not CLIENTSIDE_FILTERING:
+        # Shared starting point for the histogram state of each session
+        data.crossfilter = filtering.Crossfilter(
+            data.index, HISTOGRAM_BINS, limits=[(0, 1)] * len(COL_NAMES)
+        )
+    data.selection_rows = summary.table_rows(df_spores, data.df_units)
+    data.selection_stats = aggregates.SelectionStats(
+        df_spores,
+        [col for col, unit in data.selection_rows],
+        index=data.index,
+        exact_limit=SELECTION_EXACT_LIMIT,
+        lazy=FAST_START,
+    )
+    data.similarity = similarity.SimilarityIndex(
+        df_spores,
+        COL_NAMES,
+        weights=[SIMILARITY_WEIGHTS.get(id_, 1) for id_ in COLS],
+        lazy=FAST_START,
+    )
+    layout = None
+    if FAST_START:
+        layout = startup_artifact.get("layout", data.version)
+    if layout is None:
+        layout = layout_cache.serialise(page_layout({}, data.slider_defaults))
+        if FAST_START:
+            startup_artifact.set("layout", layout, data.version)
+    data.layouts = layout_cache.LayoutCache(
+        layout, COMPONENT_IDS, maxsize=LAYOUT_CACHE_SIZE
+    )
+
+
+histogram_sessions = caching.LocalLRUCache(
+    HISTOGRAM_SESSIONS, max_bytes=HISTOGRAM_SESSIONS_MAX_BYTES
+)
+
+spores_data = dataset.DatasetRegistry(
+    DATA_DIR,
+    prepare=prepare_data,
+    check_interval=float(os.environ.get("DATA_CHECK_INTERVAL", 10)),
+)
+server.register_blueprint(api.create_blueprint(spores_data, COLS))
+
+
+# The traces of strip_traces and webgl_traces have one point per filtered
+# SPORE, and get their customdata (the SPORE ids, which are shown on hover
+# and read on click) from the ids sent once with them, in
+# spores.fill_figure in assets/clientside.js
+
+
+def strip_traces(data, positions):
+    # Only the points; fill_figure in assets/clientside.js adds them to the
+    # traces of FIGURE_TEMPLATE, which the browser has from the page layout
+    return [
+        dict(x=payload.array(values[positions], FIGURE_DECIMALS))
+        for values in data.trace_values
+    ]
+
+
+def webgl_traces(data, positions):
+    # Without box traces in WebGL, jitter is applied on the server instead.
+    # The dummy row is left empty, as there is no transition to make space for
+    jitter = data.jitter[positions]
+    return [
+        dict(
+            type="scattergl",
+            mode="markers",
+            name=trace["name"],
+            x=payload.array(values[positions], FIGURE_DECIMALS),
+            y=payload.array(trace["y0"] + jitter, 3),
+            marker=dict(color=trace["marker"]["color"], size=4),
+            hovertemplate=trace["hovertemplate"],
+            showlegend=False,
+        )
+        for trace, values in zip(FIGURE_TEMPLATE["data"][1:], data.trace_values[1:])
+    ]
+
+
+def density_traces(data, positions):
+    # One row of binned counts per indicator; each bin carries the id of one
+    # of its SPORES, so that clicking on it still selects a SPORE
+    bins = FIGURE_DENSITY_BINS
+    centers = ((np.arange(bins) + 0.5) / bins).round(6).tolist()
+    spore_ids = data.spore_ids[positions]
+    traces = []
+    for trace, values in zip(FIGURE_TEMPLATE["data"][1:], data.trace_values[1:]):
+        bin_idx = np.clip((values[positions] * bins).astype(np.intp), 0, bins - 1)
+        counts = np.bincount(bin_idx, minlength=bins)
+        occupied, first = np.unique(bin_idx, return_index=True)
+        customdata = [None] * bins
+        for b, spore_id in zip(occupied, spore_ids[first].tolist()):
+            customdata[b] = spore_id
+        traces.append(
+            dict(
+                type="heatmap",
+                name=trace["name"],
+                x=centers,
+                y=[trace["y0"]],
+                z=[[int(c) if c else None for c in counts]],
+                customdata=[customdata],
+                colorscale=[[0, "#ffffff"], [1, trace["marker"]["color"]]],
+                showscale=False,
+                hoverongaps=False,
+                hovertemplate="%{z} SPORES<extra></extra>",
+                ygap=4,
+            )
+        )
+    return traces
+
+
+def quantized_ranges(slider_ranges):
+    """Column ranges for ``slider_ranges``, given in the same order as COLS."""
+    return {
+        col: caching.quantize_range(range_, SLIDER_STEP)
+        for col, range_ in zip(COL_NAMES, slider_ranges)
+    }
+
+
+def filtered_positions(data, slider_ranges):
+    """
+    Row positions in ``data`` of the SPORES within ``slider_ranges``, given
+    in the same order as COLS.
+
+    """
+    ranges = quantized_ranges(slider_ranges)
+    # Entries for older versions of the data are never hit again and
+    # eventually drop out of the LRU cache
+    cache_key = f"{data.version}:positions:" + json.dumps(ranges)
+    cached = figure_cache.get(cache_key)
+    if cached is not None:
+        positions = np.frombuffer(cached, dtype=np.int64)
+    else:
+        positions = data.index.positions(ranges).astype(np.int64)
+        figure_cache.set(cache_key, positions.tobytes())
+    return positions
+
+
+def valid_objectives(objectives):
+    """
+    The objectives in ``objectives``, as sent by the browser, that are of
+    the form ``"<COLS key>:min"`` or ``"<COLS key>:max"``, sorted and without
+    duplicates. Others are ignored.
+
+    """
+    valid = set()
+    for objective in objectives or []:
+        if not isinstance(objective, str):
+            continue
+        id_, _, direction = objective.partition(":")
+        if id_ in COLS and direction in ("min", "max"):
+            valid.add(objective)
+    return sorted(valid)
+
+
+def front_positions(data, slider_ranges, objectives, positions):
+    """
+    Row positions in ``data`` of the SPORES on the Pareto front of the
+    filtered SPORES at ``positions`` for ``objectives``, as returned by
+    ``valid_objectives``.
+
+    """
+    cache_key = (
+        f"{data.version}:pareto:"
+        + json.dumps(quantized_ranges(slider_ranges))
+        + json.dumps(objectives)
+    )
+    cached = figure_cache.get(cache_key)
+    if cached is not None:
+        return np.frombuffer(cached, dtype=np.int64)
+
+    columns, maximize = [], []
+    for objective in objectives:
+        id_, direction = objective.split(":")
+        columns.append(COLS[id_]["col"])
+        maximize.append(direction == "max")
+    values = np.column_stack(
+        [data.trace_values[TRACE_COLUMNS.index(col)][positions] for col in columns]
+    )
+    front = positions[pareto.pareto_front(values, maximize)].astype(np.int64)
+    figure_cache.set(cache_key, front.tobytes())
+    return front
+
+
+def front_trace(data, front):
+    # Marks the SPORES on the front on the centre line of each row
+    rows = FIGURE_TEMPLATE["data"][1:]
+    webgl = len(front) * len(rows) > FIGURE_WEBGL_THRESHOLD
+    x = np.concatenate([values[front] for values in data.trace_values[1:]])
+    return dict(
+        type="scattergl" if webgl else "scatter",
+        mode="markers",
+        name="Pareto front",
+        x=payload.array(x, FIGURE_DECIMALS),
+        y=payload.array(np.repeat([trace["y0"] for trace in rows], len(front))),
+        marker=dict(color="#000000", symbol="diamond-open", size=8),
+        customdata=payload.array(np.tile(data.spore_ids[front], len(rows))),
+        hovertemplate="<b>%{customdata}</b> (Pareto front)<extra></extra>",
+        showlegend=False,
+    )
+
+
+def update_figure(objectives, slider_ranges):
+    data = spores_data.current
+    # Inputs are declared in the same order as COLS
+    positions = filtered_positions(data, slider_ranges)
+
+    request_tracker.check()
+
+    if len(positions) > FIGURE_DENSITY_THRESHOLD:
+        traces = density_traces(data, positions)
+    elif len(positions) > FIGURE_WEBGL_THRESHOLD:
+        traces = webgl_traces(data, positions)
+    else:
+        traces = strip_traces(data, positions)
+
+    num_results = len(positions)
+    objectives = valid_objectives(objectives)
+    if objectives:
+        front = front_positions(data, slider_ranges, objectives, positions)
+        traces.append(front_trace(data, front))
+        num_results = f"{len(positions)} ({len(front)} on the Pareto front)"
+
+    # Only the traces change with the slider ranges; the layout is sent once
+    # as part of the page layout
+    points = {"traces": traces, "ids": payload.array(data.spore_ids[positions])}
+
+    return points, num_results
+
+
+if CLIENTSIDE_FILTERING:
+    app.clientside_callback(
+        ClientsideFunction(namespace="spores", function_name="filter_figure"),
+        Output("spores-scatter", "figure"),
+        Output("num-results", "children"),
+        SLIDER_RANGES,
+        State("spores-data", "data"),
+    )
+else:
+    app.callback(
+        Output("figure-points", "data"),
+        Output("num-results", "children"),
+        Input("pareto-objectives", "value"),
+        SLIDER_RANGES_STATE,
+        Input("filter-sequence", "data"),
+        State("session-id", "data"),
+    )(request_tracker.latest_only(update_figure))
+
+    app.clientside_callback(
+        ClientsideFunction(namespace="spores", function_name="fill_figure"),
+        Output("spores-scatter", "figure"),
+        Input("figure-points", "data"),
+        State("spores-scatter", "figure"),
+    )
+
+
+def update_histograms(slider_ranges):
+    data = spores_data.current
+    ranges = [caching.quantize_range(range_, SLIDER_STEP) for range_ in slider_ranges]
+
+    # Each session keeps its own filter state, so that only the SPORES
+    # entering or leaving the range of the moved slider need to be counted
+    session_id = coalescing.current_session_id()
+    key = (data.version, session_id)
+    crossfilter = histogram_sessions.get(key) if session_id else None
+    if crossfilter is None:
+        crossfilter = data.crossfilter.copy()
+        if session_id:
+            histogram_sessions.set(key, crossfilter)
+    counts = crossfilter.update(ranges)
+
+    patches = []
+    for row in counts:
+        patch = Patch()
+        patch["data"][0]["y"] = row.tolist()
+        patches.append(patch)
+    return patches
+
+
+if CLIENTSIDE_FILTERING:
+    app.clientside_callback(
+        ClientsideFunction(namespace="spores", function_name="filter_histograms"),
+        Output({"type": "histogram", "index": ALL}, "figure"),
+        SLIDER_RANGES,
+        State("spores-data", "data"),
+    )
+else:
+    app.callback(
+        Output({"type": "histogram", "index": ALL}, "figure"),
+        SLIDER_RANGES_STATE,
+        Input("filter-sequence", "data"),
+        State("session-id", "data"),
+    )(request_tracker.latest_only(update_histograms))
+
+
+@app.callback(
+    Output("similar-spores", "children"),
+    Input("tabs", "active_tab"),
+    Input("spore-id", "data"),
+    Input("similar-restrict", "value"),
+    SLIDER_RANGES,
+)
+def update_similar(active_tab, spore_id, restrict, slider_ranges):
+    # Only computed while shown, so moving a slider costs nothing while
+    # another tab is open
+    if active_tab != "similar":
+        raise PreventUpdate
+    if spore_id is None:
+        return None
+
+    data = spores_data.current
+    try:
+        position = data.df_spores.index.get_loc(spore_id)
+    except KeyError:
+        return None
+    allowed = filtered_positions(data, slider_ranges) if restrict else None
+    positions, distances = data.similarity.neighbours(
+        [position], SIMILAR_COUNT, allowed=allowed
+    )
+
+    items = [
+        dbc.ListGroupItem(
+            [f"SPORE {data.spore_ids[pos]}", html.Small(f" (distance {dist:.3f})")],
+            id={"type": "similar-spore", "index": data.spore_ids[pos].item()},
+            action=True,
+        )
+        for pos, dist in zip(positions[0], distances[0])
+        if pos != -1
+    ]
+    if not items:
+        return html.P("No similar SPORES found.")
+    return dbc.ListGroup(items)
+
+
+app.clientside_callback(
+    ClientsideFunction(namespace="spores", function_name="selected_ids"),
+    Output("selected-spores", "data"),
+    Input("spores-scatter", "selectedData"),
+)
+
+
+def selection_stats(data, positions):
+    """
+    Statistics of all indicators over the SPORES at the sorted, unique
+    ``positions``, as returned by ``aggregates.SelectionStats.compute``.
+
+    """
+    digest = hashlib.blake2b(positions.tobytes(), digest_size=16).hexdigest()
+    cache_key = f"{data.version}:selection:{digest}"
+    cached = figure_cache.get(cache_key)
+    if cached is not None:
+        return np.frombuffer(cached).reshape(len(aggregates.STATISTICS), -1)
+    stats = data.selection_stats.compute(positions)
+    figure_cache.set(cache_key, stats.tobytes())
+    return stats
+
+
+@app.callback(
+    Output("selection-stats", "children"),
+    Input("tabs", "active_tab"),
+    Input("selection-mode", "value"),
+    Input("selected-spores", "data"),
+    SLIDER_RANGES,
+)
+def update_selection_stats(active_tab, mode, selected_ids, slider_ranges):
+    # As update_similar, only computed while shown
+    if active_tab != "selection":
+        raise PreventUpdate
+    if mode != "filtered" and isinstance(dash.callback_context.triggered_id, dict):
+        # A slider was moved, which does not change the selected SPORES
+        raise PreventUpdate
+    return selection_table(mode, selected_ids, slider_ranges)
+
+
+def selection_table(mode, selected_ids, slider_ranges):
+    data = spores_data.current
+    if mode == "filtered":
+        positions = filtered_positions(data, slider_ranges)
+    else:
+        positions = data.df_spores.index.get_indexer(selected_ids or [])
+        positions = np.unique(positions[positions != -1]).astype(np.int64)
+        if len(positions) == 0:
+            return html.P(
+                "Select SPORES in the plot with the box or lasso tool, or click"
+                " a SPORE and shift-click further ones."
+            )
+    stats = selection_stats(data, positions)
+    return dash_dangerously_set_inner_html.DangerouslySetInnerHTML(
+        aggregates.render(data.selection_rows, stats)
+    )
+
+
+def is_range(value):
+    return (
+        isinstance(value, (list, tuple))
+        and len(value) == 2
+        and all(isinstance(v, (int, float)) for v in value)
+    )
+
+
+@server.route("/export.<fmt>")
+def export_spores(fmt):
+    # Takes the same query string as the page, so the export always matches
+    # the sliders
+    data = spores_data.current
+    try:
+        state = url_helpers.parse_state(
+            flask.request.url, COMPONENT_IDS, SLIDER_STEP, strict=True
+        )
+    except (ValueError, SyntaxError):
+        # A malformed token, or malformed values in a query string with one
+        # parameter per slider
+        flask.abort(400)
+    slider_ranges = [
+        state.get(f"slider-{id_}", {}).get("value", data.slider_defaults[col])
+        for id_, col in zip(COLS, COL_NAMES)
+    ]
+    if not all(is_range(range_) for range_ in slider_ranges):
+        flask.abort(400)
+    positions = filtered_positions(data, slider_ranges)
+    columns = [col for col in data.df_spores.columns if col != "dummy"]
+    return export.response(data.df_spores, positions, fmt, columns=columns)
+
+
+# Adds the query string of the page to the export links set in the layout
+app.clientside_callback(
+    ClientsideFunction(namespace="spores", function_name="export_links"),
+    Output("export-csv", "href"),
+    Output("export-parquet", "href"),
+    Input("url", "search"),
+    State("export-csv", "href"),
+    State("export-parquet", "href"),
+)
+
+
+app.clientside_callback(
+    ClientsideFunction(namespace="images", function_name="prefetch"),
+    Output("image-prefetch", "data"),
+    Input("spores-scatter", "hoverData"),
+    State("spores-scatter", "figure"),
+    State("image-prefetch-config", "data"),
+)
+
+
 def app_layout():
     if flask.has_request_context():
         # When app actually runs
-        return url_bar_and_content_div
+        children = [
+            url_bar_and_content_div,
+            dcc.Store(id="session-id", data=coalescing.new_session_id()),
+            dcc.Store(id="image-prefetch-config", data=IMAGE_PREFETCH),
+            dcc.Store(id="image-prefetch"),
+        ]
+        if CLIENTSIDE_FILTERING:
+            children.append(
+                dcc.Store(id="spores-data", data=spores_data.current.clientside)
+            )
+        return html.Div(children)
     else:
         # For validation only
-        return html.Div([url_bar_and_content_div, *page_layout()])
+        return html.Div(
+            [
+                url_bar_and_content_div,
+                dcc.Store(id="session-id"),
+                dcc.Store(id="spores-data"),
+                dcc.Store(id="image-prefetch-config"),
+                dcc.Store(id="image-prefetch"),
+                *page_layout(),
+            ]
+        )
 
 
 app.layout = app_layout
@@ -586,34 +1342,51 @@ app.layout = app_layout
 def page_load(href):
     if not href:
         return []
-    state = url_helpers.parse_state(href)
-    return page_layout(state)
+    state = url_helpers.parse_state(href, COMPONENT_IDS, SLIDER_STEP)
+    return spores_data.current.layouts.get(state)
 
 
 @app.callback(
-    [
-        Output("slider-storage", "value"),
-        Output("slider-curtailment", "value"),
-        Output("slider-biofuel", "value"),
-        Output("slider-import", "value"),
-        Output("slider-elec-gini", "value"),
-        Output("slider-fuel-gini", "value"),
-        Output("slider-ev", "value"),
-        Output("slider-heat", "value"),
-        Output("slider-transport", "value"),
-    ],
+    Output({"type": "slider", "index": ALL}, "value"),
     inputs=[Input("reset-sliders", "n_clicks")],
 )
 def reset_sliders(n_clicks):
-    return SLIDER_DEFAULTS_LIST
+    return list(spores_data.current.slider_defaults.values())
 
 
 @app.callback(
     Output("url", "search"),
-    inputs=[Input(id, p) for id, param in COMPONENT_IDS.items() for p in param],
+    inputs=[Input("spore-id", "data"), SLIDER_RANGES],
 )
-def update_url(*values):
-    return url_helpers.update_url_state(COMPONENT_IDS, values)
+def update_url(spore_id, slider_ranges):
+    # In the order of COMPONENT_IDS
+    values = [spore_id, *slider_ranges]
+    return url_helpers.update_url_state(COMPONENT_IDS, values, step=SLIDER_STEP)
+
+
+def warm_up():
+    """
+    Do the work otherwise left to the first requests, such as Dash's server
+    setup and the serialisation of the index page, layout and callbacks.
+    With uwsgi, this runs in the master process before it forks the
+    workers, which then all start warm.
+
+    """
+    defaults = list(spores_data.current.slider_defaults.values())
+    with server.test_request_context("/"):
+        # Runs the before_request functions, among which Dash's server setup
+        server.preprocess_request()
+        app.index()
+        app.serve_layout()
+        app.dependencies()
+        page_load(flask.request.url)
+        if not CLIENTSIDE_FILTERING:
+            update_figure(None, defaults)
+            update_histograms(defaults)
+
+
+if FAST_START:
+    warm_up()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,148 @@
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    spores: {
+        // Client-side equivalent of update_figure and update_num_results in app.py,
+        // used when the app runs with CLIENTSIDE_FILTERING=1
+        filter_figure: function (ranges, data) {
+            if (!data) {
+                return [window.dash_clientside.no_update, window.dash_clientside.no_update];
+            }
+
+            const columns = data.columns;
+            const values = data.values;
+            const ids = data.ids;
+
+            const rows = [];
+            for (let i = 0; i < ids.length; i++) {
+                let keep = true;
+                for (let j = 0; j < columns.length; j++) {
+                    const range = ranges[j];
+                    const v = values[columns[j]][i];
+                    if (!(v >= range[0] && v <= range[1])) {
+                        keep = false;
+                        break;
+                    }
+                }
+                if (keep) {
+                    rows.push(i);
+                }
+            }
+
+            const customdata = rows.map(i => ids[i]);
+            const traces = data.figure.data.map(function (template) {
+                const col = values[template.name];
+                return Object.assign({}, template, {
+                    x: col ? rows.map(i => col[i]) : rows.map(() => 0),
+                    customdata: customdata,
+                });
+            });
+
+            return [{data: traces, layout: data.figure.layout}, rows.length];
+        },
+
+        // Client-side equivalent of update_histograms in app.py: the histogram
+        // of each column over the SPORES that pass the filters on all other
+        // columns, in the bins of data.histogram between 0 and 1
+        filter_histograms: function (ranges, data) {
+            if (!data) {
+                return ranges.map(() => window.dash_clientside.no_update);
+            }
+
+            const columns = data.columns;
+            const values = columns.map(col => data.values[col]);
+            const bins = data.histogram.data[0].y.length;
+            const counts = columns.map(() => new Array(bins).fill(0));
+
+            for (let i = 0; i < data.ids.length; i++) {
+                let failed = 0;
+                let failedColumn = -1;
+                for (let j = 0; j < columns.length; j++) {
+                    const v = values[j][i];
+                    // Missing values are sent as null and fail every filter
+                    if (v === null || !(v >= ranges[j][0] && v <= ranges[j][1])) {
+                        failed++;
+                        failedColumn = j;
+                        if (failed > 1) {
+                            break;
+                        }
+                    }
+                }
+                if (failed > 1) {
+                    continue;
+                }
+                for (let j = 0; j < columns.length; j++) {
+                    const v = values[j][i];
+                    if ((failed === 0 || j === failedColumn) && v !== null) {
+                        const bin = Math.floor(v * bins);
+                        counts[j][Math.min(Math.max(bin, 0), bins - 1)]++;
+                    }
+                }
+            }
+
+            const template = data.histogram;
+            return counts.map(y => ({
+                data: [Object.assign({}, template.data[0], {y: y})],
+                layout: template.layout,
+            }));
+        },
+
+        // The traces sent by update_figure in app.py, shown with the layout
+        // of the figure. Traces without a type are only the points of the
+        // trace at the same position in the figure as set in the layout,
+        // which is kept from the first call after the layout was loaded.
+        // Traces without customdata have one point per id, which are sent
+        // only once for all of them.
+        fill_figure: function (points, figure) {
+            if (!points) {
+                return window.dash_clientside.no_update;
+            }
+            const spores = window.dash_clientside.spores;
+            if (figure.data.every(trace => trace.x === undefined)) {
+                // Without points, so not yet filled in
+                spores.figure_template = figure.data;
+            }
+            const traces = points.traces.map(function (trace, i) {
+                if (trace.type === undefined) {
+                    trace = Object.assign({}, spores.figure_template[i], trace);
+                }
+                return trace.customdata === undefined
+                    ? Object.assign({}, trace, {customdata: points.ids})
+                    : trace;
+            });
+            return {data: traces, layout: figure.layout};
+        },
+
+        // Number of the latest change of the sliders, sent along with the
+        // filter requests so that the server can drop superseded ones. The
+        // numbers start over with a new page id whenever the page layout,
+        // and with it the store of the sequence, is loaded again.
+        next_sequence: function (ranges, sequence) {
+            if (!sequence) {
+                return {page: Math.random().toString(36).slice(2), number: 1};
+            }
+            return {page: sequence.page, number: sequence.number + 1};
+        },
+
+        // The export links, as set in the layout, with the query string of
+        // the page, so that the export matches the sliders
+        export_links: function (search, csvHref, parquetHref) {
+            return [csvHref, parquetHref].map(
+                href => href.split("?")[0] + (search || "")
+            );
+        },
+
+        // Ids of the SPORES selected in spores-scatter, each once even if it
+        // was selected in several rows, for update_selection_stats in app.py
+        selected_ids: function (selectedData) {
+            if (!selectedData || !selectedData.points) {
+                return null;
+            }
+            const ids = new Set();
+            selectedData.points.forEach(point => {
+                if (point.customdata !== undefined && point.customdata !== null) {
+                    ids.add(point.customdata);
+                }
+            });
+            return Array.from(ids);
+        },
+    },
+});
@@ -0,0 +1,206 @@
+// Prefetching of the overview images of the SPORE hovered in spores-scatter
+// and of the SPORES next to it, so that the image of a selected SPORE is
+// usually in the browser cache already by the time update_overview_image
+// sets it. Limits are set by IMAGE_PREFETCH in app.py.
+(function () {
+    const supportsWebp = document.createElement("canvas")
+        .toDataURL("image/webp").indexOf("data:image/webp") === 0;
+
+    const prefetcher = {
+        sources: new Map(), // SPORE id -> result of /img/sources
+        prefetched: new Set(), // Absolute image URLs
+        queue: [],
+        active: 0,
+        bytes: 0,
+        budgetReported: false,
+        // Reported to /metrics/prefetch, which counts each at most once per
+        // report, and reset whenever an image is shown
+        stats: {skipped: 0, hits: 0, misses: 0},
+
+        request: function (ids, config) {
+            const unknown = ids.filter(id => !this.sources.has(id));
+            if (unknown.length === 0) {
+                this.enqueue(ids, config);
+                return;
+            }
+            unknown.forEach(id => this.sources.set(id, null));
+            fetch("img/sources?ids=" + unknown.map(encodeURIComponent).join(","))
+                .then(response => response.json())
+                .then(sources => {
+                    unknown.forEach(id => this.sources.set(id, sources[String(id)] || null));
+                    this.enqueue(ids, config);
+                })
+                .catch(() => unknown.forEach(id => this.sources.delete(id)));
+        },
+
+        enqueue: function (ids, config) {
+            const urls = [];
+            ids.forEach(id => {
+                const url = pickUrl(this.sources.get(id));
+                if (url && !this.prefetched.has(url) && urls.indexOf(url) === -1) {
+                    urls.push(url);
+                }
+            });
+            // The most recently hovered SPORES first
+            const rest = this.queue.filter(url => urls.indexOf(url) === -1);
+            this.queue = urls.concat(rest).slice(0, config.max_queue);
+            this.pump(config);
+        },
+
+        pump: function (config) {
+            while (this.active < config.max_concurrent && this.queue.length > 0) {
+                if (this.bytes >= config.max_bytes) {
+                    // Reported once per page
+                    if (!this.budgetReported) {
+                        this.budgetReported = true;
+                        this.stats.skipped = 1;
+                    }
+                    this.queue = [];
+                    return;
+                }
+                const url = this.queue.shift();
+                this.prefetched.add(url);
+                this.active++;
+                // The header lets the server count prefetched images
+                fetch(url, {headers: {"X-Prefetch": "1"}})
+                    .then(response => response.blob())
+                    .then(blob => {
+                        this.bytes += blob.size;
+                    })
+                    .catch(() => this.prefetched.delete(url))
+                    .finally(() => {
+                        this.active--;
+                        this.pump(config);
+                    });
+            }
+        },
+
+        report: function () {
+            const stats = this.stats;
+            if (Object.keys(stats).some(key => stats[key] > 0) && navigator.sendBeacon) {
+                navigator.sendBeacon("metrics/prefetch", JSON.stringify(stats));
+            }
+            this.stats = {skipped: 0, hits: 0, misses: 0};
+        },
+    };
+
+    // Width of the slot the overview image is shown in, evaluated the same
+    // way as the browser does for its sizes attribute
+    function slotWidth() {
+        const img = document.getElementById("overview-image");
+        const sizes = (img && img.getAttribute("sizes")) || "100vw";
+        for (const entry of sizes.split(",")) {
+            const match = entry.trim().match(/^(\(.*\))?\s*([\d.]+)(vw|px)$/);
+            if (match && (!match[1] || window.matchMedia(match[1]).matches)) {
+                const value = parseFloat(match[2]);
+                return match[3] === "vw" ? value * window.innerWidth / 100 : value;
+            }
+        }
+        return window.innerWidth;
+    }
+
+    // The image URL that the browser would pick from the srcset
+    function pickUrl(sources) {
+        if (!sources) {
+            return null;
+        }
+        const srcset = supportsWebp ? sources.webp : sources.jpeg;
+        let url = sources.src;
+        if (srcset) {
+            const target = slotWidth() * (window.devicePixelRatio || 1);
+            const candidates = srcset.split(",").map(candidate => {
+                const parts = candidate.trim().split(/\s+/);
+                return {url: parts[0], width: parseInt(parts[1], 10)};
+            });
+            const fitting = candidates.filter(c => c.width >= target);
+            url = (fitting.length > 0 ? fitting[0] : candidates[candidates.length - 1]).url;
+        }
+        return new URL(url, document.baseURI).href;
+    }
+
+    // Arrays of the figure that payload.py sent as typed arrays, decoded
+    const typedArrays = {
+        i1: Int8Array, u1: Uint8Array, i2: Int16Array, u2: Uint16Array,
+        i4: Int32Array, u4: Uint32Array, f4: Float32Array, f8: Float64Array,
+    };
+    const decoded = new WeakMap();
+    function decode(value) {
+        if (!value || typeof value.bdata !== "string") {
+            return value;
+        }
+        if (!decoded.has(value)) {
+            const bytes = Uint8Array.from(atob(value.bdata), c => c.charCodeAt(0));
+            decoded.set(value, new typedArrays[value.dtype](bytes.buffer));
+        }
+        return decoded.get(value);
+    }
+
+    // Ids of the hovered SPORE and of the SPORES closest to it in its row
+    function nearbySpores(point, traces, count) {
+        const ids = [];
+        const add = id => {
+            if (id !== undefined && id !== null && ids.indexOf(id) === -1) {
+                ids.push(id);
+            }
+        };
+        add(point.customdata);
+        const trace = traces[point.curveNumber];
+        if (!trace || !trace.customdata) {
+            return ids;
+        }
+
+        if (Array.isArray(point.pointNumber)) {
+            // Density mode, one SPORE per bin
+            const bins = trace.customdata[0];
+            const bin = point.pointNumber[1];
+            for (let offset = 1; offset < bins.length && ids.length <= count; offset++) {
+                add(bins[bin - offset]);
+                add(bins[bin + offset]);
+            }
+            return ids;
+        }
+
+        const xs = decode(trace.x);
+        const customdata = decode(trace.customdata);
+        const nearest = [];
+        for (let i = 0; i < xs.length; i++) {
+            const distance = Math.abs(xs[i] - point.x);
+            if (nearest.length < count + 1 || distance < nearest[nearest.length - 1].distance) {
+                nearest.push({index: i, distance: distance});
+                nearest.sort((a, b) => a.distance - b.distance);
+                nearest.length = Math.min(nearest.length, count + 1);
+            }
+        }
+        nearest.forEach(n => add(customdata[n.index]));
+        return ids.slice(0, count + 1);
+    }
+
+    // Counts whether each overview image shown had been prefetched
+    document.addEventListener("load", function (event) {
+        const img = event.target;
+        if (img.id !== "overview-image" || !img.currentSrc) {
+            return;
+        }
+        if (!/(^|\/)empty[-.]/.test(new URL(img.currentSrc).pathname)) {
+            if (prefetcher.prefetched.has(img.currentSrc)) {
+                prefetcher.stats.hits = 1;
+            } else {
+                prefetcher.stats.misses = 1;
+            }
+        }
+        prefetcher.report();
+    }, true);
+    window.addEventListener("pagehide", () => prefetcher.report());
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        images: {
+            prefetch: function (hoverData, figure, config) {
+                if (hoverData && hoverData.points && hoverData.points.length && figure && config) {
+                    const ids = nearbySpores(hoverData.points[0], figure.data, config.neighbours);
+                    prefetcher.request(ids, config);
+                }
+                return window.dash_clientside.no_update;
+            },
+        },
+    });
+})();
@@ -0,0 +1,245 @@
+"""
+Benchmarks for the Dash callbacks in app.py on synthetic SPORES ensembles.
+
+Each callback is called directly (without going through HTTP) on synthetic
+data with the same schema as data/data.csv, for each ensemble size. For every
+callback and size, the median and maximum latency, the peak memory allocated
+during a call and the size of the serialised response, as is and with gzip,
+are reported. Latency and memory are measured in separate calls with
+different inputs, as tracing allocations slows the calls down.
+
+Run from the repository root::
+
+    python -m benchmarks.callbacks --sizes 1e3 1e4 1e5 1e6 1e7 --output bench.json
+    python -m benchmarks.callbacks --compare bench.json
+
+The figure cache is disabled, and kept in a temporary directory, unless
+``--with-cache`` is given, so that the results reflect the work done on a
+cache miss.
+
+"""
+
+import argparse
+import gzip
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+PARETO_OBJECTIVES = ["storage:min", "curtailment:min", "import:max"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the Dash callbacks on synthetic SPORES ensembles"
+    )
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=lambda x: int(float(x)),
+        default=[10**3, 10**4, 10**5, 10**6],
+        help="Numbers of SPORES to benchmark (default: 1e3 1e4 1e5 1e6)",
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument(
+        "--compare",
+        help="Compare against results from an earlier run and exit with an"
+        " error if any median latency regressed by more than --threshold",
+    )
+    parser.add_argument("--threshold", type=float, default=1.2)
+    parser.add_argument("--with-cache", action="store_true")
+    return parser.parse_args()
+
+
+def synthetic_data(n, seed=0):
+    """Random SPORES with the same columns as data/data.csv."""
+    import numpy as np
+    import pandas as pd
+
+    import app
+    import dataset
+
+    df_real, df_units = dataset.load("./data")
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for col in df_real.columns:
+        if col in app.COL_NAMES:
+            # Indicators are scaled relative to their maximum value
+            values = rng.beta(2, 2, size=n)
+            columns[col] = values / values.max()
+        else:
+            columns[col] = rng.uniform(0, df_real[col].max(), size=n)
+    df_spores = pd.DataFrame(columns, index=pd.RangeIndex(n, name=df_real.index.name))
+
+    data = dataset.Dataset(f"bench-{n}-{seed}", df_spores, df_units)
+    app.prepare_data(data)
+    return data
+
+
+def random_ranges(rng, app):
+    ranges = []
+    for _ in app.COL_NAMES:
+        if rng.random() < 0.5:
+            ranges.append([0, 1])
+        else:
+            low = round(rng.uniform(0, 0.5), 2)
+            ranges.append([low, round(rng.uniform(low, 1), 2)])
+    return ranges
+
+
+def measure(func, args_list, memory_args_list):
+    from plotly.io.json import to_json_plotly
+
+    latencies, peaks, sizes, gzip_sizes = [], [], [], []
+    for args in args_list:
+        start = time.perf_counter()
+        result = func(*args)
+        latencies.append(time.perf_counter() - start)
+        content = to_json_plotly(result).encode()
+        sizes.append(len(content))
+        gzip_sizes.append(len(gzip.compress(content, compresslevel=6)))
+    for args in memory_args_list:
+        tracemalloc.start()
+        func(*args)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {
+        "latency_median_s": statistics.median(latencies),
+        "latency_max_s": max(latencies),
+        "peak_memory_bytes": max(peaks),
+        "response_bytes": statistics.median(sizes),
+        "response_gzip_bytes": statistics.median(gzip_sizes),
+    }
+
+
+def benchmark_args(rng, app, n, repeats):
+    """Arguments of ``repeats`` calls of each benchmarked function."""
+    import url_helpers
+
+    ranges = [random_ranges(rng, app) for _ in range(repeats)]
+    ids = [(rng.randrange(n),) for _ in range(repeats)]
+    url_args = [(spore_id, r) for (spore_id,), r in zip(ids, ranges)]
+    # As written by update_url, with the state as a compact token
+    urls = [
+        "http://localhost/" + app.update_url(spore_id, r) for spore_id, r in url_args
+    ]
+    legacy_urls = [
+        "http://localhost/"
+        + url_helpers.update_url_state(app.COMPONENT_IDS, [spore_id, *r])
+        for spore_id, r in url_args
+    ]
+
+    return {
+        "update_figure": (app.update_figure, [(None, r) for r in ranges]),
+        "update_figure_pareto": (
+            app.update_figure,
+            [(PARETO_OBJECTIVES, r) for r in ranges],
+        ),
+        "update_histograms": (app.update_histograms, [(r,) for r in ranges]),
+        "update_summary": (app.update_summary, ids),
+        "selection_table": (
+            app.selection_table,
+            [("filtered", None, r) for r in ranges],
+        ),
+        "page_load": (app.page_load, [(url,) for url in urls]),
+        "update_url": (app.update_url, url_args),
+        "url_helpers.parse_state": (
+            url_helpers.parse_state,
+            [(url, app.COMPONENT_IDS, app.SLIDER_STEP) for url in urls],
+        ),
+        "url_helpers.parse_state_legacy": (
+            url_helpers.parse_state,
+            [(url, app.COMPONENT_IDS, app.SLIDER_STEP) for url in legacy_urls],
+        ),
+    }
+
+
+def run(args):
+    import app
+
+    app.spores_data.check_interval = None
+
+    results = []
+    for n in args.sizes:
+        data = synthetic_data(n, seed=args.seed)
+        app.spores_data.swap(data)
+        rng = random.Random(args.seed)
+
+        benchmarks = benchmark_args(rng, app, n, args.repeats)
+        memory_benchmarks = benchmark_args(rng, app, n, args.repeats)
+        for name, (func, args_list) in benchmarks.items():
+            result = {"callback": name, "n_spores": n}
+            result.update(measure(func, args_list, memory_benchmarks[name][1]))
+            results.append(result)
+            print(
+                f"{name:<31} n={n:<10} "
+                f"median={result['latency_median_s'] * 1000:9.2f} ms  "
+                f"peak_mem={result['peak_memory_bytes'] / 1024**2:9.2f} MiB  "
+                f"response={result['response_bytes'] / 1024:9.1f} KiB  "
+                f"gzip={result['response_gzip_bytes'] / 1024:9.1f} KiB"
+            )
+
+    return results
+
+
+def metadata():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path, "r") as f:
+        baseline = {
+            (r["callback"], r["n_spores"]): r for r in json.load(f)["results"]
+        }
+    regressions = []
+    for r in results:
+        old = baseline.get((r["callback"], r["n_spores"]))
+        if old is None:
+            continue
+        ratio = r["latency_median_s"] / old["latency_median_s"]
+        print(f"{r['callback']:<31} n={r['n_spores']:<10} {ratio:6.2f}x")
+        if ratio > threshold:
+            regressions.append(r)
+    return regressions
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        if not args.with_cache:
+            os.environ["FIGURE_CACHE_MAX_BYTES"] = "0"
+            os.environ["FIGURE_CACHE_PATH"] = os.path.join(cache_dir, "figures.sqlite")
+        results = run(args)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"metadata": metadata(), "results": results}, f, indent=2)
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {args.threshold}x")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,744 @@
+"""
+Load test of the app served as in production, by many simulated users at
+once replaying recorded sessions.
+
+The app is started on localhost, by default under uwsgi with the options
+of app.ini (with an HTTP socket on a free port instead of the unix
+socket), or with ``--server werkzeug`` in a threaded single-process
+server if uwsgi is not installed. ``--url`` targets an already running
+server instead.
+
+Each simulated user replays the session scripts in benchmarks/sessions,
+which describe what a user does (open a page, drag a slider, click a
+SPORE, ...), as the Dash renderer in a browser would: it fetches the page
+and its static files, calls every callback that the change of a component
+triggers, with the inputs and state that the page holds at that point,
+follows the chains of callbacks that their outputs trigger in turn, and
+fetches the overview images that they set. Of the clientside callbacks,
+only those in CLIENTSIDE_FUNCTIONS, whose outputs trigger server
+callbacks, are run, in Python; the outputs of the others can be set by the
+scripts directly.
+
+For each number of concurrent users, the throughput and the p50, p95 and
+p99 latency of every callback and static route are reported, and responses
+with an error status (such as missing overview images) are counted as
+errors. Run from the repository root::
+
+    python -m benchmarks.load --users 1 10 50 100 --duration 30 --output load.json
+    python -m benchmarks.load --users 1 10 50 100 --compare load.json
+
+Session scripts are JSON files with a ``name`` and a list of ``steps``,
+each with one of these ``action``s:
+
+- ``visit``: open the page at ``search``, e.g. ``"?slider-storage=[0,0.5]"``
+- ``drag``: release the slider of ``dimension`` at each of ``values`` in turn
+- ``click``: click on the SPORE with id ``spore``, or a random one
+- ``select``: select ``count`` random SPORES in the plot
+- ``reset``: click the button that resets the sliders
+- ``set``: set ``property`` of the component ``id`` to ``value``
+- ``wait``: think for ``seconds``, scaled by ``--think-time``
+
+"""
+
+import argparse
+import glob
+import gzip
+import http.client
+import json
+import os
+import random
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+from benchmarks.callbacks import metadata
+
+SESSIONS = os.path.join(os.path.dirname(__file__), "sessions", "*.json")
+
+# Options of app.ini that only apply to the deployment
+UWSGI_SKIP_OPTIONS = {"socket", "chmod-socket", "uid", "gid", "vacuum"}
+
+WERKZEUG_SERVER = """
+import sys
+from werkzeug.serving import run_simple
+import app
+run_simple("127.0.0.1", int(sys.argv[1]), app.server, threaded=True)
+"""
+
+# Width in pixels of the overview image picked from its srcset
+IMAGE_WIDTH = 1280
+
+
+def next_sequence(ranges, sequence):
+    if not sequence:
+        return {"page": f"{random.getrandbits(64):016x}", "number": 1}
+    return {"page": sequence["page"], "number": sequence["number"] + 1}
+
+
+# Python equivalents of the functions in assets/clientside.js whose outputs
+# are inputs of server callbacks, called with the values of the inputs and
+# state of their callback
+CLIENTSIDE_FUNCTIONS = {
+    "next_sequence": next_sequence,
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Load test the app with simulated users replaying sessions"
+    )
+    parser.add_argument(
+        "--users",
+        nargs="+",
+        type=int,
+        default=[1, 10, 50],
+        help="Numbers of concurrent users to test, one after the other",
+    )
+    parser.add_argument(
+        "--duration", type=float, default=30, help="Seconds per number of users"
+    )
+    parser.add_argument(
+        "--think-time",
+        type=float,
+        default=1.0,
+        help="Factor on the waits in the sessions; 0 replays them without pauses",
+    )
+    parser.add_argument("--sessions", default=SESSIONS, help="Glob of session scripts")
+    parser.add_argument("--server", choices=["uwsgi", "werkzeug"])
+    parser.add_argument("--processes", type=int, help="Overrides app.ini for uwsgi")
+    parser.add_argument("--url", help="Test a running server instead of starting one")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument(
+        "--compare",
+        help="Compare against results from an earlier run and exit with an"
+        " error if any p95 latency regressed by more than --threshold",
+    )
+    parser.add_argument("--threshold", type=float, default=1.2)
+    return parser.parse_args()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def uwsgi_command(port, processes=None, metrics_dir=None, ini_path="app.ini"):
+    """uwsgi command line with the options of ``ini_path``, serving HTTP on ``port``."""
+    command = ["uwsgi"]
+    with open(ini_path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith(("#", ";", "[")):
+                continue
+            key, _, value = (part.strip() for part in line.partition("="))
+            if key in UWSGI_SKIP_OPTIONS:
+                continue
+            if key == "processes" and processes:
+                value = str(processes)
+            if key == "env" and value.startswith("PROMETHEUS_MULTIPROC_DIR="):
+                # Not shared with a deployment on the same machine
+                value = f"PROMETHEUS_MULTIPROC_DIR={metrics_dir}"
+            command += [f"--{key}", value]
+    return command + ["--http-socket", f"127.0.0.1:{port}"]
+
+
+class Server:
+    """The app started on localhost in a child process, until ``stop``."""
+
+    def __init__(self, kind, processes=None):
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._tmp_dir = tempfile.mkdtemp()
+        if kind == "uwsgi":
+            command = uwsgi_command(self.port, processes, self._tmp_dir)
+        else:
+            command = [sys.executable, "-c", WERKZEUG_SERVER, str(self.port)]
+        self.process = subprocess.Popen(
+            command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+
+    def wait_ready(self, timeout=300):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Server exited with code {self.process.returncode}")
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+                conn.request("GET", "/")
+                status = conn.getresponse().status
+                conn.close()
+                if status == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.5)
+        raise RuntimeError(f"Server not ready after {timeout} s")
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
+
+
+def _accept_encoding():
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        return "gzip"
+    return "br, gzip"
+
+
+def _decode(response, body):
+    encoding = response.getheader("Content-Encoding")
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    if encoding == "br":
+        import brotli
+
+        return brotli.decompress(body)
+    return body
+
+
+class Recorder:
+    """Latencies of all requests made until ``deadline``, by name."""
+
+    def __init__(self, deadline):
+        self.deadline = deadline
+        self.latencies = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, started, latency, error):
+        if started > self.deadline:
+            return
+        with self._lock:
+            if error:
+                self.errors[name] = self.errors.get(name, 0) + 1
+            else:
+                self.latencies.setdefault(name, []).append(latency)
+
+
+class Client:
+    """HTTP client of one user, on one keep-alive connection."""
+
+    def __init__(self, url, recorder):
+        parsed = urllib.parse.urlsplit(url)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self.prefix = parsed.path.rstrip("/")
+        self.recorder = recorder
+        self.accept_encoding = _accept_encoding()
+        self.conn = None
+
+    def request(self, name, method, path, body=None):
+        """Response status and decoded body, or None on a connection error."""
+        headers = {"Accept-Encoding": self.accept_encoding}
+        if body is not None:
+            body = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        started = time.monotonic()
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            self.conn.request(method, self.prefix + path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            data = _decode(response, response.read())
+        except (OSError, http.client.HTTPException):
+            self.recorder.record(name, started, None, True)
+            self.close()
+            return None, None
+        latency = time.monotonic() - started
+        self.recorder.record(name, started, latency, response.status >= 400)
+        return response.status, data
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def _parse_id(id_):
+    # Pattern-matching ids are given as JSON in the callback specs
+    return json.loads(id_) if id_.startswith("{") else id_
+
+
+def _key(id_):
+    # Same as the string ids of Dash, e.g. in changedPropIds
+    if isinstance(id_, dict):
+        return json.dumps(id_, sort_keys=True, separators=(",", ":"))
+    return id_
+
+
+def _matches(pattern, id_):
+    if not isinstance(pattern, dict):
+        return pattern == id_
+    return (
+        isinstance(id_, dict)
+        and id_.keys() == pattern.keys()
+        and all(v == ["ALL"] or id_[k] == v for k, v in pattern.items())
+    )
+
+
+def _overlap(a, b):
+    # Whether the ids or patterns ``a`` and ``b`` match a common id
+    if not isinstance(a, dict) or not isinstance(b, dict):
+        return a == b
+    return a.keys() == b.keys() and all(
+        a[k] == b[k] or ["ALL"] in (a[k], b[k]) for k in a
+    )
+
+
+class Callback:
+    """
+    A server-side callback, or an emulated clientside one, as listed by
+    /_dash-dependencies.
+
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        clientside = spec.get("clientside_function")
+        self.function = (
+            CLIENTSIDE_FUNCTIONS[clientside["function_name"]] if clientside else None
+        )
+        parts = spec["output"]
+        parts = parts[2:-2].split("...") if parts.startswith("..") else [parts]
+        self.multi = len(parts) > 1
+        self.outputs = []
+        for part in parts:
+            id_, prop = part.rsplit(".", 1)
+            self.outputs.append((_parse_id(id_), prop))
+        self.inputs = [(_parse_id(i["id"]), i["property"]) for i in spec["inputs"]]
+        self.state = [(_parse_id(s["id"]), s["property"]) for s in spec["state"]]
+        first_id, first_prop = self.outputs[0]
+        name = first_id["type"] if isinstance(first_id, dict) else first_id
+        self.name = f"callback {name}.{first_prop}"
+
+    def feeds(self, other):
+        """Whether any output of this callback is an input of ``other``."""
+        return any(
+            prop == other_prop and _overlap(id_, other_id)
+            for id_, prop in self.outputs
+            for other_id, other_prop in other.inputs
+        )
+
+    def depends_on(self, key, prop):
+        return any(
+            p == prop and _matches(pattern, _parse_id(key))
+            for pattern, p in self.inputs
+        )
+
+
+class Browser:
+    """
+    The page state of one user, which it changes as the Dash renderer
+    would, calling the callbacks that each change triggers.
+
+    """
+
+    def __init__(self, client, callbacks, rng):
+        self.client = client
+        self.callbacks = callbacks
+        self.rng = rng
+        self.props = {}
+        self.ids = []
+
+    def _add_components(self, node):
+        # Records the ids and props of the components in a layout
+        if isinstance(node, list):
+            for child in node:
+                self._add_components(child)
+        elif isinstance(node, dict):
+            props = node.get("props")
+            if isinstance(props, dict):
+                if "id" in props:
+                    key = _key(props["id"])
+                    if key not in self.ids:
+                        self.ids.append(key)
+                    for prop, value in props.items():
+                        if prop not in ("id", "children"):
+                            self.props[(key, prop)] = value
+                self._add_components(props.get("children"))
+
+    def _values(self, specs):
+        values = []
+        for pattern, prop in specs:
+            if isinstance(pattern, dict):
+                values.append(
+                    [
+                        {"id": _parse_id(key), "property": prop,
+                         "value": self.props.get((key, prop))}
+                        for key in self.ids
+                        if _matches(pattern, _parse_id(key))
+                    ]
+                )
+            else:
+                values.append(
+                    {"id": pattern, "property": prop,
+                     "value": self.props.get((pattern, prop))}
+                )
+        return values
+
+    def _outputs(self, callback):
+        outputs = []
+        for pattern, prop in callback.outputs:
+            if isinstance(pattern, dict):
+                outputs.append(
+                    [
+                        {"id": _parse_id(key), "property": prop}
+                        for key in self.ids
+                        if _matches(pattern, _parse_id(key))
+                    ]
+                )
+            else:
+                outputs.append({"id": pattern, "property": prop})
+        return outputs if callback.multi else outputs[0]
+
+    def _on_page(self, callback):
+        return all(
+            isinstance(id_, dict) or id_ in self.ids for id_, _ in callback.inputs
+        ) and any(
+            _matches(id_, _parse_id(key))
+            for id_, _ in callback.outputs
+            for key in self.ids
+        )
+
+    def call(self, callback, changed):
+        """Call ``callback`` for the ``changed`` props; return those it updates."""
+        if callback.function is not None:
+            return self.call_clientside(callback)
+        status, data = self.client.request(
+            callback.name,
+            "POST",
+            "/_dash-update-component",
+            {
+                "output": callback.spec["output"],
+                "outputs": self._outputs(callback),
+                "inputs": self._values(callback.inputs),
+                "state": self._values(callback.state),
+                "changedPropIds": [f"{key}.{prop}" for key, prop in changed],
+            },
+        )
+        if status != 200:
+            return []
+        updated = []
+        for key, props in json.loads(data)["response"].items():
+            for prop, value in props.items():
+                # Patches only change figures, which no callback reads
+                if not (isinstance(value, dict) and "__dash_patch_update" in value):
+                    self.props[(key, prop)] = value
+                self._add_components(value)
+                updated.append((key, prop))
+        return updated
+
+    def call_clientside(self, callback):
+        args = [
+            [v["value"] for v in value] if isinstance(value, list) else value["value"]
+            for value in self._values(callback.inputs + callback.state)
+        ]
+        result = callback.function(*args)
+        if not callback.multi:
+            result = [result]
+        updated = []
+        for (id_, prop), value in zip(callback.outputs, result):
+            self.props[(_key(id_), prop)] = value
+            updated.append((_key(id_), prop))
+        return updated
+
+    def dispatch(self, pending):
+        """
+        Call the callbacks in ``pending``, a dict of callback to the props
+        that triggered it, and all callbacks that their outputs trigger, each
+        only after the pending callbacks that it takes inputs from.
+
+        """
+        images = set()
+        while pending:
+            ready = [
+                cb
+                for cb in pending
+                if not any(other.feeds(cb) for other in pending if other is not cb)
+            ] or list(pending)
+            callback = ready[0]
+            changed = pending.pop(callback)
+            for key, prop in self.call(callback, changed):
+                if key.startswith("overview-image"):
+                    images.add(key)
+                for cb in self.callbacks:
+                    if cb is not callback and cb.depends_on(key, prop):
+                        pending.setdefault(cb, []).append((key, prop))
+        for key in sorted(images):
+            self.fetch_image(key)
+
+    def change(self, id_, prop, value):
+        key = _key(id_)
+        self.props[(key, prop)] = value
+        self.dispatch(
+            {cb: [(key, prop)] for cb in self.callbacks if cb.depends_on(key, prop)}
+        )
+
+    def fetch_image(self, key):
+        srcset = self.props.get((key, "srcSet"))
+        src = self.props.get((key, "src"))
+        if srcset:
+            # The smallest variant at least as wide as the image is shown
+            candidates = sorted(
+                (int(w.rstrip("w")), url)
+                for url, w in (c.strip().split() for c in srcset.split(","))
+            )
+            wide_enough = [url for width, url in candidates if width >= IMAGE_WIDTH]
+            src = wide_enough[0] if wide_enough else candidates[-1][1]
+        if src:
+            self.client.request("image", "GET", "/" + src.lstrip("/"))
+
+    def visit(self, search, first):
+        """Open the page at ``search``, with its static files if ``first``."""
+        self.props, self.ids = {}, []
+        status, index = self.client.request("GET /", "GET", "/" + search)
+        if status != 200:
+            return
+        if first:
+            # Later visits load them from the browser cache
+            for path in re.findall(r'(?:src|href)="(/[^/"][^"]*)"', index.decode()):
+                self.client.request("static", "GET", path)
+        _, layout = self.client.request("GET /_dash-layout", "GET", "/_dash-layout")
+        self.client.request(
+            "GET /_dash-dependencies", "GET", "/_dash-dependencies"
+        )
+        if layout is None:
+            return
+        self._add_components(json.loads(layout))
+        self.props[("url", "href")] = "http://localhost/" + search
+        self.props[("url", "search")] = search
+        # On load, every callback is called whose inputs and outputs are on
+        # the page, which adds the components of the page layout and so on
+        called = set()
+        while True:
+            initial = {
+                cb: []
+                for cb in self.callbacks
+                if cb not in called
+                and not cb.spec["prevent_initial_call"]
+                and self._on_page(cb)
+            }
+            if not initial:
+                break
+            called.update(initial)
+            self.dispatch(initial)
+
+
+def run_session(browser, session, spore_ids, think_time, first, deadline):
+    for step in session["steps"]:
+        if time.monotonic() > deadline:
+            return
+        action = step["action"]
+        if action == "visit":
+            browser.visit(step.get("search", ""), first)
+        elif action == "drag":
+            slider = {"type": "slider", "index": step["dimension"]}
+            if _key(slider) not in browser.ids:
+                continue
+            for value in step["values"]:
+                browser.change(slider, "value", value)
+        elif action == "click":
+            spore = step.get("spore", "random")
+            if spore == "random":
+                spore = browser.rng.choice(spore_ids)
+            click = {"points": [{"curveNumber": 1, "customdata": spore}]}
+            browser.change("spores-scatter", "clickData", click)
+        elif action == "select":
+            count = min(step["count"], len(spore_ids))
+            selected = browser.rng.sample(spore_ids, count)
+            browser.change("selected-spores", "data", selected)
+        elif action == "reset":
+            n_clicks = (browser.props.get(("reset-sliders", "n_clicks")) or 0) + 1
+            browser.change("reset-sliders", "n_clicks", n_clicks)
+        elif action == "set":
+            browser.change(_parse_id(step["id"]), step["property"], step["value"])
+        elif action == "wait":
+            time.sleep(step["seconds"] * think_time)
+        else:
+            raise ValueError(f"Unknown action {action!r} in session {session['name']}")
+
+
+def user(index, url, callbacks, sessions, spore_ids, args, recorder, deadline):
+    client = Client(url, recorder)
+    browser = Browser(client, callbacks, random.Random(args.seed + index))
+    first = True
+    i = index
+    while time.monotonic() < deadline:
+        session = sessions[i % len(sessions)]
+        run_session(browser, session, spore_ids, args.think_time, first, deadline)
+        first = False
+        i += 1
+    client.close()
+
+
+def percentile(values, q):
+    # Nearest rank
+    values = sorted(values)
+    return values[max(0, min(len(values) - 1, round(q / 100 * len(values)) - 1))]
+
+
+def run_level(url, n_users, callbacks, sessions, spore_ids, args):
+    start = time.monotonic()
+    deadline = start + args.duration
+    recorder = Recorder(deadline)
+    threads = [
+        threading.Thread(
+            target=user,
+            args=(i, url, callbacks, sessions, spore_ids, args, recorder, deadline),
+            daemon=True,
+        )
+        for i in range(n_users)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = max(args.duration, 1e-9)
+
+    requests = {}
+    for name in sorted(set(recorder.latencies) | set(recorder.errors)):
+        latencies = recorder.latencies.get(name, [])
+        requests[name] = {
+            "count": len(latencies),
+            "errors": recorder.errors.get(name, 0),
+            "throughput_rps": len(latencies) / elapsed,
+            **{
+                f"p{q}_s": percentile(latencies, q) if latencies else None
+                for q in (50, 95, 99)
+            },
+        }
+    total = sum(r["count"] for r in requests.values())
+    return {
+        "users": n_users,
+        "duration_s": args.duration,
+        "throughput_rps": total / elapsed,
+        "errors": sum(r["errors"] for r in requests.values()),
+        "requests": requests,
+    }
+
+
+def print_level(result):
+    print(
+        f"{result['users']} users: {result['throughput_rps']:.1f} requests/s,"
+        f" {result['errors']} errors"
+    )
+    print(
+        f"  {'request':<36} {'count':>7} {'errors':>6} {'req/s':>8}"
+        f" {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    )
+    for name, r in result["requests"].items():
+        quantiles = "".join(
+            f" {r[f'p{q}_s'] * 1000:9.1f}" if r[f"p{q}_s"] is not None else " " * 10
+            for q in (50, 95, 99)
+        )
+        print(
+            f"  {name:<36} {r['count']:>7} {r['errors']:>6}"
+            f" {r['throughput_rps']:>8.1f}{quantiles}"
+        )
+
+
+def load_sessions(pattern):
+    sessions = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path, "r") as f:
+            sessions.append(json.load(f))
+    if not sessions:
+        raise SystemExit(f"No session scripts match {pattern}")
+    return sessions
+
+
+def run(args, url):
+    sessions = load_sessions(args.sessions)
+    recorder = Recorder(float("inf"))
+    client = Client(url, recorder)
+    _, dependencies = client.request("", "GET", "/_dash-dependencies")
+    callbacks = [
+        Callback(spec)
+        for spec in json.loads(dependencies)
+        if not spec.get("clientside_function")
+        or spec["clientside_function"]["function_name"] in CLIENTSIDE_FUNCTIONS
+    ]
+    # The ids of all SPORES, to pick from for clicks and selections
+    _, body = client.request("", "POST", "/api/filter", {"queries": [{}]})
+    spore_ids = json.loads(body)["ids"][0]
+    client.close()
+
+    results = []
+    for n_users in args.users:
+        result = run_level(url, n_users, callbacks, sessions, spore_ids, args)
+        results.append(result)
+        print_level(result)
+    return results
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path, "r") as f:
+        baseline = {r["users"]: r for r in json.load(f)["results"]}
+    regressions = []
+    for r in results:
+        old = baseline.get(r["users"])
+        if old is None:
+            continue
+        for name, request in r["requests"].items():
+            old_request = old["requests"].get(name)
+            if not old_request or not old_request["p95_s"] or not request["p95_s"]:
+                continue
+            ratio = request["p95_s"] / old_request["p95_s"]
+            print(f"{name:<36} users={r['users']:<5} p95 {ratio:6.2f}x")
+            if ratio > threshold:
+                regressions.append((r["users"], name))
+    return regressions
+
+
+def main():
+    args = parse_args()
+
+    server = None
+    url = args.url
+    kind = None
+    if url is None:
+        kind = args.server or ("uwsgi" if shutil.which("uwsgi") else "werkzeug")
+        print(f"Starting the app with {kind} ...")
+        server = Server(kind, args.processes)
+        url = server.url
+    try:
+        if server is not None:
+            server.wait_ready()
+        results = run(args, url)
+    finally:
+        if server is not None:
+            server.stop()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "metadata": dict(metadata(), url=args.url, server=kind),
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {args.threshold}x")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark of the Pareto front computation in pareto.py at large sizes.
+
+Fronts are computed on random indicator values for each number of SPORES
+and of objectives, and compared against a plain pairwise dominance check
+for the sizes where that is still feasible. Run from the repository root::
+
+    python -m benchmarks.pareto --sizes 1e4 1e5 1e6 1e7 --objectives 2 3 5
+
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+import numpy as np
+
+import pareto
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the Pareto front computation"
+    )
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=lambda x: int(float(x)),
+        default=[10**3, 10**4, 10**5, 10**6],
+    )
+    parser.add_argument("--objectives", nargs="+", type=int, default=[2, 3, 5])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--pairwise-max",
+        type=lambda x: int(float(x)),
+        default=5 * 10**3,
+        help="Largest size to also run the pairwise check for (default: 5e3)",
+    )
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    return parser.parse_args()
+
+
+def pairwise_front(values):
+    """Reference implementation, comparing every row with every other row."""
+    on_front = np.ones(len(values), dtype=bool)
+    for i, row in enumerate(values):
+        dominated_by = (values <= row).all(axis=1) & (values < row).any(axis=1)
+        on_front[i] = not dominated_by.any()
+    return on_front
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def run(args):
+    rng = np.random.default_rng(args.seed)
+    results = []
+    for n in args.sizes:
+        for d in args.objectives:
+            # Correlated indicators give smaller fronts than independent ones,
+            # as in the real data
+            base = rng.beta(2, 2, size=(n, 1))
+            values = 0.5 * base + 0.5 * rng.beta(2, 2, size=(n, d))
+            latencies = []
+            for _ in range(args.repeats):
+                latency, on_front = timed(pareto.pareto_front, values)
+                latencies.append(latency)
+            result = {
+                "n_spores": n,
+                "n_objectives": d,
+                "front_size": int(on_front.sum()),
+                "latency_median_s": statistics.median(latencies),
+            }
+            if n <= args.pairwise_max:
+                latency, expected = timed(pairwise_front, values)
+                result["pairwise_latency_s"] = latency
+                result["matches_pairwise"] = bool((expected == on_front).all())
+            results.append(result)
+            print(
+                f"n={n:<10} objectives={d:<3} front={result['front_size']:<8} "
+                f"median={result['latency_median_s'] * 1000:10.2f} ms"
+                + (
+                    f"  pairwise={result['pairwise_latency_s'] * 1000:10.2f} ms"
+                    f"  matches={result['matches_pairwise']}"
+                    if "pairwise_latency_s" in result
+                    else ""
+                )
+            )
+    return results
+
+
+def main():
+    args = parse_args()
+    results = run(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
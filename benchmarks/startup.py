@@ -0,0 +1,210 @@
+"""
+Benchmark of the cold start of an app worker, with and without FAST_START.
+
+Each run starts a fresh Python process, which imports app.py under
+``-X importtime`` and then makes the first requests a browser makes to a
+new worker: the index page, the layout and callback list, the page layout
+and the first filter callbacks. Reported are the import time (with the
+packages slowest to import), the latency of each first request and the
+total time until the worker has answered all of them.
+
+Run from the repository root::
+
+    python -m benchmarks.startup --output startup.json
+    python -m benchmarks.startup --compare startup.json
+
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.callbacks import metadata
+
+# Run in the child process; prints the timings as JSON on its last line
+CHILD = """
+import json, time
+
+start = time.perf_counter()
+import app
+timings = {"import": time.perf_counter() - start}
+
+client = app.server.test_client()
+# Pattern-matching inputs and outputs are sent as one list of all matches
+sliders = [
+    [
+        {"id": {"type": "slider", "index": id_}, "property": "value", "value": [0, 1]}
+        for id_ in app.COLS
+    ]
+]
+histograms = [
+    {"id": {"type": "histogram", "index": id_}, "property": "figure"}
+    for id_ in app.COLS
+]
+session = [{"id": "session-id", "property": "data", "value": "benchmark"}]
+sequence = [
+    {
+        "id": "filter-sequence",
+        "property": "data",
+        "value": {"page": "benchmark", "number": 1},
+    }
+]
+
+def update(output, outputs, inputs, state=()):
+    return client.post(
+        "/_dash-update-component",
+        json={
+            "output": output,
+            "outputs": outputs,
+            "inputs": inputs,
+            "state": list(state),
+            "changedPropIds": [],
+        },
+    )
+
+requests = {
+    "/": lambda: client.get("/"),
+    "/_dash-layout": lambda: client.get("/_dash-layout"),
+    "/_dash-dependencies": lambda: client.get("/_dash-dependencies"),
+    "page_load": lambda: update(
+        "page-layout.children",
+        {"id": "page-layout", "property": "children"},
+        [{"id": "url", "property": "href", "value": "http://localhost/"}],
+    ),
+}
+if not app.CLIENTSIDE_FILTERING:
+    requests["update_figure"] = lambda: update(
+        "..figure-points.data...num-results.children..",
+        [
+            {"id": "figure-points", "property": "data"},
+            {"id": "num-results", "property": "children"},
+        ],
+        [{"id": "pareto-objectives", "property": "value", "value": None}] + sequence,
+        sliders + session,
+    )
+    requests["update_histograms"] = lambda: update(
+        '{"index":["ALL"],"type":"histogram"}.figure',
+        histograms,
+        sequence,
+        sliders + session,
+    )
+for name, request in requests.items():
+    start = time.perf_counter()
+    response = request()
+    timings[name] = time.perf_counter() - start
+    assert response.status_code in (200, 204), (name, response.status_code)
+
+print(json.dumps(timings))
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the cold start of an app worker"
+    )
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument(
+        "--top", type=int, default=10, help="Number of slowest packages to report"
+    )
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument(
+        "--compare",
+        help="Compare against results from an earlier run and exit with an"
+        " error if any median time until ready regressed by more than --threshold",
+    )
+    parser.add_argument("--threshold", type=float, default=1.2)
+    return parser.parse_args()
+
+
+def parse_importtime(stderr):
+    """Import time in seconds of each top-level package, without its imports."""
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, _, name = line[len("import time:") :].split("|")
+        package = name.strip().split(".")[0]
+        imports[package] = imports.get(package, 0) + int(self_us) / 1e6
+    return imports
+
+
+def cold_start(fast_start):
+    env = dict(os.environ, FAST_START="1" if fast_start else "0")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = json.loads(result.stdout.splitlines()[-1])
+    return timings, parse_importtime(result.stderr)
+
+
+def run(args):
+    results = []
+    for fast_start in [False, True]:
+        if fast_start:
+            # Writes the startup artifact, as a deployment would ahead of time
+            cold_start(True)
+        runs = [cold_start(fast_start) for _ in range(args.repeats)]
+        names = list(runs[0][0])
+        timings = {
+            name: statistics.median(timings[name] for timings, _ in runs)
+            for name in names
+        }
+        ready = statistics.median(sum(timings.values()) for timings, _ in runs)
+        imports = runs[0][1]
+        slowest = sorted(imports.items(), key=lambda item: -item[1])[: args.top]
+        result = {
+            "fast_start": fast_start,
+            "ready_median_s": ready,
+            "timings_median_s": timings,
+            "slowest_packages_s": dict(slowest),
+        }
+        results.append(result)
+
+        print(f"FAST_START={int(fast_start)}: ready after {ready * 1000:.0f} ms")
+        for name, seconds in timings.items():
+            print(f"  {name:<25} {seconds * 1000:9.2f} ms")
+        print("  slowest packages to import:")
+        for name, seconds in slowest:
+            print(f"    {name:<23} {seconds * 1000:9.2f} ms")
+    return results
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path, "r") as f:
+        baseline = {r["fast_start"]: r for r in json.load(f)["results"]}
+    regressions = []
+    for r in results:
+        old = baseline.get(r["fast_start"])
+        if old is None:
+            continue
+        ratio = r["ready_median_s"] / old["ready_median_s"]
+        print(f"FAST_START={int(r['fast_start'])} {ratio:6.2f}x")
+        if ratio > threshold:
+            regressions.append(r)
+    return regressions
+
+
+def main():
+    args = parse_args()
+    results = run(args)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"metadata": metadata(), "results": results}, f, indent=2)
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {args.threshold}x")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
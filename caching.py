@@ -0,0 +1,245 @@
+import collections
+import math
+import os
+import sqlite3
+import threading
+import time
+
+# Errors from a store that cannot be reached, e.g. because its directory is
+# not writable, or from a failed query
+STORE_ERRORS = (sqlite3.Error, OSError)
+
+
+class SQLiteStore:
+    """
+    Base for state stored in a local SQLite file, and so shared between all
+    worker processes on the same machine.
+
+    A store that cannot be reached acts as if it were empty, so it can never
+    break the request it is used in.
+
+    """
+
+    def __init__(self, path, timeout=1.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        # Connections must neither be shared between threads nor survive a
+        # fork, so keep one per thread and process
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, timeout=self.timeout, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _execute(self, *args):
+        try:
+            return self._connection().execute(*args).fetchall()
+        except STORE_ERRORS:
+            return None
+
+    def _transaction(self, func):
+        """
+        Run ``func`` with the connection in a write transaction and return
+        its result, or None if the store cannot be reached or the transaction
+        fails.
+
+        """
+        conn = None
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            result = func(conn)
+            conn.execute("COMMIT")
+            return result
+        except STORE_ERRORS:
+            if conn is not None and conn.in_transaction:
+                try:
+                    conn.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass
+            return None
+
+
+# Number of the oldest entries looked up at a time for eviction
+EVICTION_BATCH = 16
+
+
+class SharedLRUCache(SQLiteStore):
+    """
+    Least-recently-used cache of byte strings stored in a local SQLite file,
+    so that it is shared between all worker processes on the same machine.
+
+    Entries are evicted, oldest access first, once the total size of all
+    stored values exceeds ``max_bytes``. The total is kept in a row of its
+    own, so that a write never scans all entries while it holds the write
+    lock shared by all workers. Any database error (e.g. a lock held for too
+    long by another worker) is treated as a cache miss, so the cache can
+    never break the request it is used in.
+
+    The access time of an entry is only updated on a hit once it is older
+    than ``touch_interval`` seconds, so that most hits are reads only and do
+    not wait for the write lock.
+
+    """
+
+    def __init__(self, path, max_bytes, timeout=1.0, touch_interval=60.0):
+        super().__init__(path, timeout=timeout)
+        self.max_bytes = max_bytes
+        self.touch_interval = touch_interval
+        self._execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY,"
+            " value BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)")
+        self._execute(
+            "CREATE TABLE IF NOT EXISTS meta ("
+            " name TEXT PRIMARY KEY,"
+            " value INTEGER NOT NULL)"
+        )
+        # Counted once for stores written before the total was kept
+        self._execute(
+            "INSERT OR IGNORE INTO meta (name, value)"
+            " SELECT 'total_size', COALESCE(SUM(size), 0) FROM cache"
+        )
+
+    def get(self, key):
+        rows = self._execute("SELECT value, accessed FROM cache WHERE key = ?", (key,))
+        if not rows:
+            return None
+        value, accessed = rows[0]
+        now = time.time()
+        if now - accessed > self.touch_interval:
+            self._execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+        return value
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        self._transaction(lambda conn: self._insert(conn, key, value))
+
+    def _insert(self, conn, key, value):
+        row = conn.execute(
+            "SELECT value FROM meta WHERE name = 'total_size'"
+        ).fetchone()
+        if row is None:
+            # The store could not be reached when it was created
+            row = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()
+        (total,) = row
+        replaced = conn.execute("SELECT size FROM cache WHERE key = ?", (key,))
+        for (size,) in replaced.fetchall():
+            total -= size
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, size, accessed)"
+            " VALUES (?, ?, ?, ?)",
+            (key, value, len(value), time.time()),
+        )
+        total += len(value)
+        while total > self.max_bytes:
+            oldest = conn.execute(
+                "SELECT key, size FROM cache ORDER BY accessed LIMIT ?",
+                (EVICTION_BATCH,),
+            ).fetchall()
+            if not oldest:
+                # Only if the total was out of step with the entries
+                total = 0
+                break
+            for old_key, size in oldest:
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM cache WHERE key = ?", (old_key,))
+                total -= size
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (name, value) VALUES ('total_size', ?)",
+            (total,),
+        )
+
+    def clear(self):
+        def clear(conn):
+            conn.execute("DELETE FROM cache")
+            conn.execute("UPDATE meta SET value = 0 WHERE name = 'total_size'")
+
+        self._transaction(clear)
+
+
+def range_steps(range_, step):
+    """
+    Bounds of ``range_`` widened outwards to the nearest multiples of
+    ``step``, as numbers of steps.
+
+    """
+    # Round first so that float noise such as 0.30000000000000004
+    # does not push an on-grid value to the next step
+    low = round(range_[0] / step, 6)
+    high = round(range_[1] / step, 6)
+    return math.floor(low), math.ceil(high)
+
+
+def quantize_range(range_, step):
+    """
+    Widen ``range_`` outwards to the nearest multiples of ``step``.
+
+    Slider values set by dragging already lie on the step grid and are left
+    unchanged; only off-grid values (such as the data-derived defaults) are
+    snapped, without ever excluding a value that was inside the range.
+
+    """
+    low, high = range_steps(range_, step)
+    return [round(low * step, 10), round(high * step, 10)]
+
+
+class LocalLRUCache:
+    """
+    Least-recently-used cache of arbitrary objects in the memory of the
+    current process, for state that is too large or changes too often to
+    go through ``SharedLRUCache``.
+
+    If ``max_bytes`` is given, items are also evicted once the total of
+    their ``nbytes`` exceeds it, and an item larger than that is not kept.
+
+    """
+
+    def __init__(self, maxsize, max_bytes=None):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._items = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def _size(self, value):
+        return value.nbytes if self.max_bytes is not None else 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        size = self._size(value)
+        with self._lock:
+            if key in self._items:
+                self.nbytes -= self._size(self._items.pop(key))
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._items[key] = value
+            self.nbytes += size
+            while len(self._items) > self.maxsize or (
+                self.max_bytes is not None and self.nbytes > self.max_bytes
+            ):
+                _, old = self._items.popitem(last=False)
+                self.nbytes -= self._size(old)
@@ -0,0 +1,134 @@
+"""
+Dropping of superseded callback requests.
+
+While a slider is dragged, a browser session can send many requests for the
+same callback in quick succession, and only the response to the last one
+will be shown. The browser numbers these requests in the order it sends
+them, starting over with a new random page id on each page load, and
+``RequestTracker`` keeps the highest number seen for each session and page
+in a SQLite file shared by all worker processes, so that a request can tell
+whether a newer one from the same page has arrived since, and stop working
+on it. As the numbers come from the browser, a newer request is recognised
+even if it reaches another worker before an older one.
+
+"""
+
+import contextvars
+import functools
+import random
+import time
+import uuid
+
+from dash.exceptions import PreventUpdate
+
+import caching
+
+_current_request = contextvars.ContextVar("current_request", default=None)
+_current_session = contextvars.ContextVar("current_session", default=None)
+
+
+def new_session_id():
+    return uuid.uuid4().hex
+
+
+def current_session_id():
+    """Session id of the ``latest_only`` callback being handled, if any."""
+    return _current_session.get()
+
+
+class RequestTracker(caching.SQLiteStore):
+    """
+    Tracks the latest request per session, page load and callback.
+
+    If the store cannot be reached, requests are never treated as
+    superseded, so at worst superseded work is done in full.
+
+    """
+
+    def __init__(self, path, debounce=0.0, timeout=1.0, max_age=24 * 3600):
+        super().__init__(path, timeout=timeout)
+        self.debounce = debounce
+        self.max_age = max_age
+        self._execute(
+            "CREATE TABLE IF NOT EXISTS requests ("
+            " key TEXT PRIMARY KEY,"
+            " ticket INTEGER NOT NULL,"
+            " updated REAL NOT NULL)"
+        )
+
+    def start(self, key, sequence):
+        """
+        Register a request for ``key`` with the number ``sequence`` given to
+        it by the browser, and return its ticket.
+
+        """
+        now = time.time()
+
+        def register(conn):
+            conn.execute(
+                "INSERT INTO requests (key, ticket, updated) VALUES (?, ?, ?)"
+                " ON CONFLICT (key) DO UPDATE SET"
+                " ticket = MAX(ticket, excluded.ticket), updated = excluded.updated",
+                (key, sequence, now),
+            )
+            if random.random() < 0.001:
+                # Occasionally forget about sessions that have gone quiet
+                conn.execute(
+                    "DELETE FROM requests WHERE updated < ?", (now - self.max_age,)
+                )
+            return sequence
+
+        return self._transaction(register)
+
+    def is_superseded(self, key, ticket):
+        # Requests with the same number are for the same slider ranges, e.g.
+        # after a change of another input, and are never superseded
+        if ticket is None:
+            return False
+        rows = self._execute("SELECT ticket FROM requests WHERE key = ?", (key,))
+        return bool(rows) and rows[0][0] > ticket
+
+    def check(self):
+        """
+        Raise PreventUpdate if the callback request being handled has been
+        superseded. Does nothing outside a ``latest_only`` callback.
+
+        """
+        request = _current_request.get()
+        if request is not None and self.is_superseded(*request):
+            raise PreventUpdate
+
+    def latest_only(self, func):
+        """
+        Wrap the callback ``func`` so that it takes the sequence of the
+        request and the session id as two additional last arguments, and is
+        dropped as soon as it is superseded by a request with a higher number
+        from the same page load. The sequence is a dict with the ``page`` id
+        and the ``number`` of the request within the page load. ``func`` can
+        call ``check()`` between expensive steps to stop early.
+
+        """
+
+        @functools.wraps(func)
+        def wrapper(*args):
+            *args, sequence, session_id = args
+            if session_id is None or not sequence:
+                return func(*args)
+
+            # The numbers start over on each page load, e.g. after going back
+            # in the history of the browser, within the same session
+            key = f"{func.__name__}:{session_id}:{sequence['page']}"
+            ticket = self.start(key, sequence["number"])
+            if self.debounce:
+                # Give newer requests from the same burst a chance to arrive
+                time.sleep(self.debounce)
+            token = _current_request.set((key, ticket))
+            session_token = _current_session.set(session_id)
+            try:
+                self.check()
+                return func(*args)
+            finally:
+                _current_session.reset(session_token)
+                _current_request.reset(token)
+
+        return wrapper
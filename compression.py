@@ -0,0 +1,189 @@
+"""
+Brotli or gzip compression of responses, whichever the client accepts.
+
+Callback and API responses are compressed as they are sent. Static files,
+i.e. the assets and the Dash component bundles, are compressed once per
+worker and kept in memory, unless a compressed copy of them was built ahead
+of time with::
+
+    python compression.py
+
+which writes Brotli and gzip copies of every file in assets/, compressed at
+the highest level, to build/assets. Brotli needs the optional brotli
+package; without it, responses are compressed with gzip only.
+
+"""
+
+import argparse
+import gzip
+import mimetypes
+import os
+
+import flask
+from werkzeug.security import safe_join
+
+import caching
+
+SOURCE_DIR = "./assets"
+BUILD_DIR = os.environ.get("COMPRESSED_ASSETS_DIR", "./build/assets")
+
+# Smaller responses are sent as they are, as compressing them saves little
+MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", 1024))
+# Number of compressed static files kept in memory by each worker
+STATIC_CACHE_SIZE = int(os.environ.get("COMPRESSION_STATIC_CACHE_SIZE", 64))
+
+MIMETYPES = {
+    "application/javascript",
+    "application/json",
+    "image/svg+xml",
+    "text/css",
+    "text/html",
+    "text/javascript",
+    "text/plain",
+}
+EXTENSIONS = {"br": ".br", "gzip": ".gz"}
+
+# Compression levels for responses compressed as they are sent, for static
+# files compressed once per worker, and for copies built ahead of time
+DYNAMIC_LEVELS = {"br": 4, "gzip": 6}
+STATIC_LEVELS = {"br": 9, "gzip": 9}
+BUILD_LEVELS = {"br": 11, "gzip": 9}
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def encodings():
+    """Supported encodings, most preferred first."""
+    return ["br", "gzip"] if _brotli() is not None else ["gzip"]
+
+
+def compress(data, encoding, level):
+    if encoding == "br":
+        return _brotli().compress(data, quality=level)
+    # Without a timestamp, the same data always gives the same bytes
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def build(src_dir=SOURCE_DIR, out_dir=BUILD_DIR):
+    """
+    Write compressed copies of the files in ``src_dir`` that changed since
+    the last build to ``out_dir``, and return the number written.
+
+    """
+    built = 0
+    for root, _, file_names in os.walk(src_dir):
+        for file_name in file_names:
+            path = os.path.join(root, file_name)
+            mimetype = mimetypes.guess_type(file_name)[0]
+            if mimetype not in MIMETYPES or os.path.getsize(path) < MIN_SIZE:
+                continue
+            with open(path, "rb") as f:
+                data = f.read()
+            rel_path = os.path.relpath(path, src_dir)
+            os.makedirs(os.path.join(out_dir, os.path.dirname(rel_path)), exist_ok=True)
+            for encoding in encodings():
+                out_path = os.path.join(out_dir, rel_path + EXTENSIONS[encoding])
+                if _is_current(out_path, path):
+                    continue
+                tmp_path = out_path + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(compress(data, encoding, BUILD_LEVELS[encoding]))
+                os.replace(tmp_path, out_path)
+                built += 1
+    return built
+
+
+def _is_current(out_path, source_path):
+    try:
+        return os.stat(out_path).st_mtime_ns >= os.stat(source_path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def instrument(app, build_dir=BUILD_DIR):
+    """Compress the responses of the Dash ``app`` where the client accepts it."""
+    server = app.server
+    prefix = app.config.routes_pathname_prefix
+    assets_prefix = prefix + app.config.assets_url_path.strip("/") + "/"
+    static_prefixes = (assets_prefix, prefix + "_dash-component-suites/")
+    static_cache = caching.LocalLRUCache(STATIC_CACHE_SIZE)
+
+    def prebuilt(encoding):
+        # Compressed copy of an asset from build_dir, if it is up to date
+        rel_path = flask.request.path[len(assets_prefix) :]
+        source_path = safe_join(app.config.assets_folder, rel_path)
+        out_path = safe_join(build_dir, rel_path + EXTENSIONS[encoding])
+        if source_path is None or out_path is None:
+            return None
+        if not _is_current(out_path, source_path):
+            return None
+        with open(out_path, "rb") as f:
+            return f.read()
+
+    @server.after_request
+    def compress_response(response):
+        request = flask.request
+        if (
+            response.status_code != 200
+            or response.mimetype not in MIMETYPES
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+        static = request.path.startswith(static_prefixes)
+        # Streamed responses, such as exports, are sent as they are produced
+        if response.is_streamed and not (static and response.direct_passthrough):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = request.accept_encodings.best_match(encodings())
+        if encoding is None:
+            return response
+
+        if static:
+            etag, _ = response.get_etag()
+            key = (request.path, etag, encoding)
+            data = static_cache.get(key)
+            if data is None and request.path.startswith(assets_prefix):
+                data = prebuilt(encoding)
+            if data is None:
+                # Reads the file into the response
+                response.direct_passthrough = False
+                content = response.get_data()
+                if len(content) < MIN_SIZE:
+                    return response
+                data = compress(content, encoding, STATIC_LEVELS[encoding])
+            static_cache.set(key, data)
+            if etag:
+                # Conditional requests still match the uncompressed file
+                response.set_etag(etag, weak=True)
+        else:
+            content = response.get_data()
+            if len(content) < MIN_SIZE:
+                return response
+            data = compress(content, encoding, DYNAMIC_LEVELS[encoding])
+
+        if response.direct_passthrough:
+            # The file is not read, as its compressed copy is sent instead
+            response.response.close()
+            response.direct_passthrough = False
+        response.set_data(data)
+        response.headers["Content-Encoding"] = encoding
+        # Ranges would refer to the uncompressed file
+        response.headers.pop("Accept-Ranges", None)
+        return response
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build Brotli and gzip compressed copies of the assets"
+    )
+    parser.add_argument("--src", default=SOURCE_DIR)
+    parser.add_argument("--out", default=BUILD_DIR)
+    args = parser.parse_args()
+    built = build(args.src, args.out)
+    print(f"Wrote {built} compressed files to {args.out} ({', '.join(encodings())})")
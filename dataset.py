@@ -0,0 +1,256 @@
+"""
+Loading of the SPORES dataset.
+
+The CSV files in the data directory are the source of truth. They can be
+converted once into a columnar binary copy, which is then opened through
+memory mapping instead of being parsed, so that all worker processes share
+the same pages through the OS page cache::
+
+    python dataset.py ./data
+
+The binary copy is only used while it is up to date with the CSV files it
+was converted from; otherwise the loader falls back to reading the CSVs.
+
+A running app picks up new data through a ``DatasetRegistry``, which notices
+changes to the data directory, loads the new version in the background and
+then swaps it in, without interrupting requests served from the old version.
+
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+DATA_FILE = "data.csv"
+UNITS_FILE = "units.csv"
+COLUMNAR_DIR = "columnar"
+
+
+def _source_stat(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def source_stats(data_dir):
+    """
+    Size and modification time of the CSV files in ``data_dir``, recorded by
+    anything derived from them to tell whether it is still up to date.
+
+    """
+    return {
+        name: _source_stat(os.path.join(data_dir, name))
+        for name in [DATA_FILE, UNITS_FILE]
+    }
+
+
+def read_csv(data_dir):
+    df_spores = pd.read_csv(os.path.join(data_dir, DATA_FILE), index_col=0)
+    df_units = pd.read_csv(os.path.join(data_dir, UNITS_FILE), index_col=0)
+    return df_spores, df_units
+
+
+def convert(data_dir):
+    """
+    Write the columnar binary copy of the CSV files in ``data_dir``.
+
+    All indicator values go into a single column-major float64 matrix, so
+    that each column is one contiguous slice of the memory-mapped file.
+
+    """
+    df_spores, df_units = read_csv(data_dir)
+    non_numeric = [
+        col
+        for col, dtype in df_spores.dtypes.items()
+        if not pd.api.types.is_numeric_dtype(dtype)
+    ]
+    if non_numeric:
+        raise ValueError(f"Cannot convert non-numeric columns: {non_numeric}")
+
+    out_dir = os.path.join(data_dir, COLUMNAR_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(
+        os.path.join(out_dir, "values.npy"),
+        np.asfortranarray(df_spores.to_numpy(dtype=np.float64)),
+    )
+    np.save(os.path.join(out_dir, "index.npy"), df_spores.index.to_numpy())
+    with open(os.path.join(out_dir, "units.json"), "w") as f:
+        json.dump(json.loads(df_units.to_json(orient="split")), f)
+
+    # Written last, so that an interrupted conversion is never picked up
+    meta = {
+        "index_name": df_spores.index.name,
+        "columns": df_spores.columns.tolist(),
+        "sources": source_stats(data_dir),
+    }
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    return out_dir
+
+
+def is_stale(data_dir):
+    """
+    Whether the columnar copy is missing or was converted from CSV files
+    that have since changed.
+
+    """
+    try:
+        with open(os.path.join(data_dir, COLUMNAR_DIR, "meta.json"), "r") as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        return True
+
+    return meta["sources"] != source_stats(data_dir)
+
+
+def read_columnar(data_dir):
+    in_dir = os.path.join(data_dir, COLUMNAR_DIR)
+    with open(os.path.join(in_dir, "meta.json"), "r") as f:
+        meta = json.load(f)
+
+    values = np.load(os.path.join(in_dir, "values.npy"), mmap_mode="r")
+    index = pd.Index(np.load(os.path.join(in_dir, "index.npy")), name=meta["index_name"])
+    # copy=False keeps the DataFrame backed by the memory map
+    df_spores = pd.DataFrame(values, index=index, columns=meta["columns"], copy=False)
+
+    return df_spores, _read_columnar_units(in_dir)
+
+
+def _read_columnar_units(in_dir):
+    with open(os.path.join(in_dir, "units.json"), "r") as f:
+        units = json.load(f)
+    return pd.DataFrame(units["data"], index=units["index"], columns=units["columns"])
+
+
+def load(data_dir):
+    """
+    Return ``(df_spores, df_units)`` from the columnar copy in ``data_dir``
+    if it is up to date, otherwise from the CSV files.
+
+    """
+    if os.path.exists(os.path.join(data_dir, COLUMNAR_DIR)):
+        if not is_stale(data_dir):
+            return read_columnar(data_dir)
+        warnings.warn(
+            f"Columnar data in {data_dir} is out of date, reading CSV instead."
+            " Re-run `python dataset.py` to update it."
+        )
+    return read_csv(data_dir)
+
+
+def load_units(data_dir):
+    """Return ``df_units`` as ``load`` does, without loading the SPORES."""
+    if os.path.exists(os.path.join(data_dir, COLUMNAR_DIR)) and not is_stale(data_dir):
+        return _read_columnar_units(os.path.join(data_dir, COLUMNAR_DIR))
+    return pd.read_csv(os.path.join(data_dir, UNITS_FILE), index_col=0)
+
+
+def source_version(data_dir):
+    """
+    Version of the data in ``data_dir``, derived from the size and
+    modification time of its files, so that it is the same in every worker
+    process that sees the same files.
+
+    Files derived from the data, such as the columnar copy, are written to
+    subdirectories of ``data_dir`` together with a ``meta.json``, which is
+    written last and counts towards the version as well.
+
+    """
+    stats = source_stats(data_dir)
+    for entry in sorted(os.scandir(data_dir), key=lambda e: e.name):
+        meta_path = os.path.join(entry.path, "meta.json")
+        if entry.is_dir() and os.path.exists(meta_path):
+            stats[os.path.join(entry.name, "meta.json")] = _source_stat(meta_path)
+    return hashlib.sha1(json.dumps(stats, sort_keys=True).encode()).hexdigest()[:12]
+
+
+class Dataset:
+    """
+    One version of the SPORES data. State derived from the data is attached
+    to this object by the registry's ``prepare`` function, so that it is
+    replaced together with the data it was derived from.
+
+    """
+
+    def __init__(self, version, df_spores, df_units):
+        self.version = version
+        self.df_spores = df_spores
+        self.df_units = df_units
+
+
+class DatasetRegistry:
+    """
+    Holds the current ``Dataset`` loaded from ``data_dir``.
+
+    Accessing ``current`` checks, at most every ``check_interval`` seconds,
+    whether the files in ``data_dir`` have changed. If so, the new version is
+    loaded and prepared in a background thread and only then replaces the
+    current one, so requests never wait for a reload. Set ``check_interval``
+    to None to disable reloading.
+
+    """
+
+    def __init__(self, data_dir, prepare=None, check_interval=10.0):
+        self.data_dir = data_dir
+        self.prepare = prepare
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._loading = False
+        self._checked = time.monotonic()
+        self._current = self._load(source_version(data_dir))
+
+    def _load(self, version):
+        df_spores, df_units = load(self.data_dir)
+        data = Dataset(version, df_spores, df_units)
+        if self.prepare is not None:
+            self.prepare(data)
+        return data
+
+    def _reload(self, version):
+        try:
+            self.swap(self._load(version))
+        except Exception as e:
+            # Keep serving the old version, and retry on the next check
+            warnings.warn(f"Failed to load data version {version}: {e}")
+        finally:
+            self._loading = False
+
+    def swap(self, data):
+        """Make ``data``, an already prepared ``Dataset``, the current version."""
+        self._current = data
+
+    def check(self):
+        """Start loading the data in the background if it has changed."""
+        with self._lock:
+            if self._loading:
+                return
+            version = source_version(self.data_dir)
+            if version == self._current.version:
+                return
+            self._loading = True
+        threading.Thread(target=self._reload, args=(version,), daemon=True).start()
+
+    @property
+    def current(self):
+        if self.check_interval is not None:
+            now = time.monotonic()
+            if now - self._checked > self.check_interval:
+                self._checked = now
+                self.check()
+        return self._current
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Convert the SPORES CSV data to a memory-mappable columnar copy"
+    )
+    parser.add_argument("data_dir", nargs="?", default="./data")
+    args = parser.parse_args()
+    print(f"Wrote {convert(args.data_dir)}")
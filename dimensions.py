@@ -0,0 +1,75 @@
+"""
+Registry of the indicators that the SPORES are filtered by.
+
+Every column whose unit in units.csv is ``DIMENSION_UNIT``, i.e. that is
+scaled relative to its maximum value, is a dimension of the explorer, with
+its own slider, histogram and row in the scatter plot. The config file,
+dimensions.json by default, gives each dimension a short id (used in
+component ids, URLs and the API), a label, a colour and a help text, and
+sets their order. Columns missing from it come last, with an id and label
+derived from the column name and a colour from ``PALETTE``; entries for
+columns missing from the data are left out.
+
+"""
+
+import json
+import os
+import re
+
+import dataset
+
+CONFIG_FILE = os.environ.get("DIMENSIONS_CONFIG", "./dimensions.json")
+DIMENSION_UNIT = "0-1"
+
+# Colours of dimensions that are not given one in the config file
+PALETTE = [
+    "#1f77b4",
+    "#ff7f0e",
+    "#2ca02c",
+    "#d62728",
+    "#9467bd",
+    "#8c564b",
+    "#e377c2",
+    "#7f7f7f",
+    "#bcbd22",
+    "#17becf",
+]
+
+
+def slug(name):
+    """Id derived from the column ``name``."""
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def load(data_dir, config_path=CONFIG_FILE):
+    """
+    The dimensions of the data in ``data_dir``, as a dict of id to a dict
+    with the ``col``, ``label``, ``color`` and ``help_text`` of each, in
+    order.
+
+    """
+    units = dataset.load_units(data_dir).iloc[:, 0]
+    columns = [col for col, unit in units.items() if unit == DIMENSION_UNIT]
+    try:
+        with open(config_path, "r") as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        config = []
+
+    dims = {}
+    for entry in config:
+        if entry["col"] in columns:
+            dims[entry["id"]] = dict(
+                col=entry["col"],
+                label=entry.get("label", entry["col"]),
+                color=entry.get("color"),
+                help_text=entry.get("help_text", ""),
+            )
+    configured = {dim["col"] for dim in dims.values()}
+    for col in columns:
+        if col not in configured:
+            dims[slug(col)] = dict(col=col, label=col, color=None, help_text="")
+    for i, dim in enumerate(dims.values()):
+        if dim["color"] is None:
+            dim["color"] = PALETTE[i % len(PALETTE)]
+    return dims
@@ -0,0 +1,97 @@
+"""
+Streaming download of a filtered subset of the SPORES.
+
+Files are written and sent in chunks of rows, so that a worker never holds
+more than one chunk of the serialised file in memory.
+
+"""
+
+import io
+import os
+
+import flask
+
+CHUNK_ROWS = int(os.environ.get("EXPORT_CHUNK_ROWS", 50000))
+
+FORMATS = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def iter_chunks(df, positions, columns, chunk_rows):
+    for start in range(0, len(positions), chunk_rows):
+        # Columns are selected per chunk, so the full frame is never copied
+        yield df.iloc[positions[start : start + chunk_rows]].loc[:, columns]
+
+
+def iter_csv(df, positions, columns, chunk_rows=CHUNK_ROWS):
+    """
+    CSV of the ``columns`` of the rows of ``df`` at ``positions``, in chunks
+    of ``chunk_rows``.
+
+    """
+    yield df.iloc[:0].loc[:, columns].to_csv()
+    for chunk in iter_chunks(df, positions, columns, chunk_rows):
+        yield chunk.to_csv(header=False)
+
+
+class _ChunkBuffer(io.RawIOBase):
+    # Write-only file that hands out what was written to it so far
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.chunks.append(bytes(b))
+        return len(b)
+
+    def take(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_parquet(df, positions, columns, chunk_rows=CHUNK_ROWS):
+    """
+    Parquet file of the ``columns`` of the rows of ``df`` at ``positions``,
+    with one row group per ``chunk_rows`` rows, in chunks as they are written.
+
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    buffer = _ChunkBuffer()
+    schema = pa.Schema.from_pandas(
+        df.iloc[:0].loc[:, columns], preserve_index=True
+    )
+    with pq.ParquetWriter(buffer, schema) as writer:
+        for chunk in iter_chunks(df, positions, columns, chunk_rows):
+            table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=True)
+            writer.write_table(table)
+            yield buffer.take()
+    yield buffer.take()
+
+
+def response(df, positions, fmt, columns=None, filename="spores"):
+    """
+    Streamed download of the rows of ``df`` at ``positions`` as ``fmt``,
+    optionally with only the given ``columns``.
+
+    """
+    if fmt not in FORMATS:
+        flask.abort(404)
+    if columns is None:
+        columns = list(df.columns)
+    iter_file = iter_csv if fmt == "csv" else iter_parquet
+    chunks = iter_file(df, positions, columns)
+    return flask.Response(
+        chunks,
+        mimetype=FORMATS[fmt],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{fmt}"',
+            "Cache-Control": "no-store",
+        },
+    )
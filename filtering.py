@@ -0,0 +1,191 @@
+import copy
+import threading
+
+import numpy as np
+
+
+class ColumnRangeIndex:
+    """
+    Sorted per-column index over a DataFrame, built once at load time,
+    that answers inclusive multi-column range queries (the same semantics
+    as chaining ``Series.between`` calls) without scanning every row.
+
+    """
+
+    def __init__(self, df, columns):
+        self.columns = list(columns)
+        self.index = df.index
+        self._values = {}
+        self._order = {}
+        self._sorted = {}
+        for col in self.columns:
+            values = df[col].to_numpy(dtype=np.float64)
+            # Stable sort so that ties keep their original row order;
+            # NaNs end up last and can never fall inside a finite range
+            order = np.argsort(values, kind="stable")
+            self._values[col] = values
+            self._order[col] = order
+            self._sorted[col] = values[order]
+
+    def __len__(self):
+        return len(self.index)
+
+    def order(self, col):
+        """Row positions of ``col`` in ascending order of its values, NaNs last."""
+        return self._order[col]
+
+    def _bounds(self, col, range_):
+        sorted_ = self._sorted[col]
+        lo = np.searchsorted(sorted_, range_[0], side="left")
+        hi = np.searchsorted(sorted_, range_[1], side="right")
+        return lo, max(lo, hi)
+
+    def positions(self, ranges):
+        """
+        Return the sorted integer positions of all rows that fall inside every
+        one of ``ranges``, a dict mapping column names to ``[low, high]``.
+
+        The column with the fewest matches is resolved from its sorted index
+        by binary search, and the resulting candidates are then narrowed down
+        against the remaining columns in order of their number of matches,
+        so that the cost scales with the number of matches rather than with
+        the number of rows.
+
+        """
+        if not ranges:
+            return np.arange(len(self), dtype=np.intp)
+
+        bounds = {col: self._bounds(col, range_) for col, range_ in ranges.items()}
+        # Narrowest first, so that the candidates shrink as fast as possible
+        columns = sorted(bounds, key=lambda col: bounds[col][1] - bounds[col][0])
+        lo, hi = bounds[columns[0]]
+        candidates = np.sort(self._order[columns[0]][lo:hi])
+
+        for col in columns[1:]:
+            lo, hi = bounds[col]
+            if hi - lo == len(self) or len(candidates) == 0:
+                # Range covers the whole column, nothing to narrow down
+                break
+            low, high = ranges[col]
+            values = self._values[col][candidates]
+            candidates = candidates[(values >= low) & (values <= high)]
+
+        return candidates
+
+    def query(self, ranges):
+        """Return the index labels of all rows that fall inside ``ranges``."""
+        return self.index[self.positions(ranges)]
+
+
+class Crossfilter:
+    """
+    Histograms of each column over the rows that pass the range filters on
+    all other columns, as in crossfilter, for one set of filters that
+    changes one column at a time.
+
+    Keeps the number of failed filters for each row and the bin counts of
+    each histogram, and on a change of one range only visits the rows that
+    enter or leave it, found by binary search in the sorted ``index``. A row
+    counts towards all histograms if it fails no filter, and towards the
+    histogram of the one column it fails if it fails exactly one.
+
+    Histograms have ``bins`` bins of equal width between ``limits``, one
+    ``(low, high)`` per column, or the range of each column if not given.
+
+    """
+
+    def __init__(self, index, bins, limits=None):
+        self.index = index
+        self.n_bins = bins
+        self.values = [index._values[col] for col in index.columns]
+        if limits is None:
+            limits = [(np.nanmin(v), np.nanmax(v)) for v in self.values]
+        # NaNs go into an extra last bin, which is never reported
+        self.bin_idx = np.empty((len(index), len(self.values)), np.min_scalar_type(bins))
+        for j, (values, (low, high)) in enumerate(zip(self.values, limits)):
+            width = (high - low) / bins if high > low else 1
+            with np.errstate(invalid="ignore"):
+                bin_idx = np.clip((values - low) // width, 0, bins - 1)
+            self.bin_idx[:, j] = np.where(np.isnan(values), bins, bin_idx)
+
+        n_cols = len(self.values)
+        self.lock = threading.Lock()
+        self.ranges = np.tile([-np.inf, np.inf], (n_cols, 1))
+        self.bounds = [
+            index._bounds(col, range_) for col, range_ in zip(index.columns, self.ranges)
+        ]
+        # NaNs fail even an unbounded range
+        fails = np.column_stack([np.isnan(v) for v in self.values])
+        self.failed = fails.sum(axis=1).astype(np.uint8)
+        self.counts = np.zeros((n_cols, bins + 1), dtype=np.int64)
+        for j in range(n_cols):
+            rows = (self.failed == 0) | ((self.failed == 1) & fails[:, j])
+            self.counts[j] = np.bincount(self.bin_idx[rows, j], minlength=bins + 1)
+
+    def copy(self):
+        """
+        Independent filters in the same state, sharing everything that does
+        not depend on the filters.
+
+        """
+        with self.lock:
+            new = copy.copy(self)
+            new.lock = threading.Lock()
+            new.ranges = self.ranges.copy()
+            new.bounds = list(self.bounds)
+            new.failed = self.failed.copy()
+            new.counts = self.counts.copy()
+        return new
+
+    @property
+    def nbytes(self):
+        """Memory held by this copy of the filters, as in ``copy()``."""
+        return self.ranges.nbytes + self.failed.nbytes + self.counts.nbytes
+
+    def update(self, ranges):
+        """
+        Set the range filters to ``ranges``, given in the order of the
+        columns, and return the histograms with shape ``(n_columns, bins)``.
+
+        """
+        with self.lock:
+            for j, range_ in enumerate(ranges):
+                if tuple(range_) != tuple(self.ranges[j]):
+                    self._set_range(j, range_)
+            return self.counts[:, : self.n_bins].copy()
+
+    def _rows_between(self, j, bounds, excluded):
+        # Rows within the sorted positions ``bounds`` but not ``excluded``
+        order = self.index._order[self.index.columns[j]]
+        (lo, hi), (ex_lo, ex_hi) = bounds, excluded
+        return np.concatenate(
+            [order[lo : max(lo, min(hi, ex_lo))], order[max(lo, ex_hi) : hi]]
+        )
+
+    def _set_range(self, j, range_):
+        bounds = self.index._bounds(self.index.columns[j], range_)
+        entering = self._rows_between(j, bounds, self.bounds[j])
+        leaving = self._rows_between(j, self.bounds[j], bounds)
+        # Passed to _move as the number of filters failed other than column j's
+        self._move(j, entering, self.failed[entering] - 1, 1)
+        self._move(j, leaving, self.failed[leaving], -1)
+        self.failed[entering] -= 1
+        self.failed[leaving] += 1
+        self.ranges[j] = range_
+        self.bounds[j] = bounds
+
+    def _move(self, j, rows, other_failed, sign):
+        # Rows that fail no other filter enter or leave all other histograms
+        passing = rows[other_failed == 0]
+        for k in range(len(self.counts)):
+            if k != j:
+                self.counts[k] += sign * np.bincount(
+                    self.bin_idx[passing, k], minlength=self.n_bins + 1
+                )
+        # Rows that fail exactly one other filter enter or leave its histogram
+        single = rows[other_failed == 1]
+        values = np.column_stack([v[single] for v in self.values])
+        fails = ~((values >= self.ranges[:, 0]) & (values <= self.ranges[:, 1]))
+        fails[:, j] = False
+        failed_col = fails.argmax(axis=1)
+        np.add.at(self.counts, (failed_col, self.bin_idx[single, failed_col]), sign)
@@ -0,0 +1,180 @@
+"""
+Overview map images in several sizes and formats, for responsive loading.
+
+The source JPEGs in assets/img are converted once, after every change to
+them, into resized JPEG and WebP variants whose file names contain a hash of
+their content, plus a manifest listing the variants of each image::
+
+    python images.py
+
+Since a file name changes whenever its content does, the variants can be
+cached by browsers indefinitely. Images missing from the manifest are still
+served from assets/img as they are.
+
+"""
+
+import argparse
+import concurrent.futures
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+
+SOURCE_DIR = "./assets/img"
+BUILD_DIR = os.environ.get("IMAGE_BUILD_DIR", "./build/img")
+MANIFEST_FILE = "manifest.json"
+
+WIDTHS = [480, 960, 1440]
+FORMATS = {"jpeg": "jpg", "webp": "webp"}
+# Names of the variants written by build_image, with the hash of their
+# content as the only group
+VARIANT_NAME = re.compile(r"[^/]+-\d+\.([0-9a-f]{16})\.(?:jpg|webp)")
+
+
+def _encode(image, fmt, quality):
+    out = io.BytesIO()
+    if fmt == "jpeg":
+        image.save(out, "JPEG", quality=quality, optimize=True, progressive=True)
+    else:
+        image.save(out, "WEBP", quality=quality, method=6)
+    return out.getvalue()
+
+
+def build_image(path, out_dir, widths=WIDTHS, quality=80):
+    """
+    Write the variants of the image at ``path`` to ``out_dir``, and return
+    its manifest entry.
+
+    """
+    from PIL import Image
+
+    stem = os.path.splitext(os.path.basename(path))[0]
+    with Image.open(path) as source:
+        source = source.convert("RGB")
+        # Never scaled up; the full size is always included
+        sizes = sorted({w for w in widths if w < source.width} | {source.width})
+        entry = {"width": source.width, "height": source.height}
+        for fmt, ext in FORMATS.items():
+            entry[fmt] = []
+            for width in sizes:
+                height = round(source.height * width / source.width)
+                resized = (
+                    source
+                    if width == source.width
+                    else source.resize((width, height), Image.LANCZOS)
+                )
+                content = _encode(resized, fmt, quality)
+                digest = hashlib.sha256(content).hexdigest()[:16]
+                name = f"{stem}-{width}.{digest}.{ext}"
+                if not os.path.exists(os.path.join(out_dir, name)):
+                    with open(os.path.join(out_dir, name), "wb") as f:
+                        f.write(content)
+                entry[fmt].append([name, width])
+    return entry
+
+
+def _source_stat(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def build(
+    src_dir=SOURCE_DIR, out_dir=BUILD_DIR, widths=WIDTHS, quality=80, jobs=None
+):
+    """
+    Build the variants of all JPEGs in ``src_dir`` that changed since the
+    last build, and write the manifest.
+
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST_FILE)
+    try:
+        with open(manifest_path, "r") as f:
+            previous = json.load(f)
+    except FileNotFoundError:
+        previous = {"images": {}}
+    settings = {"widths": sorted(widths), "quality": quality}
+    if previous.get("settings") != settings:
+        previous = {"images": {}}
+
+    images = {}
+    todo = {}
+    for file_name in sorted(os.listdir(src_dir)):
+        stem, ext = os.path.splitext(file_name)
+        if ext.lower() not in (".jpg", ".jpeg"):
+            continue
+        path = os.path.join(src_dir, file_name)
+        old = previous["images"].get(stem)
+        if old is not None and old["source"] == _source_stat(path):
+            images[stem] = old
+        else:
+            todo[stem] = path
+
+    with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+        futures = {
+            stem: executor.submit(build_image, path, out_dir, widths, quality)
+            for stem, path in todo.items()
+        }
+        for stem, future in futures.items():
+            images[stem] = dict(future.result(), source=_source_stat(todo[stem]))
+
+    # Written last and replaced in one step, so that a running app never
+    # sees a manifest that refers to files not written yet
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"settings": settings, "images": images}, f)
+    os.replace(tmp_path, manifest_path)
+    return len(todo), len(images)
+
+
+class Manifest:
+    """
+    The manifest in ``build_dir``, read again whenever the file changes,
+    so that images built while the app is running are picked up.
+
+    """
+
+    def __init__(self, build_dir=BUILD_DIR):
+        self.path = os.path.join(build_dir, MANIFEST_FILE)
+        self._stat = None
+        self._images = {}
+        self._lock = threading.Lock()
+
+    def _reload(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._stat, self._images = None, {}
+            return
+        key = (stat.st_size, stat.st_mtime_ns)
+        if key != self._stat:
+            with open(self.path, "r") as f:
+                self._images = json.load(f)["images"]
+            self._stat = key
+
+    def get(self, name):
+        """The manifest entry for the image ``name`` (without extension), if any."""
+        with self._lock:
+            self._reload()
+            return self._images.get(name)
+
+
+def srcset(variants, url_prefix):
+    """``srcset`` attribute value for the ``[name, width]`` pairs in ``variants``."""
+    return ", ".join(f"{url_prefix}{name} {width}w" for name, width in variants)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build resized and WebP variants of the overview images"
+    )
+    parser.add_argument("--src", default=SOURCE_DIR)
+    parser.add_argument("--out", default=BUILD_DIR)
+    parser.add_argument("--widths", nargs="+", type=int, default=WIDTHS)
+    parser.add_argument("--quality", type=int, default=80)
+    parser.add_argument("--jobs", type=int, default=None)
+    args = parser.parse_args()
+    built, total = build(args.src, args.out, args.widths, args.quality, args.jobs)
+    print(f"Built {built} of {total} images into {args.out}")
@@ -0,0 +1,74 @@
+import functools
+import json
+
+from plotly.io.json import to_json_plotly
+
+from url_helpers import component_key
+
+
+def _find_paths(node, ids, path=(), paths=None):
+    """
+    Paths (as key sequences) to the components in ``node`` whose id, as
+    given by ``url_helpers.component_key``, is in ``ids``.
+
+    """
+    if paths is None:
+        paths = {}
+    if isinstance(node, dict):
+        key = component_key(node.get("props", {}).get("id"))
+        if key in ids:
+            paths[key] = path
+        for key, child in node.items():
+            _find_paths(child, ids, path + (key,), paths)
+    elif isinstance(node, list):
+        for i, child in enumerate(node):
+            _find_paths(child, ids, path + (i,), paths)
+    return paths
+
+
+def _with_props(node, path, props):
+    # Copies only the containers along the path, everything else is shared
+    if not path:
+        return dict(node, props=dict(node["props"], **props))
+    key, rest = path[0], path[1:]
+    copy = list(node) if isinstance(node, list) else dict(node)
+    copy[key] = _with_props(node[key], rest, props)
+    return copy
+
+
+def serialise(layout):
+    """The JSON-compatible form of the component tree ``layout``."""
+    return json.loads(to_json_plotly(layout))
+
+
+class LayoutCache:
+    """
+    A page layout, serialised once, with the props of the components in
+    ``component_ids`` replaced by those in a decoded URL state on request.
+
+    This gives the same result as building the layout with
+    ``url_helpers.apply_default_value(state)``, without rebuilding and
+    re-serialising the whole component tree. The layouts for the
+    ``maxsize`` most recently requested states are kept. ``layout`` may
+    also be given already serialised, as by ``serialise``.
+
+    Layouts are kept in their JSON-compatible form rather than as JSON
+    text, as Dash serialises the return value of a callback into its
+    response itself and has no way to pass JSON text through.
+
+    """
+
+    def __init__(self, layout, component_ids, maxsize=256):
+        self.template = layout if isinstance(layout, dict) else serialise(layout)
+        self.paths = _find_paths(self.template, set(component_ids))
+        self._get = functools.lru_cache(maxsize=maxsize)(self._build)
+
+    def _build(self, state_key):
+        layout = self.template
+        for id, props in json.loads(state_key).items():
+            if id in self.paths:
+                layout = _with_props(layout, self.paths[id], props)
+        return layout
+
+    def get(self, state):
+        return self._get(json.dumps(state, sort_keys=True))
@@ -0,0 +1,197 @@
+"""
+Request and callback metrics, exposed on ``/metrics`` in Prometheus format.
+
+When ``PROMETHEUS_MULTIPROC_DIR`` is set (see app.ini), every worker process
+writes its metrics to files in that directory, and ``/metrics`` aggregates
+them across all workers, whichever worker serves the scrape.
+
+"""
+
+import os
+import shutil
+import time
+
+import flask
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+
+def _reset_multiproc_dir():
+    # Only the uwsgi master (or a single-process server) clears metrics
+    # left over from a previous run; workers forked from it must not
+    try:
+        import uwsgi
+
+        if uwsgi.worker_id() != 0:
+            return
+    except ImportError:
+        pass
+    shutil.rmtree(MULTIPROC_DIR, ignore_errors=True)
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+
+# Before any metric is created, as they write to files in this directory
+if MULTIPROC_DIR:
+    _reset_multiproc_dir()
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf")
+)
+SIZE_BUCKETS = tuple(4**i * 256 for i in range(10)) + (float("inf"),)
+
+CALLBACK_LATENCY = Histogram(
+    "dash_callback_duration_seconds",
+    "Time to run a Dash callback and serialise its response",
+    ["callback"],
+    buckets=LATENCY_BUCKETS,
+)
+CALLBACK_CALLS = Counter(
+    "dash_callback_calls_total", "Number of Dash callback requests", ["callback"]
+)
+CALLBACK_ERRORS = Counter(
+    "dash_callback_errors_total",
+    "Number of Dash callback requests that failed with a server error",
+    ["callback"],
+)
+CALLBACK_RESPONSE_BYTES = Histogram(
+    "dash_callback_response_bytes",
+    "Size of Dash callback responses",
+    ["callback"],
+    buckets=SIZE_BUCKETS,
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time to handle an HTTP request",
+    ["endpoint", "method", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+STATIC_IMAGE_LATENCY = Histogram(
+    "static_image_duration_seconds",
+    "Time to serve a static image, up to the start of the file transfer",
+    buckets=LATENCY_BUCKETS,
+)
+STATIC_IMAGE_BYTES = Histogram(
+    "static_image_response_bytes", "Size of served static images", buckets=SIZE_BUCKETS
+)
+
+# Prefetched images are counted as they are served, by this request header
+# that assets/prefetch.js sets on them
+PREFETCH_HEADER = "X-Prefetch"
+IMAGE_PREFETCH_REQUESTS = Counter(
+    "image_prefetch_requests_total",
+    "Number of overview images prefetched by browsers",
+)
+IMAGE_PREFETCH_BYTES = Counter(
+    "image_prefetch_bytes_total", "Bytes of overview images prefetched by browsers"
+)
+IMAGE_PREFETCH_SKIPPED = Counter(
+    "image_prefetch_skipped_total",
+    "Number of page views that stopped prefetching images at the byte budget",
+)
+IMAGE_PREFETCH_HITS = Counter(
+    "image_prefetch_hits_total",
+    "Number of overview images shown that had been prefetched",
+)
+IMAGE_PREFETCH_MISSES = Counter(
+    "image_prefetch_misses_total",
+    "Number of overview images shown that had not been prefetched",
+)
+# Counted from the reports of browsers, which can only add one to each per
+# report, so that a client cannot skew them more than by sending requests
+PREFETCH_REPORT_COUNTERS = {
+    "skipped": IMAGE_PREFETCH_SKIPPED,
+    "hits": IMAGE_PREFETCH_HITS,
+    "misses": IMAGE_PREFETCH_MISSES,
+}
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".svg", ".gif")
+
+
+def _response_size(response):
+    if response.content_length is not None:
+        return response.content_length
+    if response.direct_passthrough or response.is_streamed:
+        return None
+    return len(response.get_data())
+
+
+def instrument(app):
+    """Record metrics for all requests to the Dash ``app`` and add ``/metrics``."""
+    server = app.server
+
+    def callback_name(output):
+        # Outputs are sent by the client, so unknown ones share one label
+        # rather than each adding a new one
+        if not isinstance(output, str):
+            return "unknown"
+        callback = app.callback_map.get(output, {}).get("callback")
+        return getattr(callback, "__name__", "unknown")
+
+    @server.before_request
+    def start_timer():
+        flask.g.metrics_start = time.perf_counter()
+
+    @server.after_request
+    def record_request(response):
+        start = flask.g.pop("metrics_start", None)
+        if start is None or flask.request.endpoint == "metrics":
+            return response
+        elapsed = time.perf_counter() - start
+        request = flask.request
+
+        REQUEST_LATENCY.labels(
+            endpoint=request.endpoint or "unknown",
+            method=request.method,
+            status=response.status_code,
+        ).observe(elapsed)
+
+        if request.path.endswith("_dash-update-component"):
+            body = request.get_json(silent=True) or {}
+            name = callback_name(body.get("output"))
+            CALLBACK_LATENCY.labels(name).observe(elapsed)
+            CALLBACK_CALLS.labels(name).inc()
+            if response.status_code >= 500:
+                CALLBACK_ERRORS.labels(name).inc()
+            size = _response_size(response)
+            if size is not None:
+                CALLBACK_RESPONSE_BYTES.labels(name).observe(size)
+        elif request.path.lower().endswith(IMAGE_EXTENSIONS):
+            STATIC_IMAGE_LATENCY.observe(elapsed)
+            size = _response_size(response)
+            if size is not None:
+                STATIC_IMAGE_BYTES.observe(size)
+            if request.headers.get(PREFETCH_HEADER):
+                IMAGE_PREFETCH_REQUESTS.inc()
+                if size is not None:
+                    IMAGE_PREFETCH_BYTES.inc(size)
+
+        return response
+
+    @server.route("/metrics/prefetch", methods=["POST"])
+    def prefetch_report():
+        # Sent by assets/prefetch.js with navigator.sendBeacon, as text
+        report = flask.request.get_json(force=True, silent=True)
+        if not isinstance(report, dict):
+            return "", 400
+        for key, counter in PREFETCH_REPORT_COUNTERS.items():
+            if report.get(key):
+                counter.inc()
+        return "", 204
+
+    @server.route("/metrics")
+    def metrics():
+        if MULTIPROC_DIR:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return flask.Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
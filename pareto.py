@@ -0,0 +1,103 @@
+"""
+Pareto fronts of the SPORES over a chosen set of indicators.
+
+A row is on the front if no other row is at least as good in every
+objective and strictly better in one. Rather than comparing all pairs of
+rows, rows are sorted so that a row is (nearly always) dominated only by
+rows before it, and then checked block by block against the front found
+so far ("sort-filter-skyline"). With two objectives, a single pass over
+the sorted rows is enough.
+
+"""
+
+import numpy as np
+
+# Upper bound on the number of elements compared at once, to bound memory use
+BLOCK_ELEMENTS = 2**22
+
+
+def _dominates(a, b):
+    """Whether each row of ``a`` dominates each row of ``b``."""
+    at_least_as_good = np.ones((len(a), len(b)), dtype=bool)
+    better = np.zeros((len(a), len(b)), dtype=bool)
+    for j in range(a.shape[1]):
+        at_least_as_good &= a[:, np.newaxis, j] <= b[np.newaxis, :, j]
+        better |= a[:, np.newaxis, j] < b[np.newaxis, :, j]
+    return at_least_as_good & better
+
+
+def _dominated(front, candidates):
+    """Which ``candidates`` are dominated by any row of ``front``."""
+    dominated = np.zeros(len(candidates), dtype=bool)
+    remaining = np.arange(len(candidates))
+    start, step = 0, 8
+    while start < len(front) and len(remaining):
+        # Most candidates are dominated by one of the first, strongest rows of
+        # the front, and are then not compared with the rest of it
+        step = min(2 * step, max(1, BLOCK_ELEMENTS // len(remaining)))
+        dominates = _dominates(front[start : start + step], candidates[remaining])
+        hit = dominates.any(axis=0)
+        dominated[remaining[hit]] = True
+        remaining = remaining[~hit]
+        start += step
+    return dominated
+
+
+def _front_2d(points):
+    order = np.argsort(points[:, 0], kind="stable")
+    x, y = points[order, 0], points[order, 1]
+    # A row is dominated by a row with a smaller first objective that is at
+    # least as good in the second, or by one with the same first objective
+    # that is better in the second
+    new_group = np.concatenate([[True], x[1:] != x[:-1]])
+    starts = np.flatnonzero(new_group)
+    group = np.cumsum(new_group) - 1
+    best_before = np.minimum.accumulate(np.concatenate([[np.inf], y[:-1]]))
+    best_smaller_x = best_before[starts][group]
+    best_same_x = np.minimum.reduceat(y, starts)[group]
+    on_front = np.zeros(len(points), dtype=bool)
+    on_front[order] = (y < best_smaller_x) & (y <= best_same_x)
+    return on_front
+
+
+def _front_nd(points, block_size):
+    # Sorted by sum, rows nearly always come after the rows that dominate
+    # them, so that rows on the front found so far rarely need to be removed
+    # again; they still are when rounding of the sums gets in the way
+    order = np.argsort(points.sum(axis=1), kind="stable")
+    front = np.zeros(0, dtype=np.intp)
+    for start in range(0, len(order), block_size):
+        block = order[start : start + block_size]
+        block = block[~_dominated(points[front], points[block])]
+        block = block[~_dominates(points[block], points[block]).any(axis=0)]
+        if len(block):
+            front = front[~_dominated(points[block], points[front])]
+            front = np.concatenate([front, block])
+    on_front = np.zeros(len(points), dtype=bool)
+    on_front[front] = True
+    return on_front
+
+
+def pareto_front(values, maximize=None, block_size=1024):
+    """
+    Boolean mask of the rows of ``values``, with one column per objective,
+    that are on the Pareto front. Objectives are minimised, except where
+    ``maximize`` is true. Rows with missing values are never on the front,
+    and identical rows are either all on it or all not.
+
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if maximize is not None:
+        values = np.where(maximize, -values, values)
+    on_front = np.zeros(len(values), dtype=bool)
+    rows = np.flatnonzero(np.isfinite(values).all(axis=1))
+    points = values[rows]
+    if len(rows) == 0 or points.shape[1] == 0:
+        on_front[rows] = True
+    elif points.shape[1] == 1:
+        on_front[rows] = points[:, 0] == points[:, 0].min()
+    elif points.shape[1] == 2:
+        on_front[rows] = _front_2d(points)
+    else:
+        on_front[rows] = _front_nd(points, block_size)
+    return on_front
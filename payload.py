@@ -0,0 +1,78 @@
+"""
+Compact encoding of the point arrays in figure payloads.
+
+Numeric arrays are sent as base64-encoded typed arrays, in the smallest
+type that holds their values, which plotly.js decodes without parsing a
+number per point. plotly.js supports these from version 2.28; with older
+versions, or with FIGURE_TYPED_ARRAYS=0, arrays are sent as JSON lists.
+
+"""
+
+import base64
+import os
+
+import numpy as np
+
+# Type codes of the typed arrays that plotly.js decodes
+DTYPE_CODES = {
+    np.dtype("<i1"): "i1",
+    np.dtype("<u1"): "u1",
+    np.dtype("<i2"): "i2",
+    np.dtype("<u2"): "u2",
+    np.dtype("<i4"): "i4",
+    np.dtype("<u4"): "u4",
+    np.dtype("<f4"): "f4",
+    np.dtype("<f8"): "f8",
+}
+INT_DTYPES = [np.dtype(code) for code in ["<u1", "<i1", "<u2", "<i2", "<u4", "<i4"]]
+
+
+def _plotlyjs_supports_typed_arrays():
+    # Dash serves the plotly.js bundled with the plotly package
+    from plotly.offline import get_plotlyjs_version
+
+    major, minor = (int(part) for part in get_plotlyjs_version().split(".")[:2])
+    return (major, minor) >= (2, 28)
+
+
+TYPED_ARRAYS = (
+    os.environ.get("FIGURE_TYPED_ARRAYS", "1") == "1"
+    and _plotlyjs_supports_typed_arrays()
+)
+
+
+def _int_dtype(values):
+    # The smallest integer type that holds all values, if any
+    low, high = (values.min(), values.max()) if len(values) else (0, 0)
+    for dtype in INT_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    return None
+
+
+def array(values, decimals=None):
+    """
+    The 1-D array ``values`` as a figure property, rounded to ``decimals``
+    if given. Rounded values are sent as 32-bit floats, which keep about
+    seven significant digits.
+
+    """
+    values = np.asarray(values)
+    if decimals is not None:
+        values = values.round(decimals)
+    if not TYPED_ARRAYS:
+        return values.tolist()
+
+    dtype = None
+    if values.dtype.kind in "biu":
+        dtype = _int_dtype(values)
+    elif decimals is not None and decimals <= 6:
+        dtype = np.dtype("<f4")
+    if dtype is None:
+        dtype = np.dtype("<f8")
+    data = np.ascontiguousarray(values, dtype=dtype)
+    return {
+        "dtype": DTYPE_CODES[dtype],
+        "bdata": base64.b64encode(data.tobytes()).decode("ascii"),
+    }
@@ -0,0 +1,122 @@
+"""
+Search for the SPORES closest to given ones in the space of the indicators.
+
+A KD-tree over the indicator values is built once per version of the data,
+so that a search only visits a few of its leaves rather than computing the
+distance to every SPORE.
+
+"""
+
+import threading
+
+import numpy as np
+
+# If at most this share of all SPORES is allowed in a search, a separate tree
+# is built over just those, instead of searching ever more neighbours in the
+# full tree until enough allowed ones are found
+SUBSET_TREE_SHARE = 0.125
+
+
+def _kd_tree(points):
+    # Imported here, as scipy is slow to import
+    from scipy.spatial import cKDTree
+
+    return cKDTree(points)
+
+
+class SimilarityIndex:
+    """
+    Nearest neighbours by Euclidean distance over the ``columns`` of ``df``,
+    each multiplied by its entry in ``weights`` (all 1 by default). Rows
+    with missing values in any of the columns are never returned.
+
+    With ``lazy``, the tree is only built on the first search, which saves
+    importing scipy and building the tree at startup.
+
+    """
+
+    def __init__(self, df, columns, weights=None, lazy=False):
+        points = df.loc[:, columns].to_numpy(dtype=np.float64)
+        if weights is not None:
+            points = points * np.asarray(weights, dtype=np.float64)
+        self.points = points
+        self.valid = np.isfinite(points).all(axis=1)
+        # Row position of each point in the tree, and -1 for missing ones
+        self.tree_positions = np.append(np.flatnonzero(self.valid), -1)
+        self._tree = None if lazy else _kd_tree(points[self.valid])
+        self._lock = threading.Lock()
+
+    @property
+    def tree(self):
+        """KD-tree over the rows without missing values."""
+        with self._lock:
+            if self._tree is None:
+                self._tree = _kd_tree(self.points[self.valid])
+            return self._tree
+
+    def __len__(self):
+        return len(self.points)
+
+    def neighbours(self, positions, k, allowed=None):
+        """
+        Row positions and distances of the ``k`` nearest rows to each of the
+        rows at ``positions``, both with shape ``(len(positions), k)`` and
+        nearest first, not counting the row itself. With ``allowed``, an
+        array of row positions, only those rows are returned.
+
+        Where fewer than ``k`` rows are found, the remaining entries are
+        -1 for the position and infinite for the distance.
+
+        """
+        positions = np.asarray(positions, dtype=np.intp)
+        tree, tree_positions = self.tree, self.tree_positions
+        if allowed is not None:
+            allowed = np.asarray(allowed, dtype=np.intp)
+            allowed = allowed[self.valid[allowed]]
+            if len(allowed) <= SUBSET_TREE_SHARE * len(self):
+                tree = _kd_tree(self.points[allowed])
+                tree_positions = np.append(allowed, -1)
+                allowed = None
+
+        result_positions = np.full((len(positions), k), -1, dtype=np.intp)
+        distances = np.full((len(positions), k), np.inf)
+        # Rows with missing values have no place in the tree
+        todo = np.flatnonzero(self.valid[positions])
+        is_allowed = None
+        if allowed is not None:
+            is_allowed = np.zeros(len(self), dtype=bool)
+            is_allowed[allowed] = True
+            # Enough neighbours to find k allowed ones on average
+            n_query = int(np.ceil((k + 1) * tree.n / max(len(allowed), 1)))
+        else:
+            n_query = k + 1
+
+        while len(todo) and tree.n:
+            n_query = min(n_query, tree.n)
+            found_distances, idx = tree.query(
+                self.points[positions[todo]], k=n_query, workers=-1
+            )
+            found_distances = found_distances.reshape(len(todo), n_query)
+            found = tree_positions[idx.reshape(len(todo), n_query)]
+
+            keep = (found != -1) & (found != positions[todo, np.newaxis])
+            if is_allowed is not None:
+                keep &= is_allowed[found]
+            # Kept entries first, in order of distance
+            order = np.argsort(~keep, axis=1, kind="stable")[:, :k]
+            kept = np.take_along_axis(keep, order, axis=1)
+            n_kept = min(k, n_query)
+            result_positions[todo, :n_kept] = np.where(
+                kept, np.take_along_axis(found, order, axis=1), -1
+            )
+            distances[todo, :n_kept] = np.where(
+                kept, np.take_along_axis(found_distances, order, axis=1), np.inf
+            )
+
+            if n_query == tree.n:
+                break
+            # Search further only for rows that have too few neighbours yet
+            todo = todo[keep.sum(axis=1) < k]
+            n_query *= 2
+
+        return result_positions, distances
@@ -0,0 +1,98 @@
+"""
+Artifact with state derived at startup, for a fast start with FAST_START=1.
+
+State that takes long to compute but rarely changes, such as the figure
+template and the page layout, is written to a small JSON file the first
+time it is computed, and read from it on later starts. Entries are only
+used while the code and data they were computed from are unchanged. To
+write the artifact ahead of time, e.g. as part of a deployment::
+
+    FAST_START=1 python startup.py
+
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+
+def code_version(paths, settings):
+    """
+    Hash of the files at ``paths``, of the settings that the stored state
+    depends on, and of the versions of plotly, Dash and Dash Bootstrap
+    Components, whose components and figures it holds.
+
+    """
+    import dash
+    import dash_bootstrap_components
+    import plotly
+
+    versions = [
+        plotly.__version__,
+        dash.__version__,
+        dash_bootstrap_components.__version__,
+    ]
+    digest = hashlib.sha256(" ".join(versions).encode())
+    digest.update(json.dumps(settings, sort_keys=True).encode())
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+class Artifact:
+    """
+    Entries stored in the JSON file at ``path``, which are discarded if they
+    were written by a different ``code_version``. Entries that depend on the
+    data are stored per data version.
+
+    """
+
+    def __init__(self, path, code_version):
+        self.path = path
+        self.code_version = code_version
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r") as f:
+                content = json.load(f)
+        except (FileNotFoundError, ValueError):
+            content = {}
+        if content.get("code_version") != code_version:
+            content = {"code_version": code_version, "entries": {}, "data": {}}
+        self._content = content
+
+    def get(self, name, data_version=None):
+        if data_version is None:
+            return self._content["entries"].get(name)
+        data = self._content["data"]
+        if data.get("version") != data_version:
+            return None
+        return data["entries"].get(name)
+
+    def set(self, name, value, data_version=None):
+        with self._lock:
+            if data_version is None:
+                self._content["entries"][name] = value
+            else:
+                if self._content["data"].get("version") != data_version:
+                    self._content["data"] = {"version": data_version, "entries": {}}
+                self._content["data"]["entries"][name] = value
+            self._write()
+
+    def _write(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Replaced in one step, as several workers may start at the same time
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._content, f)
+        os.replace(tmp_path, self.path)
+
+
+if __name__ == "__main__":
+    os.environ["FAST_START"] = "1"
+    import app
+
+    print(f"Wrote {app.startup_artifact.path}")
@@ -0,0 +1,164 @@
+"""
+Summary tables shown for a selected SPORE in the "Summary data" tab.
+
+Tables are rendered on first use and kept in a bounded LRU cache. They can
+also be rendered for all SPORES ahead of time and written next to the
+dataset, in which case workers only read them::
+
+    python summary.py ./data
+
+"""
+
+import argparse
+import functools
+import html
+import json
+import os
+import warnings
+
+import numpy as np
+
+import dataset
+
+SUMMARY_DIR = "summaries"
+
+TABLE_HEAD = (
+    '<table border="1" class="dataframe">\n'
+    "  <thead>\n"
+    '    <tr style="text-align: right;">\n'
+    "      <th></th>\n"
+    "      <th>Indicator</th>\n"
+    "      <th>Unit</th>\n"
+    "    </tr>\n"
+    "  </thead>\n"
+    "  <tbody>\n"
+)
+TABLE_ROW = "    <tr>\n      <th>{}</th>\n      <td>{}</td>\n      <td>{}</td>\n    </tr>\n"
+TABLE_TAIL = "  </tbody>\n</table>"
+
+
+def table_rows(df_spores, df_units):
+    """
+    ``(column, unit)`` for each column of ``df_spores`` shown in the table,
+    i.e. each column with a unit.
+
+    """
+    units = df_units.iloc[:, 0].dropna()
+    return [(col, units[col]) for col in df_spores.columns if col in units.index]
+
+
+def render_rows(rows, values):
+    """Render the table for one SPORE, given its ``values`` for each of ``rows``."""
+    # Same output as DataFrame.to_html, which was used before, but without
+    # its per-call overhead
+    return (
+        TABLE_HEAD
+        + "".join(
+            TABLE_ROW.format(
+                html.escape(str(col)), "{:.2f}".format(value), html.escape(str(unit))
+            )
+            for (col, unit), value in zip(rows, values)
+            if not np.isnan(value)
+        )
+        + TABLE_TAIL
+    )
+
+
+def prerender(data_dir):
+    """
+    Render the tables for all SPORES in ``data_dir`` into one file, with
+    the byte offset of each table in row order.
+
+    """
+    df_spores, df_units = dataset.load(data_dir)
+    rows = table_rows(df_spores, df_units)
+    values = df_spores.loc[:, [col for col, unit in rows]].to_numpy(dtype=np.float64)
+
+    out_dir = os.path.join(data_dir, SUMMARY_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+    offsets = np.zeros(len(df_spores) + 1, dtype=np.int64)
+    with open(os.path.join(out_dir, "tables.bin"), "wb") as f:
+        for i, row_values in enumerate(values):
+            table = render_rows(rows, row_values).encode()
+            f.write(table)
+            offsets[i + 1] = offsets[i] + len(table)
+    np.save(os.path.join(out_dir, "offsets.npy"), offsets)
+    np.save(os.path.join(out_dir, "index.npy"), df_spores.index.to_numpy())
+
+    # Written last, so that an interrupted run is never picked up
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump({"sources": dataset.source_stats(data_dir)}, f, indent=2)
+
+    return out_dir
+
+
+class PrerenderedTables:
+    """Memory-mapped tables written by ``prerender``."""
+
+    def __init__(self, in_dir):
+        self.offsets = np.load(os.path.join(in_dir, "offsets.npy"), mmap_mode="r")
+        self.index = np.load(os.path.join(in_dir, "index.npy"), mmap_mode="r")
+        self.tables = np.memmap(os.path.join(in_dir, "tables.bin"), mode="r")
+
+    def get(self, position):
+        start, end = self.offsets[position], self.offsets[position + 1]
+        return self.tables[start:end].tobytes().decode()
+
+
+def open_prerendered(data_dir, index):
+    """
+    Open the pre-rendered tables in ``data_dir`` if they exist and were
+    rendered from the current data with the given ``index``, else None.
+
+    """
+    in_dir = os.path.join(data_dir, SUMMARY_DIR)
+    try:
+        with open(os.path.join(in_dir, "meta.json"), "r") as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        return None
+
+    if meta["sources"] == dataset.source_stats(data_dir):
+        tables = PrerenderedTables(in_dir)
+        if np.array_equal(tables.index, index.to_numpy()):
+            return tables
+
+    warnings.warn(
+        f"Pre-rendered summary tables in {data_dir} are out of date and not used."
+        " Re-run `python summary.py` to update them."
+    )
+    return None
+
+
+class SummaryTables:
+    """
+    Summary table HTML for each SPORE of one version of the data, read from
+    the pre-rendered tables if available and rendered on demand otherwise,
+    with the most recently used ``cache_size`` tables kept in memory.
+
+    """
+
+    def __init__(self, df_spores, df_units, data_dir=None, cache_size=1024):
+        self.df_spores = df_spores
+        self.rows = table_rows(df_spores, df_units)
+        self.columns = [col for col, unit in self.rows]
+        self.prerendered = (
+            open_prerendered(data_dir, df_spores.index) if data_dir else None
+        )
+        self.get = functools.lru_cache(maxsize=cache_size)(self._get)
+
+    def _get(self, spore_id):
+        position = self.df_spores.index.get_loc(spore_id)
+        if self.prerendered is not None:
+            return self.prerendered.get(position)
+        values = self.df_spores.iloc[position][self.columns].to_numpy(dtype=np.float64)
+        return render_rows(self.rows, values)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Pre-render the summary tables for all SPORES"
+    )
+    parser.add_argument("data_dir", nargs="?", default="./data")
+    args = parser.parse_args()
+    print(f"Wrote {prerender(args.data_dir)}")
@@ -0,0 +1,87 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import aggregates
+import filtering
+
+COLUMNS = ["a", "b", "c", "empty"]
+N_ROWS = 2000
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(N_ROWS, len(COLUMNS)))
+    values[rng.random(values.shape) < 0.1] = np.nan
+    values[:, -1] = np.nan
+    # Ties, which the quantiles of large selections must handle as np does
+    values[::7, 0] = 0.5
+    return pd.DataFrame(values, columns=COLUMNS)
+
+
+def expected(df, positions):
+    block = df[COLUMNS].to_numpy()[positions]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.vstack(
+            [
+                (~np.isnan(block)).sum(axis=0),
+                np.nanmin(block, axis=0),
+                np.nanquantile(block, aggregates.QUANTILES, axis=0),
+                np.nanmax(block, axis=0),
+                np.nanmean(block, axis=0),
+            ]
+        )
+
+
+@pytest.mark.parametrize("exact_limit", [0, N_ROWS])
+@pytest.mark.parametrize("n_selected", [1, 2, 5, 300, N_ROWS])
+def test_compute_matches_numpy(df, exact_limit, n_selected):
+    # exact_limit=0 aggregates every selection in chunks
+    stats = aggregates.SelectionStats(
+        df, COLUMNS, exact_limit=exact_limit, chunk_size=128
+    )
+    rng = np.random.default_rng(n_selected)
+    positions = np.sort(rng.choice(N_ROWS, n_selected, replace=False))
+    np.testing.assert_allclose(
+        stats.compute(positions), expected(df, positions), equal_nan=True
+    )
+
+
+def test_empty_selection(df):
+    stats = aggregates.SelectionStats(df, COLUMNS, exact_limit=0)
+    result = stats.compute([])
+    assert result.shape == (len(aggregates.STATISTICS), len(COLUMNS))
+    assert (result[0] == 0).all()
+    assert np.isnan(result[1:]).all()
+
+
+def test_orders_shared_with_index(df):
+    index = filtering.ColumnRangeIndex(df, ["a", "b"])
+    stats = aggregates.SelectionStats(df, COLUMNS, index=index, exact_limit=0)
+    assert stats.order(0) is index.order("a")
+    assert stats.order(1) is index.order("b")
+    positions = np.arange(0, N_ROWS, 3)
+    np.testing.assert_allclose(
+        stats.compute(positions), expected(df, positions), equal_nan=True
+    )
+
+
+def test_lazy_orders(df):
+    stats = aggregates.SelectionStats(df, COLUMNS, exact_limit=0, lazy=True)
+    assert all(order is None for order in stats._orders)
+    stats.compute(np.arange(N_ROWS))
+    # Only for the columns with values in the selection
+    assert [order is not None for order in stats._orders] == [True, True, True, False]
+
+
+def test_render_skips_columns_without_values(df):
+    stats = aggregates.SelectionStats(df, COLUMNS)
+    rows = [(col, "<unit>") for col in COLUMNS]
+    table = aggregates.render(rows, stats.compute(np.arange(N_ROWS)))
+    assert table.count("<tr>") == len(COLUMNS) - 1
+    assert "&lt;unit&gt;" in table
+    assert "<th>empty</th>" not in table
@@ -0,0 +1,182 @@
+import numpy as np
+import pytest
+
+import api
+import app
+
+ID, OTHER_ID = list(app.COLS)[:2]
+OTHER_COL = app.COLS[OTHER_ID]["col"]
+
+QUERIES = [
+    {ID: [0, 0.5], OTHER_COL: [0.1, 0.6]},
+    {OTHER_ID: [0.9, 1]},
+    {},
+    {ID: [2, 3]},
+]
+
+
+@pytest.fixture
+def client():
+    return app.server.test_client()
+
+
+@pytest.fixture
+def data():
+    return app.spores_data.current
+
+
+def expected_ids(data, query):
+    # Indicators are given by slider id or column name
+    mask = np.ones(len(data.df_spores), dtype=bool)
+    for key, (low, high) in query.items():
+        col = app.COLS[key]["col"] if key in app.COLS else key
+        mask &= data.df_spores[col].between(low, high).to_numpy()
+    return data.df_spores.index[mask].tolist()
+
+
+def read_arrow(response):
+    import pyarrow as pa
+
+    assert response.mimetype == api.ARROW_MIMETYPE
+    return pa.ipc.open_stream(response.data).read_all().to_pydict()
+
+
+def test_filter_ids(client, data):
+    response = client.post("/api/filter", json={"queries": QUERIES})
+    assert response.status_code == 200
+    assert response.json["version"] == data.version
+    assert response.json["ids"] == [expected_ids(data, q) for q in QUERIES]
+
+
+def test_filter_counts(client, data):
+    response = client.post("/api/filter", json={"queries": QUERIES, "result": "counts"})
+    assert response.json["counts"] == [len(expected_ids(data, q)) for q in QUERIES]
+
+
+def test_filter_ids_arrow(client, data):
+    response = client.post("/api/filter", json={"queries": QUERIES, "format": "arrow"})
+    table = read_arrow(response)
+    expected = [
+        (i, id_) for i, query in enumerate(QUERIES) for id_ in expected_ids(data, query)
+    ]
+    assert list(zip(table["query"], table["id"])) == expected
+
+
+def test_filter_counts_arrow(client, data):
+    response = client.post(
+        "/api/filter", json={"queries": QUERIES, "result": "counts", "format": "arrow"}
+    )
+    table = read_arrow(response)
+    assert table["query"] == list(range(len(QUERIES)))
+    assert table["count"] == [len(expected_ids(data, q)) for q in QUERIES]
+
+
+def test_filter_in_blocks(client, data, monkeypatch):
+    # Fewer queries per block than in the request
+    monkeypatch.setattr(api, "BLOCK_ELEMENTS", len(data.df_spores))
+    response = client.post("/api/filter", json={"queries": QUERIES})
+    assert response.json["ids"] == [expected_ids(data, q) for q in QUERIES]
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        None,
+        [],
+        {},
+        {"queries": []},
+        {"queries": {ID: [0, 1]}},
+        {"queries": [[0, 1]]},
+        {"queries": [{"unknown": [0, 1]}]},
+        {"queries": [{ID: [0]}]},
+        {"queries": [{ID: ["a", 1]}]},
+        {"queries": [{ID: 1}]},
+        {"queries": [{}], "result": "rows"},
+        {"queries": [{}], "format": "csv"},
+    ],
+)
+def test_filter_bad_request(client, body):
+    if body is None:
+        response = client.post("/api/filter", data="{", content_type="application/json")
+    else:
+        response = client.post("/api/filter", json=body)
+    assert response.status_code == 400
+    assert response.json["error"]
+
+
+def test_filter_query_limit(client, monkeypatch):
+    monkeypatch.setattr(api, "MAX_QUERIES", 2)
+    response = client.post("/api/filter", json={"queries": [{}] * 3})
+    assert response.status_code == 413
+    response = client.post("/api/filter", json={"queries": [{}] * 2})
+    assert response.status_code == 200
+
+
+def test_filter_result_limit(client, data, monkeypatch):
+    monkeypatch.setattr(api, "MAX_RESULT_IDS", len(data.df_spores))
+    response = client.post("/api/filter", json={"queries": [{}, {}]})
+    assert response.status_code == 413
+    # Counts are not limited
+    body = {"queries": [{}, {}], "result": "counts"}
+    response = client.post("/api/filter", json=body)
+    assert response.json["counts"] == [len(data.df_spores)] * 2
+
+
+def test_similar(client, data):
+    ids = data.spore_ids[[0, 5]].tolist()
+    response = client.post("/api/similar", json={"ids": ids, "k": 3})
+    assert response.status_code == 200
+    neighbours, distances = data.similarity.neighbours([0, 5], 3)
+    assert response.json["neighbours"] == data.spore_ids[neighbours].tolist()
+    np.testing.assert_allclose(response.json["distances"], distances, atol=1e-6)
+
+
+def test_similar_filter(client, data):
+    query = {ID: [0, 0.5]}
+    body = {"ids": [data.spore_ids[0].item()], "k": 5, "filter": query}
+    response = client.post("/api/similar", json=body)
+    (neighbours,) = response.json["neighbours"]
+    assert len(neighbours) == 5
+    assert set(neighbours) <= set(expected_ids(data, query))
+
+
+def test_similar_filter_with_fewer_matches_than_k(client, data):
+    response = client.post(
+        "/api/similar",
+        json={"ids": [data.spore_ids[0].item()], "k": 5, "filter": {ID: [2, 3]}},
+    )
+    assert response.json["neighbours"] == [[]]
+    assert response.json["distances"] == [[]]
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        None,
+        {},
+        {"ids": []},
+        {"ids": 3},
+        {"ids": [0], "k": 0},
+        {"ids": [0], "k": 1.5},
+        {"ids": [0], "k": api.MAX_NEIGHBOURS + 1},
+        {"ids": [-1]},
+        {"ids": [0], "filter": {"unknown": [0, 1]}},
+    ],
+)
+def test_similar_bad_request(client, body):
+    if body is None:
+        response = client.post("/api/similar", data="", content_type="application/json")
+    else:
+        response = client.post("/api/similar", json=body)
+    assert response.status_code == 400
+    assert response.json["error"]
+
+
+def test_similar_limits(client, monkeypatch):
+    monkeypatch.setattr(api, "MAX_QUERIES", 2)
+    assert client.post("/api/similar", json={"ids": [0, 1, 2]}).status_code == 413
+    monkeypatch.setattr(api, "MAX_RESULT_IDS", 10)
+    response = client.post("/api/similar", json={"ids": [0, 1], "k": 6})
+    assert response.status_code == 413
+    response = client.post("/api/similar", json={"ids": [0, 1], "k": 5})
+    assert response.status_code == 200
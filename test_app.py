@@ -0,0 +1,192 @@
+import base64
+
+import numpy as np
+import pytest
+
+import app
+
+
+def decode(array):
+    # Inverse of payload.array
+    if isinstance(array, dict):
+        return np.frombuffer(base64.b64decode(array["bdata"]), dtype=array["dtype"])
+    return np.asarray(array)
+
+
+@pytest.fixture
+def data():
+    return app.spores_data.current
+
+
+def full_ranges():
+    return [[0, 1] for _ in app.COLS]
+
+
+def test_figure_template_has_no_points():
+    rows = app.FIGURE_TEMPLATE["data"]
+    for trace in rows:
+        assert not {"x", "y", "customdata", "hovertext"} & set(trace)
+    # Rows are numbered from the bottom up
+    assert [trace["y0"] for trace in rows] == list(range(len(rows) - 1, -1, -1))
+
+
+def test_strip_traces(data):
+    positions = np.arange(0, len(data.spore_ids), 3)
+    traces = app.strip_traces(data, positions)
+    assert len(traces) == len(app.FIGURE_TEMPLATE["data"])
+    for trace, values in zip(traces, data.trace_values):
+        # Only the points, which the browser adds to the template traces
+        assert set(trace) == {"x"}
+        np.testing.assert_allclose(
+            decode(trace["x"]), values[positions].round(app.FIGURE_DECIMALS), atol=1e-6
+        )
+
+
+def test_update_figure_full_ranges(data):
+    points, num_results = app.update_figure(None, full_ranges())
+    positions = app.filtered_positions(data, full_ranges())
+    assert num_results == len(positions)
+    np.testing.assert_array_equal(decode(points["ids"]), data.spore_ids[positions])
+    for trace in points["traces"]:
+        assert len(decode(trace["x"])) == len(positions)
+
+
+def test_update_figure_empty_selection():
+    points, num_results = app.update_figure(None, [[2, 2] for _ in app.COLS])
+    assert num_results == 0
+    assert len(decode(points["ids"])) == 0
+    assert all(len(decode(trace["x"])) == 0 for trace in points["traces"])
+
+
+def test_update_figure_pareto_front(data):
+    objectives = [f"{id_}:min" for id_ in list(app.COLS)[:2]]
+    points, num_results = app.update_figure(objectives, full_ranges())
+    front = points["traces"][-1]
+    assert front["name"] == "Pareto front"
+    n_front = len(decode(front["customdata"])) // (len(app.FIGURE_TEMPLATE["data"]) - 1)
+    assert num_results.endswith(f"({n_front} on the Pareto front)")
+
+
+@pytest.mark.parametrize(
+    "objectives", [["unknown:min"], ["{}:sideways"], ["{}"], [None], [3]]
+)
+def test_update_figure_ignores_invalid_objectives(data, objectives):
+    id_ = list(app.COLS)[0]
+    objectives = [o.format(id_) if isinstance(o, str) else o for o in objectives]
+    points, num_results = app.update_figure(objectives, full_ranges())
+    assert num_results == len(app.filtered_positions(data, full_ranges()))
+    assert all(trace.get("name") != "Pareto front" for trace in points["traces"])
+    # Valid objectives given with them are kept
+    points, num_results = app.update_figure(objectives + [f"{id_}:max"], full_ranges())
+    assert points["traces"][-1]["name"] == "Pareto front"
+
+
+@pytest.mark.parametrize(
+    "webgl_threshold, density_threshold, types",
+    [
+        (10**9, 10**9, {None}),
+        (10, 10**9, {"scattergl"}),
+        (10, 10, {"heatmap"}),
+    ],
+)
+def test_figure_modes(data, monkeypatch, webgl_threshold, density_threshold, types):
+    monkeypatch.setattr(app, "FIGURE_WEBGL_THRESHOLD", webgl_threshold)
+    monkeypatch.setattr(app, "FIGURE_DENSITY_THRESHOLD", density_threshold)
+    points, _ = app.update_figure(None, full_ranges())
+    assert {trace.get("type") for trace in points["traces"]} == types
+
+
+def test_webgl_traces(data, monkeypatch):
+    monkeypatch.setattr(app, "FIGURE_WEBGL_THRESHOLD", 10)
+    positions = app.filtered_positions(data, full_ranges())
+    points, _ = app.update_figure(None, full_ranges())
+    # The dummy row is left out
+    rows = app.FIGURE_TEMPLATE["data"][1:]
+    assert [trace["type"] for trace in points["traces"]] == ["scattergl"] * len(rows)
+    for trace, row, values in zip(points["traces"], rows, data.trace_values[1:]):
+        np.testing.assert_allclose(
+            decode(trace["x"]), values[positions], atol=10**-app.FIGURE_DECIMALS
+        )
+        assert np.all(np.abs(decode(trace["y"]) - row["y0"]) <= 0.35 + 1e-3)
+
+
+def test_webgl_points_keep_their_place(data, monkeypatch):
+    monkeypatch.setattr(app, "FIGURE_WEBGL_THRESHOLD", 10)
+    ranges = full_ranges()
+    all_positions = app.filtered_positions(data, ranges)
+    all_points, _ = app.update_figure(None, ranges)
+    ranges[0] = [0.2, 0.6]
+    positions = app.filtered_positions(data, ranges)
+    points, _ = app.update_figure(None, ranges)
+    # Each SPORE has the same vertical offset, whichever others are shown
+    for trace, all_trace in zip(points["traces"], all_points["traces"]):
+        y = dict(zip(all_positions.tolist(), decode(all_trace["y"])))
+        assert decode(trace["y"]).tolist() == [y[i] for i in positions.tolist()]
+
+
+def test_density_traces(data, monkeypatch):
+    monkeypatch.setattr(app, "FIGURE_DENSITY_THRESHOLD", 10)
+    positions = app.filtered_positions(data, full_ranges())
+    row_by_id = dict(zip(data.spore_ids.tolist(), range(len(data.spore_ids))))
+    points, _ = app.update_figure(None, full_ranges())
+    bins = app.FIGURE_DENSITY_BINS
+    for trace, values in zip(points["traces"], data.trace_values[1:]):
+        assert trace["type"] == "heatmap"
+        counts = [c or 0 for c in trace["z"][0]]
+        assert len(counts) == bins
+        assert sum(counts) == len(positions)
+        # Every occupied bin carries the id of one of its SPORES
+        for b, (count, spore_id) in enumerate(zip(counts, trace["customdata"][0])):
+            assert (spore_id is None) == (count == 0)
+            if spore_id is not None:
+                value = values[row_by_id[spore_id]]
+                assert b / bins - 1e-9 <= value <= (b + 1) / bins + 1e-9
+
+
+def click_scatter(click_data):
+    client = app.server.test_client()
+    return client.post(
+        "/_dash-update-component",
+        json={
+            "output": "spore-id.data",
+            "outputs": {"id": "spore-id", "property": "data"},
+            "inputs": [
+                {"id": "spores-scatter", "property": "clickData", "value": click_data},
+                {"id": "reset-spore", "property": "n_clicks", "value": None},
+                [],
+                {"id": "spore-id", "property": "data", "value": None},
+            ],
+            "changedPropIds": ["spores-scatter.clickData"],
+            "state": [],
+        },
+    )
+
+
+def test_click_selects_spore(data):
+    spore_id = int(data.spore_ids[5])
+    response = click_scatter({"points": [{"customdata": spore_id}]})
+    assert response.status_code == 200
+    assert response.json["response"]["spore-id"]["data"] == spore_id
+
+
+@pytest.mark.parametrize(
+    "click_data",
+    [{"points": [{"customdata": None}]}, {"points": [{"z": 3}]}, {"points": []}],
+)
+def test_clicks_without_spore_are_ignored(click_data):
+    # E.g. on an empty bin in density mode
+    assert click_scatter(click_data).status_code == 204
+
+
+def test_update_histograms_patches(data):
+    ranges = full_ranges()
+    ranges[0] = [0.2, 0.6]
+    patches = app.update_histograms(ranges)
+    assert len(patches) == len(app.COLS)
+    expected = data.crossfilter.copy().update(
+        [app.caching.quantize_range(range_, app.SLIDER_STEP) for range_ in ranges]
+    )
+    for patch, counts in zip(patches, expected):
+        (operation,) = patch.to_plotly_json()["operations"]
+        assert operation["location"] == ["data", 0, "y"]
+        assert operation["params"]["value"] == counts.tolist()
@@ -0,0 +1,150 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+import caching
+
+
+class Clock:
+    # Distinct, increasing access times
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        self.now += 1
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(caching, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "cache.sqlite")
+
+
+def keys(path):
+    with sqlite3.connect(path) as conn:
+        return {key for (key,) in conn.execute("SELECT key FROM cache")}
+
+
+def stored_total(path):
+    with sqlite3.connect(path) as conn:
+        (total,) = conn.execute(
+            "SELECT value FROM meta WHERE name = 'total_size'"
+        ).fetchone()
+        (actual,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()
+    assert total == actual
+    return total
+
+
+def test_get_and_set(path):
+    cache = caching.SharedLRUCache(path, max_bytes=100)
+    assert cache.get("a") is None
+    cache.set("a", b"value")
+    assert cache.get("a") == b"value"
+    cache.set("a", b"other value")
+    assert cache.get("a") == b"other value"
+    assert stored_total(path) == len(b"other value")
+
+
+def test_evicts_least_recently_accessed(path):
+    cache = caching.SharedLRUCache(path, max_bytes=30, touch_interval=0)
+    for key in "abc":
+        cache.set(key, b"x" * 10)
+    # Makes "b" the least recently accessed
+    cache.get("a")
+    cache.set("d", b"x" * 10)
+    assert keys(path) == {"a", "c", "d"}
+    cache.set("e", b"x" * 20)
+    assert keys(path) == {"d", "e"}
+
+
+def test_access_time_is_only_updated_after_touch_interval(path):
+    cache = caching.SharedLRUCache(path, max_bytes=30, touch_interval=60)
+    for key in "abc":
+        cache.set(key, b"x" * 10)
+    cache.get("a")
+    cache.set("d", b"x" * 10)
+    assert keys(path) == {"b", "c", "d"}
+
+
+def test_size_cap(path):
+    cache = caching.SharedLRUCache(path, max_bytes=100)
+    for i in range(50):
+        cache.set(str(i), b"x" * (i % 7 + 1) * 5)
+        assert stored_total(path) <= 100
+    # Replacing an entry counts only its new size
+    cache.set("49", b"x")
+    assert stored_total(path) <= 100
+    # Values larger than the whole cache are not stored
+    cache.set("large", b"x" * 101)
+    assert cache.get("large") is None
+
+
+def test_total_of_an_existing_store(path):
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE cache (key TEXT PRIMARY KEY, value BLOB NOT NULL,"
+            " size INTEGER NOT NULL, accessed REAL NOT NULL)"
+        )
+        conn.execute("INSERT INTO cache VALUES ('old', x'0000', 2, 0)")
+    cache = caching.SharedLRUCache(path, max_bytes=10)
+    assert stored_total(path) == 2
+    cache.set("new", b"x" * 9)
+    assert keys(path) == {"new"}
+    assert stored_total(path) == 9
+
+
+def test_clear(path):
+    cache = caching.SharedLRUCache(path, max_bytes=100)
+    cache.set("a", b"value")
+    cache.clear()
+    assert cache.get("a") is None
+    assert stored_total(path) == 0
+
+
+def test_store_that_cannot_be_opened(tmp_path):
+    # Its directory cannot be created, as a file of the same name exists
+    (tmp_path / "file").write_text("")
+    cache = caching.SharedLRUCache(str(tmp_path / "file" / "c.sqlite"), max_bytes=100)
+    cache.set("a", b"value")
+    assert cache.get("a") is None
+    cache.clear()
+
+
+def test_quantize_range():
+    assert caching.quantize_range([0.1, 0.5], 0.01) == [0.1, 0.5]
+    assert caching.quantize_range([0.1234, 0.5678], 0.01) == [0.12, 0.57]
+    assert caching.quantize_range([0.3 - 0.2, 0.7], 0.1) == [0.1, 0.7]
+
+
+def test_local_lru_cache():
+    cache = caching.LocalLRUCache(2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_local_lru_cache_max_bytes():
+    cache = caching.LocalLRUCache(10, max_bytes=100)
+    cache.set("a", np.zeros(40, dtype=np.uint8))
+    cache.set("b", np.zeros(40, dtype=np.uint8))
+    cache.set("c", np.zeros(40, dtype=np.uint8))
+    assert cache.get("a") is None
+    assert cache.nbytes == 80
+    # Replacing an item counts only its new size
+    cache.set("b", np.zeros(10, dtype=np.uint8))
+    assert cache.nbytes == 50
+    # Items larger than the whole cache are not kept
+    cache.set("d", np.zeros(101, dtype=np.uint8))
+    assert cache.get("d") is None
+    assert cache.nbytes == 50
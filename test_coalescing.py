@@ -0,0 +1,87 @@
+import pytest
+from dash.exceptions import PreventUpdate
+
+import coalescing
+
+
+@pytest.fixture
+def tracker(tmp_path):
+    return coalescing.RequestTracker(str(tmp_path / "requests.sqlite"))
+
+
+def sequence(number, page="page"):
+    return {"page": page, "number": number}
+
+
+def test_higher_number_supersedes(tracker):
+    first = tracker.start("key", 1)
+    second = tracker.start("key", 2)
+    assert tracker.is_superseded("key", first)
+    assert not tracker.is_superseded("key", second)
+
+
+def test_older_request_arriving_late(tracker):
+    # A request that reaches the server after a newer one is superseded
+    tracker.start("key", 5)
+    ticket = tracker.start("key", 3)
+    assert tracker.is_superseded("key", ticket)
+    assert not tracker.is_superseded("other", ticket)
+
+
+def test_same_number_is_not_superseded(tracker):
+    ticket = tracker.start("key", 4)
+    assert tracker.start("key", 4) == ticket
+    assert not tracker.is_superseded("key", ticket)
+
+
+def test_unreachable_store_never_supersedes(tmp_path):
+    (tmp_path / "file").write_text("")
+    tracker = coalescing.RequestTracker(str(tmp_path / "file" / "requests.sqlite"))
+    assert tracker.start("key", 2) is None
+    assert not tracker.is_superseded("key", None)
+
+
+def test_latest_only_passes_arguments(tracker):
+    calls = []
+
+    def callback(a, b):
+        calls.append((a, b, coalescing.current_session_id()))
+        return a + b
+
+    wrapped = tracker.latest_only(callback)
+    assert wrapped(1, 2, sequence(1), "session") == 3
+    # Without a session or sequence, requests are not tracked
+    assert wrapped(3, 4, None, "session") == 7
+    assert wrapped(5, 6, sequence(1), None) == 11
+    assert calls == [(1, 2, "session"), (3, 4, None), (5, 6, None)]
+    assert coalescing.current_session_id() is None
+
+
+def test_latest_only_drops_superseded_request(tracker):
+    def callback():
+        # A newer request of the same page arrives while this one runs
+        tracker.start("callback:session:page", 2)
+        tracker.check()
+        return "done"
+
+    with pytest.raises(PreventUpdate):
+        tracker.latest_only(callback)(sequence(1), "session")
+
+
+def test_latest_only_drops_request_older_than_the_latest(tracker):
+    wrapped = tracker.latest_only(lambda: "done")
+    assert wrapped(sequence(3), "session") == "done"
+    with pytest.raises(PreventUpdate):
+        wrapped(sequence(2), "session")
+    # Other sessions are independent
+    assert wrapped(sequence(1), "other") == "done"
+
+
+def test_numbers_start_over_on_a_new_page_load(tracker):
+    wrapped = tracker.latest_only(lambda: "done")
+    for number in range(1, 38):
+        assert wrapped(sequence(number, "first"), "session") == "done"
+    # E.g. after going back in the history of the browser, which loads the
+    # page layout again within the same session
+    assert wrapped(sequence(1, "second"), "session") == "done"
+    assert wrapped(sequence(2, "second"), "session") == "done"
@@ -0,0 +1,171 @@
+import gzip
+import json
+import os
+
+import dash
+import flask
+import pytest
+
+import compression
+
+CONTENT = json.dumps({"values": list(range(2000))})
+SCRIPT = "var spores = {};\n" * 200
+
+
+class FakeBrotli:
+    # Marks the data, so that tests can tell which encoding was used
+    @staticmethod
+    def compress(data, quality):
+        return b"br" + data[::-1]
+
+
+def decompress(response):
+    data = response.get_data()
+    encoding = response.headers.get("Content-Encoding")
+    if encoding == "gzip":
+        return gzip.decompress(data)
+    if encoding == "br":
+        assert data.startswith(b"br")
+        return data[2:][::-1]
+    assert encoding is None
+    return data
+
+
+@pytest.fixture
+def assets_dir(tmp_path):
+    assets_dir = tmp_path / "assets"
+    assets_dir.mkdir()
+    (assets_dir / "script.js").write_text(SCRIPT)
+    (assets_dir / "small.css").write_text("body {}")
+    return assets_dir
+
+
+def make_app(assets_dir, build_dir):
+    app = dash.Dash(__name__, assets_folder=str(assets_dir))
+    app.layout = dash.html.Div()
+
+    @app.server.route("/data")
+    def data():
+        return flask.Response(CONTENT, mimetype="application/json")
+
+    @app.server.route("/small")
+    def small():
+        return flask.jsonify([1, 2, 3])
+
+    @app.server.route("/stream")
+    def stream():
+        return flask.Response(iter([CONTENT]), mimetype="text/plain")
+
+    compression.instrument(app, build_dir=str(build_dir))
+    return app.server.test_client()
+
+
+@pytest.fixture
+def client(assets_dir, tmp_path):
+    return make_app(assets_dir, tmp_path / "build")
+
+
+@pytest.fixture
+def with_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "_brotli", lambda: FakeBrotli)
+
+
+@pytest.fixture
+def without_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "_brotli", lambda: None)
+
+
+@pytest.mark.parametrize(
+    "accept, encoding",
+    [
+        ("gzip, deflate, br", "br"),
+        ("br;q=0.5, gzip", "gzip"),
+        ("gzip", "gzip"),
+        ("identity", None),
+        ("", None),
+    ],
+)
+def test_negotiation_with_brotli(client, with_brotli, accept, encoding):
+    response = client.get("/data", headers={"Accept-Encoding": accept})
+    assert response.headers.get("Content-Encoding") == encoding
+    assert "Accept-Encoding" in response.vary
+    assert decompress(response) == CONTENT.encode()
+
+
+@pytest.mark.parametrize(
+    "accept, encoding",
+    [("gzip, deflate, br", "gzip"), ("br", None)],
+)
+def test_negotiation_without_brotli(client, without_brotli, accept, encoding):
+    assert compression.encodings() == ["gzip"]
+    response = client.get("/data", headers={"Accept-Encoding": accept})
+    assert response.headers.get("Content-Encoding") == encoding
+    assert decompress(response) == CONTENT.encode()
+
+
+def test_brotli():
+    brotli = pytest.importorskip("brotli")
+    data = CONTENT.encode()
+    assert brotli.decompress(compression.compress(data, "br", 4)) == data
+
+
+def test_gzip_is_deterministic():
+    data = CONTENT.encode()
+    compressed = compression.compress(data, "gzip", 6)
+    assert compressed == compression.compress(data, "gzip", 6)
+    assert gzip.decompress(compressed) == data
+
+
+def test_small_and_streamed_responses_are_not_compressed(client, without_brotli):
+    for path in ["/small", "/stream"]:
+        response = client.get(path, headers={"Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in response.headers
+
+
+def test_static_files(client, without_brotli):
+    response = client.get("/assets/script.js", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Ranges" not in response.headers
+    assert decompress(response) == SCRIPT.encode()
+    etag, weak = response.get_etag()
+    assert weak
+
+    # Conditional requests match the uncompressed file
+    response = client.get(
+        "/assets/script.js",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": f'"{etag}"'},
+    )
+    assert response.status_code == 304
+
+    response = client.get("/assets/small.css", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+
+
+def test_prebuilt_static_files(assets_dir, tmp_path, with_brotli):
+    build_dir = tmp_path / "build"
+    assert compression.build(str(assets_dir), str(build_dir)) == 2
+    # Only changed files are compressed again
+    assert compression.build(str(assets_dir), str(build_dir)) == 0
+    assert not (build_dir / "small.css.gz").exists()
+    # Marks the prebuilt copy, to tell it apart from one compressed on request
+    prebuilt = gzip.compress(b"prebuilt")
+    (build_dir / "script.js.gz").write_bytes(prebuilt)
+
+    client = make_app(assets_dir, build_dir)
+    response = client.get("/assets/script.js", headers={"Accept-Encoding": "gzip"})
+    assert response.get_data() == prebuilt
+    response = client.get("/assets/script.js", headers={"Accept-Encoding": "br"})
+    assert decompress(response) == SCRIPT.encode()
+
+
+def test_outdated_prebuilt_files_are_not_used(assets_dir, tmp_path, without_brotli):
+    build_dir = tmp_path / "build"
+    compression.build(str(assets_dir), str(build_dir))
+    path = assets_dir / "script.js"
+    path.write_text(SCRIPT * 2)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    client = make_app(assets_dir, build_dir)
+    response = client.get("/assets/script.js", headers={"Accept-Encoding": "gzip"})
+    assert decompress(response) == (SCRIPT * 2).encode()
@@ -0,0 +1,150 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import dataset
+
+
+def write_csv(data_dir, n_rows=50, seed=0):
+    rng = np.random.default_rng(seed)
+    df_spores = pd.DataFrame(
+        rng.random((n_rows, 3)),
+        columns=["Curtailment", "Storage", "PV"],
+        index=pd.Index(np.arange(n_rows) * 3, name="id"),
+    )
+    df_spores.iloc[2, 1] = np.nan
+    df_units = pd.DataFrame({"unit": ["%", "TW", "TW"]}, index=df_spores.columns)
+    df_spores.to_csv(os.path.join(data_dir, dataset.DATA_FILE))
+    df_units.to_csv(os.path.join(data_dir, dataset.UNITS_FILE))
+    return df_spores, df_units
+
+
+def backed_by_memmap(array):
+    while isinstance(array, np.ndarray):
+        if isinstance(array, np.memmap):
+            return True
+        array = array.base
+    return False
+
+
+def touch(path):
+    # A later modification time, even on file systems with coarse timestamps
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    write_csv(tmp_path)
+    return str(tmp_path)
+
+
+def test_convert_round_trip(data_dir):
+    df_csv, units_csv = dataset.read_csv(data_dir)
+    dataset.convert(data_dir)
+    assert not dataset.is_stale(data_dir)
+    df_spores, df_units = dataset.load(data_dir)
+    # Backed by the memory-mapped file rather than a copy of it
+    assert all(backed_by_memmap(df_spores[col].to_numpy()) for col in df_spores)
+    pd.testing.assert_frame_equal(df_spores, df_csv)
+    pd.testing.assert_frame_equal(df_units, units_csv)
+    pd.testing.assert_frame_equal(dataset.load_units(data_dir), units_csv)
+
+
+def test_columns_are_contiguous(data_dir):
+    dataset.convert(data_dir)
+    df_spores, _ = dataset.load(data_dir)
+    for col in df_spores.columns:
+        assert df_spores[col].to_numpy().flags["C_CONTIGUOUS"]
+
+
+def test_convert_rejects_non_numeric_columns(tmp_path):
+    df_spores, _ = write_csv(tmp_path)
+    df_spores["name"] = "a"
+    df_spores.to_csv(tmp_path / dataset.DATA_FILE)
+    with pytest.raises(ValueError):
+        dataset.convert(str(tmp_path))
+    assert dataset.is_stale(str(tmp_path))
+
+
+def test_stale_copy_falls_back_to_csv(data_dir):
+    assert dataset.is_stale(data_dir)
+    dataset.convert(data_dir)
+    df_new, _ = write_csv(data_dir, n_rows=20, seed=1)
+    touch(os.path.join(data_dir, dataset.DATA_FILE))
+    assert dataset.is_stale(data_dir)
+    with pytest.warns(UserWarning, match="out of date"):
+        df_spores, _ = dataset.load(data_dir)
+    pd.testing.assert_frame_equal(df_spores, df_new)
+    dataset.convert(data_dir)
+    assert not dataset.is_stale(data_dir)
+
+
+def test_source_version(data_dir):
+    version = dataset.source_version(data_dir)
+    assert dataset.source_version(data_dir) == version
+    dataset.convert(data_dir)
+    # The columnar copy counts towards the version
+    converted = dataset.source_version(data_dir)
+    assert converted != version
+    touch(os.path.join(data_dir, dataset.UNITS_FILE))
+    assert dataset.source_version(data_dir) not in (version, converted)
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_registry_reloads_changed_data(data_dir):
+    prepared = []
+
+    def prepare(data):
+        data.n_rows = len(data.df_spores)
+        prepared.append(data.version)
+
+    registry = dataset.DatasetRegistry(data_dir, prepare=prepare, check_interval=0)
+    old = registry.current
+    assert old.n_rows == 50
+    # Unchanged files are not loaded again
+    registry.check()
+    assert prepared == [old.version]
+
+    write_csv(data_dir, n_rows=20, seed=1)
+    touch(os.path.join(data_dir, dataset.DATA_FILE))
+    wait_for(lambda: registry.current.version != old.version)
+    assert registry.current.n_rows == 20
+    assert prepared == [old.version, registry.current.version]
+    # Requests that still hold the old version keep using it
+    assert old.n_rows == 50
+
+
+def test_registry_keeps_serving_on_failed_reload(data_dir):
+    fail = []
+
+    def prepare(data):
+        if fail:
+            raise RuntimeError("broken")
+
+    registry = dataset.DatasetRegistry(data_dir, prepare=prepare, check_interval=None)
+    old = registry.current
+    fail.append(True)
+    write_csv(data_dir, n_rows=20, seed=1)
+    touch(os.path.join(data_dir, dataset.DATA_FILE))
+    # As run in the background by check()
+    with pytest.warns(UserWarning, match="Failed to load"):
+        registry._reload(dataset.source_version(data_dir))
+    assert registry.current is old
+
+
+def test_registry_without_reloading(data_dir):
+    registry = dataset.DatasetRegistry(data_dir, check_interval=None)
+    old = registry.current
+    write_csv(data_dir, n_rows=20, seed=1)
+    touch(os.path.join(data_dir, dataset.DATA_FILE))
+    assert registry.current is old
@@ -0,0 +1,107 @@
+import json
+
+import pandas as pd
+import pytest
+
+import dataset
+import dimensions
+
+UNITS = {
+    "Curtailment": "0-1",
+    "Storage discharge capacity": "0-1",
+    "Total cost": "EUR",
+    "PV (rooftop)": "0-1",
+}
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    df_units = pd.DataFrame({"unit": list(UNITS.values())}, index=list(UNITS))
+    df_units.to_csv(tmp_path / dataset.UNITS_FILE)
+    return str(tmp_path)
+
+
+def write_config(tmp_path, config):
+    path = tmp_path / "dimensions.json"
+    path.write_text(json.dumps(config))
+    return str(path)
+
+
+def test_without_config(data_dir, tmp_path):
+    dims = dimensions.load(data_dir, str(tmp_path / "missing.json"))
+    # Only the relative indicators, in the order of units.csv
+    assert list(dims) == ["curtailment", "storage-discharge-capacity", "pv-rooftop"]
+    assert dims["pv-rooftop"] == dict(
+        col="PV (rooftop)",
+        label="PV (rooftop)",
+        color=dimensions.PALETTE[2],
+        help_text="",
+    )
+
+
+def test_config_sets_order_and_labels(data_dir, tmp_path):
+    config = [
+        {
+            "id": "storage",
+            "col": "Storage discharge capacity",
+            "label": "Storage capacity",
+            "color": "#000000",
+            "help_text": "Discharge capacity of storage.",
+        },
+        {"id": "curtailment", "col": "Curtailment"},
+        # Columns that are missing or not relative are left out
+        {"id": "missing", "col": "Missing"},
+        {"id": "cost", "col": "Total cost"},
+    ]
+    dims = dimensions.load(data_dir, write_config(tmp_path, config))
+    assert list(dims) == ["storage", "curtailment", "pv-rooftop"]
+    assert dims["storage"] == dict(
+        col="Storage discharge capacity",
+        label="Storage capacity",
+        color="#000000",
+        help_text="Discharge capacity of storage.",
+    )
+    assert dims["curtailment"] == dict(
+        col="Curtailment",
+        label="Curtailment",
+        color=dimensions.PALETTE[1],
+        help_text="",
+    )
+    assert dims["pv-rooftop"]["color"] == dimensions.PALETTE[2]
+
+
+def test_palette_repeats(tmp_path):
+    cols = [f"Indicator {i}" for i in range(len(dimensions.PALETTE) + 2)]
+    df_units = pd.DataFrame({"unit": "0-1"}, index=cols)
+    df_units.to_csv(tmp_path / dataset.UNITS_FILE)
+    dims = dimensions.load(str(tmp_path), str(tmp_path / "missing.json"))
+    colors = [dim["color"] for dim in dims.values()]
+    assert colors == (dimensions.PALETTE * 2)[: len(cols)]
+
+
+def test_from_columnar_copy(tmp_path):
+    df_units = pd.DataFrame({"unit": list(UNITS.values())}, index=list(UNITS))
+    df_spores = pd.DataFrame(
+        [[0.5, 0.1, 10.0, 0.2]],
+        columns=list(UNITS),
+        index=pd.Index([0], name="id"),
+    )
+    df_spores.to_csv(tmp_path / dataset.DATA_FILE)
+    df_units.to_csv(tmp_path / dataset.UNITS_FILE)
+    missing = str(tmp_path / "missing.json")
+    expected = dimensions.load(str(tmp_path), missing)
+    dataset.convert(str(tmp_path))
+    assert dimensions.load(str(tmp_path), missing) == expected
+
+
+def test_slug():
+    assert dimensions.slug("Storage discharge capacity") == "storage-discharge-capacity"
+    assert dimensions.slug(" PV (rooftop) ") == "pv-rooftop"
+
+
+def test_shipped_config_matches_data():
+    with open(dimensions.CONFIG_FILE) as f:
+        config = json.load(f)
+    dims = dimensions.load("./data")
+    # Every configured dimension is in the data, with a unique id
+    assert [entry["id"] for entry in config] == list(dims)[: len(config)]
@@ -0,0 +1,89 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import app
+
+# The first dimension, as filtered in the tests
+ID = list(app.COLS)[0]
+
+
+@pytest.fixture
+def client():
+    return app.server.test_client()
+
+
+@pytest.fixture
+def data():
+    return app.spores_data.current
+
+
+def slider_ranges(**ranges):
+    return [ranges.get(id_, [0, 1]) for id_ in app.COLS]
+
+
+def read(fmt, body):
+    if fmt == "csv":
+        return pd.read_csv(io.BytesIO(body), index_col=0)
+    return pd.read_parquet(io.BytesIO(body))
+
+
+def check_rows(df, data, ranges):
+    positions = app.filtered_positions(data, ranges)
+    expected = data.df_spores.iloc[positions].drop(columns="dummy")
+    np.testing.assert_array_equal(df.index, expected.index)
+    assert list(df.columns) == list(expected.columns)
+    np.testing.assert_allclose(df.to_numpy(float), expected.to_numpy(float))
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_export_matches_filtered_positions(client, data, fmt):
+    ranges = slider_ranges(**{ID: [0.1, 0.5]})
+    response = client.get(f"/export.{fmt}" + app.update_url(None, ranges))
+    assert response.status_code == 200
+    assert response.mimetype == app.export.FORMATS[fmt]
+    check_rows(read(fmt, response.data), data, ranges)
+
+
+def test_export_without_state_has_the_default_ranges(client, data):
+    response = client.get("/export.csv")
+    ranges = list(data.slider_defaults.values())
+    check_rows(read("csv", response.data), data, ranges)
+
+
+def test_export_legacy_query(client, data):
+    id_ = list(app.COLS)[1]
+    response = client.get(f"/export.csv?slider-{id_}=[0.2,0.6]")
+    ranges = [
+        [0.2, 0.6] if key == id_ else default
+        for key, default in zip(app.COLS, data.slider_defaults.values())
+    ]
+    check_rows(read("csv", response.data), data, ranges)
+
+
+def test_export_empty_selection(client, data):
+    ranges = slider_ranges(**{id_: [2, 2] for id_ in app.COLS})
+    response = client.get("/export.parquet" + app.update_url(None, ranges))
+    df = read("parquet", response.data)
+    assert len(df) == 0
+    assert list(df.columns) == [c for c in data.df_spores.columns if c != "dummy"]
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "?s=!!",
+        "?s=AA",
+        f"?slider-{ID}=[0.1",
+        f"?slider-{ID}=3",
+        f"?slider-{ID}=['a','b']",
+    ],
+)
+def test_export_malformed_state(client, query):
+    assert client.get("/export.csv" + query).status_code == 400
+
+
+def test_export_unknown_format(client):
+    assert client.get("/export.xlsx").status_code == 404
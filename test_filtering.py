@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import filtering
+
+COLUMNS = ["a", "b", "c"]
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    values = rng.random((500, len(COLUMNS))).round(2)
+    values[rng.random(values.shape) < 0.05] = np.nan
+    return pd.DataFrame(values, columns=COLUMNS, index=pd.RangeIndex(500, name="id"))
+
+
+def between(df, ranges):
+    # The filter that the range index replaces
+    mask = np.ones(len(df), dtype=bool)
+    for col, (low, high) in ranges.items():
+        mask &= df[col].between(low, high).to_numpy()
+    return np.flatnonzero(mask)
+
+
+@pytest.mark.parametrize(
+    "ranges",
+    [
+        {"a": [0.2, 0.6]},
+        {"a": [0.2, 0.6], "b": [0.1, 0.3], "c": [0, 1]},
+        # Bounds on existing values are included
+        {"a": [0.5, 0.5], "b": [0.25, 0.75]},
+        {"c": [-1, 2]},
+    ],
+)
+def test_positions_match_between(df, ranges):
+    index = filtering.ColumnRangeIndex(df, COLUMNS)
+    np.testing.assert_array_equal(index.positions(ranges), between(df, ranges))
+
+
+def test_full_ranges_exclude_only_missing_values(df):
+    index = filtering.ColumnRangeIndex(df, COLUMNS)
+    positions = index.positions({col: [0, 1] for col in COLUMNS})
+    np.testing.assert_array_equal(positions, np.flatnonzero(df.notna().all(axis=1)))
+
+
+def test_no_ranges_select_all_rows(df):
+    index = filtering.ColumnRangeIndex(df, COLUMNS)
+    np.testing.assert_array_equal(index.positions({}), np.arange(len(df)))
+
+
+@pytest.mark.parametrize("ranges", [{"a": [2, 3]}, {"a": [0.6, 0.2]}])
+def test_empty_selection(df, ranges):
+    index = filtering.ColumnRangeIndex(df, COLUMNS)
+    assert len(index.positions(ranges)) == 0
+    assert len(index.query(ranges)) == 0
+
+
+def test_query_returns_labels(df):
+    df.index = df.index + 100
+    index = filtering.ColumnRangeIndex(df, COLUMNS)
+    ranges = {"a": [0.2, 0.6]}
+    assert list(index.query(ranges)) == list(df.index[between(df, ranges)])
+
+
+def test_order_sorts_missing_values_last(df):
+    index = filtering.ColumnRangeIndex(df, COLUMNS)
+    values = df["b"].to_numpy()[index.order("b")]
+    n_valid = df["b"].notna().sum()
+    assert np.all(np.diff(values[:n_valid]) >= 0)
+    assert np.isnan(values[n_valid:]).all()
+
+
+def crossfilter_counts(df, ranges, bins):
+    # Histogram of each column over the rows within the ranges of all others
+    values = df[COLUMNS].to_numpy()
+    passing = (values >= [r[0] for r in ranges]) & (values <= [r[1] for r in ranges])
+    counts = []
+    for j in range(len(COLUMNS)):
+        rows = np.delete(passing, j, axis=1).all(axis=1) & ~np.isnan(values[:, j])
+        bin_idx = np.clip(values[rows, j] // (1 / bins), 0, bins - 1).astype(int)
+        counts.append(np.bincount(bin_idx, minlength=bins))
+    return np.array(counts)
+
+
+def test_crossfilter_matches_full_recount(df):
+    index = filtering.ColumnRangeIndex(df, COLUMNS)
+    crossfilter = filtering.Crossfilter(index, 10, limits=[(0, 1)] * len(COLUMNS))
+    ranges = [[0, 1]] * len(COLUMNS)
+    rng = np.random.default_rng(1)
+    # One column at a time, as when moving a slider, then several at once
+    for _ in range(20):
+        ranges = list(ranges)
+        low = rng.uniform(0, 0.8)
+        ranges[rng.integers(len(COLUMNS))] = [low, rng.uniform(low, 1)]
+        np.testing.assert_array_equal(
+            crossfilter.update(ranges), crossfilter_counts(df, ranges, 10)
+        )
+    ranges = [[0.1, 0.9], [0.3, 0.5], [0, 1]]
+    np.testing.assert_array_equal(
+        crossfilter.update(ranges), crossfilter_counts(df, ranges, 10)
+    )
+
+
+def test_crossfilter_empty_selection(df):
+    index = filtering.ColumnRangeIndex(df, COLUMNS)
+    crossfilter = filtering.Crossfilter(index, 10, limits=[(0, 1)] * len(COLUMNS))
+    # Rows outside two ranges count towards no histogram
+    counts = crossfilter.update([[2, 3], [2, 3], [0, 1]])
+    assert counts.sum() == 0
+
+
+def test_crossfilter_copies_are_independent(df):
+    index = filtering.ColumnRangeIndex(df, COLUMNS)
+    crossfilter = filtering.Crossfilter(index, 10, limits=[(0, 1)] * len(COLUMNS))
+    full = crossfilter.update([[0, 1]] * len(COLUMNS))
+    copy = crossfilter.copy()
+    copy.update([[0.2, 0.4], [0, 1], [0, 1]])
+    np.testing.assert_array_equal(crossfilter.update([[0, 1]] * len(COLUMNS)), full)
+    np.testing.assert_array_equal(full, crossfilter_counts(df, [[0, 1]] * 3, 10))
+
+
+def test_crossfilter_copies_take_memory_for_the_filter_state_only(df):
+    index = filtering.ColumnRangeIndex(df, COLUMNS)
+    crossfilter = filtering.Crossfilter(index, 10)
+    # One byte per row for the number of failed filters
+    assert len(df) <= crossfilter.copy().nbytes < len(df) + 1000
@@ -0,0 +1,149 @@
+import hashlib
+import os
+
+import pytest
+
+import app
+import images
+
+WIDTHS = [480, 960, 1440]
+
+
+def write_jpeg(path, width=1000, height=500, color=(200, 100, 50)):
+    from PIL import Image
+
+    Image.new("RGB", (width, height), color).save(path, "JPEG")
+
+
+@pytest.fixture
+def src_dir(tmp_path):
+    src_dir = tmp_path / "src"
+    src_dir.mkdir()
+    write_jpeg(src_dir / "12.jpg")
+    write_jpeg(src_dir / "empty.jpg", width=400, height=300)
+    (src_dir / "notes.txt").write_text("not an image")
+    return str(src_dir)
+
+
+@pytest.fixture
+def build_dir(tmp_path, src_dir):
+    build_dir = str(tmp_path / "build")
+    images.build(src_dir, build_dir, widths=WIDTHS, jobs=1)
+    return build_dir
+
+
+def test_build_image(src_dir, tmp_path):
+    from PIL import Image
+
+    entry = images.build_image(os.path.join(src_dir, "12.jpg"), str(tmp_path), WIDTHS)
+    assert (entry["width"], entry["height"]) == (1000, 500)
+    for fmt in images.FORMATS:
+        # Never scaled up, and always in full size
+        assert [width for _, width in entry[fmt]] == [480, 960, 1000]
+        for name, width in entry[fmt]:
+            match = images.VARIANT_NAME.fullmatch(name)
+            assert match is not None
+            with open(tmp_path / name, "rb") as f:
+                content = f.read()
+            assert hashlib.sha256(content).hexdigest()[:16] == match.group(1)
+            with Image.open(tmp_path / name) as image:
+                assert image.size == (width, width // 2)
+
+
+def test_build_only_changed_images(src_dir, build_dir):
+    manifest = images.Manifest(build_dir)
+    assert manifest.get("12") is not None
+    assert manifest.get("notes") is None
+    assert images.build(src_dir, build_dir, widths=WIDTHS, jobs=1) == (0, 2)
+
+    path = os.path.join(src_dir, "12.jpg")
+    write_jpeg(path, color=(0, 0, 0))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    old = manifest.get("12")
+    assert images.build(src_dir, build_dir, widths=WIDTHS, jobs=1) == (1, 2)
+    # The manifest is read again once it changed
+    assert manifest.get("12")["jpeg"] != old["jpeg"]
+
+    # All images are built again with other settings
+    assert images.build(src_dir, build_dir, widths=[480], jobs=1) == (2, 2)
+
+
+def test_srcset():
+    variants = [["a-480.0123.jpg", 480], ["a-960.4567.jpg", 960]]
+    assert images.srcset(variants, "img/") == (
+        "img/a-480.0123.jpg 480w, img/a-960.4567.jpg 960w"
+    )
+
+
+@pytest.mark.parametrize(
+    "name",
+    ["12-480.0123456789abcdef.jpg", "empty-1440.0123456789abcdef.webp"],
+)
+def test_variant_names(name):
+    assert images.VARIANT_NAME.fullmatch(name)
+
+
+@pytest.mark.parametrize(
+    "name",
+    ["manifest.json", "12.jpg", "12-480.jpg", "12-480.0123456789abcdeg.jpg", "a/b"],
+)
+def test_other_names(name):
+    assert images.VARIANT_NAME.fullmatch(name) is None
+
+
+@pytest.fixture
+def client(build_dir, monkeypatch):
+    monkeypatch.setattr(images, "BUILD_DIR", build_dir)
+    monkeypatch.setattr(app, "image_manifest", images.Manifest(build_dir))
+    return app.server.test_client()
+
+
+def test_overview_image_sources(client):
+    sources = app.overview_image_sources(12)
+    entry = app.image_manifest.get("12")
+    assert sources["src"] == app.IMAGE_URL_PREFIX + entry["jpeg"][-1][0]
+    assert sources["webp"] == images.srcset(entry["webp"], app.IMAGE_URL_PREFIX)
+    # Images without variants are served from the assets as they are
+    assert app.overview_image_sources(3) == {
+        "src": "assets/img/3.jpg",
+        "jpeg": None,
+        "webp": None,
+    }
+
+
+def test_variant_is_immutable(client):
+    name, _ = app.image_manifest.get("12")["webp"][0]
+    response = client.get(f"/{app.IMAGE_URL_PREFIX}{name}")
+    assert response.status_code == 200
+    assert response.cache_control.immutable
+    assert response.cache_control.public
+    assert response.cache_control.max_age == app.IMAGE_MAX_AGE
+    etag, _ = response.get_etag()
+    assert etag == images.VARIANT_NAME.fullmatch(name).group(1)
+
+    response = client.get(
+        f"/{app.IMAGE_URL_PREFIX}{name}", headers={"If-None-Match": f'"{etag}"'}
+    )
+    assert response.status_code == 304
+    assert response.data == b""
+
+
+def test_other_files_are_revalidated(client):
+    response = client.get(f"/{app.IMAGE_URL_PREFIX}{images.MANIFEST_FILE}")
+    assert response.status_code == 200
+    assert not response.cache_control.immutable
+    assert response.cache_control.max_age != app.IMAGE_MAX_AGE
+
+
+def test_missing_variant(client):
+    response = client.get(f"/{app.IMAGE_URL_PREFIX}12-480.0123456789abcdef.jpg")
+    assert response.status_code == 404
+
+
+def test_image_sources_route(client):
+    response = client.get(f"/{app.IMAGE_URL_PREFIX}sources?ids=12,3,")
+    assert response.json == {
+        "12": app.overview_image_sources(12),
+        "3": app.overview_image_sources(3),
+    }
@@ -0,0 +1,91 @@
+import copy
+
+import pytest
+from dash import dcc, html
+
+import app
+import layout_cache
+import url_helpers
+
+COMPONENT_IDS = {"spore-id": ["data"], "slider-a": ["value"], "slider-b": ["value"]}
+
+
+def small_layout(params):
+    with_state = url_helpers.apply_default_value(params)
+    return html.Div(
+        [
+            with_state(dcc.Store)(id="spore-id"),
+            html.Div(
+                [
+                    with_state(dcc.RangeSlider)(
+                        id={"type": "slider", "index": id_}, min=0, max=1, value=[0, 1]
+                    )
+                    for id_ in "ab"
+                ]
+            ),
+            html.P("Text", id="other"),
+        ]
+    )
+
+
+@pytest.mark.parametrize(
+    "state",
+    [
+        {},
+        {"spore-id": {"data": 3}},
+        {"slider-b": {"value": [0.2, 0.4]}, "spore-id": {"data": None}},
+        # Components not in the layout are ignored
+        {"slider-c": {"value": [0, 1]}, "other": {"children": "Changed"}},
+    ],
+)
+def test_matches_apply_default_value(state):
+    cache = layout_cache.LayoutCache(small_layout({}), COMPONENT_IDS)
+    expected = small_layout(
+        {id: props for id, props in state.items() if id in COMPONENT_IDS}
+    )
+    assert cache.get(state) == layout_cache.serialise(expected)
+
+
+def test_template_is_not_changed():
+    cache = layout_cache.LayoutCache(small_layout({}), COMPONENT_IDS)
+    template = copy.deepcopy(cache.template)
+    cache.get({"slider-a": {"value": [0.1, 0.2]}})
+    assert cache.template == template
+
+
+def test_layouts_are_memoized():
+    cache = layout_cache.LayoutCache(small_layout({}), COMPONENT_IDS, maxsize=1)
+    layout = cache.get({"spore-id": {"data": 3}, "slider-a": {"value": [0, 1]}})
+    # Equal states give the same layout, regardless of the order of their keys
+    assert cache.get({"slider-a": {"value": [0, 1]}, "spore-id": {"data": 3}}) is layout
+    cache.get({})
+    assert cache.get({"spore-id": {"data": 3}, "slider-a": {"value": [0, 1]}}) == layout
+
+
+def test_serialised_layout():
+    layout = layout_cache.serialise(small_layout({}))
+    cache = layout_cache.LayoutCache(layout, COMPONENT_IDS)
+    state = {"spore-id": {"data": 5}}
+    assert cache.get(state) == layout_cache.serialise(small_layout(state))
+
+
+def check_page_layout(search):
+    data = app.spores_data.current
+    state = url_helpers.parse_state(
+        "http://localhost/" + search, app.COMPONENT_IDS, app.SLIDER_STEP
+    )
+    fresh = app.page_layout(state, data.slider_defaults)
+    assert data.layouts.get(state) == layout_cache.serialise(fresh)
+
+
+@pytest.mark.parametrize(
+    "search",
+    ["", "?spore-id::data=12", "?slider-{}=[0.1,0.5]&spore-id::data=3"],
+)
+def test_page_layout_matches_fresh_layout(search):
+    check_page_layout(search.format(list(app.COLS)[0]))
+
+
+def test_page_layout_from_token_matches_fresh_layout():
+    ranges = [[0.2, 0.3]] + [[0, 1]] * (len(app.COLS) - 1)
+    check_page_layout(app.update_url(7, ranges))
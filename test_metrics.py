@@ -0,0 +1,49 @@
+import pytest
+from prometheus_client import REGISTRY
+
+import app
+
+
+def calls(name):
+    return REGISTRY.get_sample_value("dash_callback_calls_total", {"callback": name})
+
+
+@pytest.fixture
+def client():
+    return app.server.test_client()
+
+
+@pytest.mark.parametrize(
+    "output",
+    [
+        "no-such-component.children",
+        {"id": "graph", "property": "figure"},
+        ["graph.figure"],
+        None,
+    ],
+)
+def test_unknown_outputs_share_a_label(client, output):
+    before = calls("unknown") or 0
+    client.post(
+        "/_dash-update-component",
+        json={"output": output, "outputs": output, "inputs": [], "changedPropIds": []},
+    )
+    assert calls("unknown") == before + 1
+
+
+def test_known_output(client):
+    output, spec = next(
+        (output, spec)
+        for output, spec in app.app.callback_map.items()
+        if "callback" in spec
+    )
+    name = spec["callback"].__name__
+    before = calls(name) or 0
+    client.post("/_dash-update-component", json={"output": output, "inputs": []})
+    assert calls(name) == before + 1
+
+
+def test_metrics_endpoint(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert b"dash_callback_calls_total" in response.data
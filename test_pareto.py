@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+import pareto
+
+
+def brute_force(values, maximize=None):
+    # Compares every pair of rows
+    values = np.asarray(values, dtype=np.float64)
+    if maximize is not None:
+        values = np.where(maximize, -values, values)
+    valid = np.isfinite(values).all(axis=1)
+    others = values[valid]
+    on_front = np.zeros(len(values), dtype=bool)
+    for i in np.flatnonzero(valid):
+        dominated = (others <= values[i]).all(axis=1) & (others < values[i]).any(axis=1)
+        on_front[i] = not dominated.any()
+    return on_front
+
+
+def random_values(n_rows, n_objectives, seed, decimals=None):
+    values = np.random.default_rng(seed).random((n_rows, n_objectives))
+    if decimals is not None:
+        # Few distinct values, and so many ties and identical rows
+        values = values.round(decimals)
+    return values
+
+
+@pytest.mark.parametrize("n_objectives", [1, 2, 3, 5])
+@pytest.mark.parametrize("seed", range(3))
+def test_matches_brute_force(n_objectives, seed):
+    values = random_values(500, n_objectives, seed)
+    np.testing.assert_array_equal(
+        pareto.pareto_front(values, block_size=64), brute_force(values)
+    )
+
+
+@pytest.mark.parametrize("n_objectives", [2, 3, 4])
+def test_ties(n_objectives):
+    values = random_values(1000, n_objectives, n_objectives, decimals=1)
+    np.testing.assert_array_equal(
+        pareto.pareto_front(values, block_size=32), brute_force(values)
+    )
+
+
+@pytest.mark.parametrize("n_objectives", [2, 4])
+def test_maximize(n_objectives):
+    values = random_values(300, n_objectives, 7)
+    maximize = [j % 2 == 0 for j in range(n_objectives)]
+    np.testing.assert_array_equal(
+        pareto.pareto_front(values, maximize), brute_force(values, maximize)
+    )
+    # Maximising all objectives is minimising their negatives
+    np.testing.assert_array_equal(
+        pareto.pareto_front(values, [True] * n_objectives),
+        pareto.pareto_front(-values),
+    )
+
+
+@pytest.mark.parametrize("n_objectives", [2, 3])
+def test_missing_values(n_objectives):
+    values = random_values(300, n_objectives, 11)
+    rng = np.random.default_rng(12)
+    values[rng.random(values.shape) < 0.1] = np.nan
+    # A row with a missing value would dominate the rest otherwise
+    values[0] = [np.nan] + [-1] * (n_objectives - 1)
+    on_front = pareto.pareto_front(values)
+    np.testing.assert_array_equal(on_front, brute_force(values))
+    assert not on_front[np.isnan(values).any(axis=1)].any()
+
+
+def test_identical_rows_are_all_on_the_front():
+    values = [[1, 2], [2, 1], [1, 2], [2, 2]]
+    assert pareto.pareto_front(values).tolist() == [True, True, True, False]
+
+
+def test_no_rows():
+    assert len(pareto.pareto_front(np.zeros((0, 3)))) == 0
+    assert pareto.pareto_front([[np.nan, 1]]).tolist() == [False]
@@ -0,0 +1,67 @@
+import base64
+
+import numpy as np
+import pytest
+
+import payload
+
+
+def decode(array):
+    return np.frombuffer(base64.b64decode(array["bdata"]), dtype=array["dtype"])
+
+
+@pytest.fixture(autouse=True)
+def typed_arrays(monkeypatch):
+    monkeypatch.setattr(payload, "TYPED_ARRAYS", True)
+
+
+@pytest.mark.parametrize(
+    "values, dtype",
+    [
+        ([0, 1, 255], "u1"),
+        ([-1, 0, 127], "i1"),
+        ([0, 65535], "u2"),
+        ([-32768, 300], "i2"),
+        ([0, 2**32 - 1], "u4"),
+        ([-(2**31), 2**31 - 1], "i4"),
+        ([True, False], "u1"),
+        ([], "u1"),
+    ],
+)
+def test_integers_in_smallest_type(values, dtype):
+    array = payload.array(np.array(values, dtype=np.int64))
+    assert array["dtype"] == dtype
+    np.testing.assert_array_equal(decode(array), values)
+
+
+def test_large_integers_as_floats():
+    values = np.array([0, 2**40], dtype=np.int64)
+    array = payload.array(values)
+    assert array["dtype"] == "f8"
+    np.testing.assert_array_equal(decode(array), values)
+
+
+def test_rounded_floats():
+    values = np.array([0.123456, 1234.56789, -0.5, np.nan])
+    array = payload.array(values, 3)
+    assert array["dtype"] == "f4"
+    np.testing.assert_allclose(decode(array), values.round(3), rtol=1e-7)
+
+
+def test_floats_at_full_precision():
+    values = np.array([0.1, 1 / 3, 1e300])
+    array = payload.array(values)
+    assert array["dtype"] == "f8"
+    np.testing.assert_array_equal(decode(array), values)
+    assert payload.array(values, 8)["dtype"] == "f8"
+
+
+def test_non_contiguous_values():
+    values = np.arange(20, dtype=np.int64)[::3]
+    np.testing.assert_array_equal(decode(payload.array(values)), values)
+
+
+def test_lists_without_typed_arrays(monkeypatch):
+    monkeypatch.setattr(payload, "TYPED_ARRAYS", False)
+    assert payload.array(np.array([1, 2, 3])) == [1, 2, 3]
+    assert payload.array(np.array([0.1234, 0.5]), 2) == [0.12, 0.5]
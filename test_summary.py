@@ -0,0 +1,67 @@
+import shutil
+
+import pandas as pd
+import pytest
+
+import dataset
+import summary
+
+DATA_DIR = "./data"
+N_SPORES = 50
+
+
+def to_html(df_spores, df_units, spore_id):
+    # The table as rendered before, with DataFrame.to_html
+    df_ = pd.concat([df_spores.loc[spore_id, :], df_units], axis=1)
+    df_.columns = ["Indicator", "Unit"]
+    df_ = df_.dropna()
+    return df_.to_html(float_format=lambda x: "{:.2f}".format(x))
+
+
+@pytest.fixture(scope="module")
+def data():
+    return dataset.read_csv(DATA_DIR)
+
+
+@pytest.fixture
+def prerendered_dir(tmp_path):
+    for name in [dataset.DATA_FILE, dataset.UNITS_FILE]:
+        shutil.copy2(f"{DATA_DIR}/{name}", tmp_path / name)
+    summary.prerender(str(tmp_path))
+    return str(tmp_path)
+
+
+def test_tables_match_to_html(data):
+    df_spores, df_units = data
+    tables = summary.SummaryTables(df_spores, df_units)
+    for spore_id in df_spores.index[:N_SPORES]:
+        assert tables.get(spore_id) == to_html(df_spores, df_units, spore_id)
+
+
+def test_prerendered_tables_match_to_html(data, prerendered_dir):
+    df_spores, df_units = data
+    tables = summary.SummaryTables(df_spores, df_units, data_dir=prerendered_dir)
+    assert tables.prerendered is not None
+    for spore_id in df_spores.index[:N_SPORES]:
+        assert tables.get(spore_id) == to_html(df_spores, df_units, spore_id)
+
+
+def test_missing_values_are_left_out(data):
+    df_spores, df_units = data
+    df_spores = df_spores.iloc[:3].copy()
+    df_spores.iloc[1, [0, 2]] = float("nan")
+    tables = summary.SummaryTables(df_spores, df_units)
+    for spore_id in df_spores.index:
+        assert tables.get(spore_id) == to_html(df_spores, df_units, spore_id)
+
+
+def test_outdated_prerendered_tables_are_not_used(data, prerendered_dir):
+    df_spores, df_units = data
+    # Tables for a different set of SPORES
+    with pytest.warns(UserWarning, match="out of date"):
+        tables = summary.SummaryTables(
+            df_spores.iloc[:10], df_units, data_dir=prerendered_dir
+        )
+    assert tables.prerendered is None
+    spore_id = df_spores.index[3]
+    assert tables.get(spore_id) == to_html(df_spores, df_units, spore_id)
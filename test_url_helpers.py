@@ -0,0 +1,134 @@
+import pytest
+
+import url_helpers
+
+STEP = 0.01
+COMPONENT_IDS = {
+    "spore-id": ["data"],
+    "slider-storage": ["value"],
+    "slider-curtailment": ["value"],
+}
+
+
+def test_token_round_trip():
+    values = [3, [0.1, 0.5], [0, 1]]
+    token = url_helpers.encode_state(COMPONENT_IDS, values, STEP)
+    assert url_helpers.decode_state(token, COMPONENT_IDS, STEP) == {
+        "spore-id": {"data": 3},
+        "slider-storage": {"value": [0.1, 0.5]},
+        "slider-curtailment": {"value": [0.0, 1.0]},
+    }
+
+
+def test_token_after_dimensions_changed():
+    token = url_helpers.encode_state(COMPONENT_IDS, [3, [0.1, 0.5], [0.2, 0.3]], STEP)
+    # One dimension removed, one added and the rest reordered
+    component_ids = {
+        "slider-curtailment": ["value"],
+        "slider-biofuel": ["value"],
+        "spore-id": ["data"],
+    }
+    assert url_helpers.decode_state(token, component_ids, STEP) == {
+        "slider-curtailment": {"value": [0.2, 0.3]},
+        "spore-id": {"data": 3},
+    }
+
+
+@pytest.mark.parametrize("token", ["", "!!", "AA", "AgE0", "CQEG"])
+def test_invalid_token(token):
+    assert url_helpers.decode_state(token, COMPONENT_IDS, STEP) == {}
+    with pytest.raises(ValueError):
+        url_helpers.decode_state(token, COMPONENT_IDS, STEP, strict=True)
+
+
+def test_parse_state_strict():
+    url = "http://localhost/?s=!!"
+    assert url_helpers.parse_state(url, COMPONENT_IDS, STEP) == {}
+    with pytest.raises(ValueError):
+        url_helpers.parse_state(url, COMPONENT_IDS, STEP, strict=True)
+
+
+@pytest.mark.parametrize("n", [0, 1, -1, 63, -64, 64, 300, -300, 2**40, -(2**40)])
+def test_varint_round_trip(n):
+    out = bytearray()
+    url_helpers._write_varint(out, n)
+    assert url_helpers._read_varint(bytes(out), 0) == (n, len(out))
+
+
+def test_small_varints_take_one_byte():
+    for n in [0, 1, -1, 63, -64]:
+        out = bytearray()
+        url_helpers._write_varint(out, n)
+        assert len(out) == 1
+
+
+def test_token_is_url_safe():
+    values = [2**20, [-0.5, 1.5], None]
+    token = url_helpers.encode_state(COMPONENT_IDS, values, STEP)
+    assert set(token) <= set(
+        "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+    )
+    assert url_helpers.decode_state(token, COMPONENT_IDS, STEP) == {
+        "spore-id": {"data": 2**20},
+        "slider-storage": {"value": [-0.5, 1.5]},
+        "slider-curtailment": {"value": None},
+    }
+
+
+def test_equivalent_ranges_give_the_same_token():
+    # Ranges are widened outwards to the step
+    tokens = {
+        url_helpers.encode_state(COMPONENT_IDS, [None, range_, [0, 1]], STEP)
+        for range_ in [[0.1, 0.5], [0.1 + 1e-9, 0.5 - 1e-9], [0.3 - 0.2, 0.5]]
+    }
+    assert len(tokens) == 1
+    token = tokens.pop()
+    state = url_helpers.decode_state(token, COMPONENT_IDS, STEP)
+    assert state["slider-storage"] == {"value": [0.1, 0.5]}
+
+
+def test_encode_integer_strings():
+    # As from a query string with one parameter per component property
+    token = url_helpers.encode_state(COMPONENT_IDS, ["12", [0, 1], [0, 1]], STEP)
+    assert url_helpers.decode_state(token, COMPONENT_IDS, STEP)["spore-id"] == {
+        "data": 12
+    }
+
+
+@pytest.mark.parametrize("value", ["a", 1.5, {"a": 1}, [0, 1, 2]])
+def test_encode_leaves_out_other_values(value):
+    token = url_helpers.encode_state(COMPONENT_IDS, [value, [0, 1], [0, 1]], STEP)
+    assert url_helpers.decode_state(token, COMPONENT_IDS, STEP) == {
+        "slider-storage": {"value": [0.0, 1.0]},
+        "slider-curtailment": {"value": [0.0, 1.0]},
+    }
+
+
+def test_parse_state_token():
+    url = "http://localhost/" + url_helpers.update_url_state(
+        COMPONENT_IDS, [3, [0.1, 0.5], [0, 1]], step=STEP
+    )
+    assert url_helpers.parse_state(url, COMPONENT_IDS, STEP) == {
+        "spore-id": {"data": 3},
+        "slider-storage": {"value": [0.1, 0.5]},
+        "slider-curtailment": {"value": [0.0, 1.0]},
+    }
+    # Tokens are ignored without the component ids to decode them
+    assert url_helpers.parse_state(url) == {}
+
+
+def test_parse_state_legacy_url():
+    # One parameter per component property, as written without a step
+    url = "http://localhost/" + url_helpers.update_url_state(
+        COMPONENT_IDS, [3, [0.1, 0.5], [0, 1]]
+    )
+    assert "s=" not in url
+    assert url_helpers.parse_state(url, COMPONENT_IDS, STEP) == {
+        "spore-id": {"data": 3},
+        "slider-storage": {"value": [0.1, 0.5]},
+        "slider-curtailment": {"value": [0, 1]},
+    }
+
+
+def test_parse_state_empty_url():
+    assert url_helpers.parse_state("http://localhost/", COMPONENT_IDS, STEP) == {}
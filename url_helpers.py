@@ -9,9 +9,24 @@
 #
 
 import ast
+import base64
+import functools
+import hashlib
 import re
 from urllib.parse import urlparse, parse_qsl, quote, urlencode
 
+import caching
+
+
+def component_key(id):
+    """
+    Key of the component ``id`` in the URL state: the id itself, or
+    ``"<type>-<index>"`` for a pattern-matching id.
+    """
+    if isinstance(id, dict):
+        return f"{id['type']}-{id['index']}"
+    return id
+
 
 def apply_default_value(params):
     """
@@ -20,8 +35,8 @@ def apply_default_value(params):
 
     def wrapper(func):
         def apply_value(*args, **kwargs):
-            if "id" in kwargs and kwargs["id"] in params:
-                param_key_dict = params[kwargs["id"]]
+            if "id" in kwargs and component_key(kwargs["id"]) in params:
+                param_key_dict = params[component_key(kwargs["id"])]
                 kwargs.update(param_key_dict)
             return func(*args, **kwargs)
 
@@ -33,12 +48,22 @@ def apply_default_value(params):
 ID_PARAM_SEP = "::"
 
 
-def parse_state(url):
+def parse_state(url, component_ids=None, step=None, strict=False):
+    """
+    Decodes the state in a URL written by ``update_url_state``, either as a
+    compact token (which requires the ``step`` it was encoded with) or as
+    one parameter per component property. If ``strict``, an invalid token
+    raises ValueError rather than being ignored.
+    """
     parse_result = urlparse(url)
     query_string = parse_qsl(parse_result.query)
 
     state = {}
     for key, value in query_string:
+        if key == STATE_TOKEN_PARAM:
+            if component_ids is not None:
+                state.update(decode_state(value, component_ids, step, strict))
+            continue
         if ID_PARAM_SEP in key:
             id, param = key.split(ID_PARAM_SEP)
         else:
@@ -60,10 +85,153 @@ def myrepr(o):
     return RE_SINGLE_QUOTED.sub('"', repr(o))
 
 
-def update_url_state(component_ids, values):
-    """Updates URL from component values."""
+def update_url_state(component_ids, values, step=None):
+    """
+    Updates URL from component values. If ``step`` is given, the values are
+    written as a single compact token, with ranges quantized to ``step``.
+    """
+    if step is not None:
+        return f"?{STATE_TOKEN_PARAM}={encode_state(component_ids, values, step)}"
 
     keys = [param_string(id, p) for id, param in component_ids.items() for p in param]
     state = dict(zip(keys, map(myrepr, values)))
     params = urlencode(state, safe="%/:?~#+!$,;'@()*[]\"", quote_via=quote)
     return f"?{params}"
+
+
+# Compact state tokens: a version byte followed by each value as a short
+# hash of its component property, a type tag and zigzag varints, in
+# base64url. Values are matched to component properties by the hash, so
+# that a token stays valid when components are added, removed or reordered.
+# Ranges are stored as multiples of the slider step, widened outwards.
+STATE_TOKEN_PARAM = "s"
+STATE_TOKEN_VERSION = 2
+KEY_HASH_SIZE = 2
+
+TAG_NONE, TAG_INT, TAG_RANGE = 0, 1, 2
+
+
+def _write_varint(out, n):
+    n = (n << 1) ^ (n >> 63)  # zigzag, so small negative numbers stay short
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def _read_varint(data, pos):
+    n = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        n |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return (n >> 1) ^ -(n & 1), pos
+
+
+def _key_hash(id, p):
+    return hashlib.blake2b(
+        param_string(id, p).encode(), digest_size=KEY_HASH_SIZE
+    ).digest()
+
+
+def _state_keys(component_ids):
+    return [(id, p) for id, param in component_ids.items() for p in param]
+
+
+def _as_int(value):
+    # Integers are also accepted as strings, as given in a query string with
+    # one parameter per component property
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            pass
+    return None
+
+
+def encode_state(component_ids, values, step):
+    """
+    Encodes component values as a short token. Equivalent states, i.e.
+    with the same ranges after quantization to ``step``, give the same token.
+    Values other than None, integers and ranges are left out.
+    """
+    out = bytearray([STATE_TOKEN_VERSION])
+    for (id, p), value in zip(_state_keys(component_ids), values):
+        integer = _as_int(value)
+        is_range = isinstance(value, (list, tuple)) and len(value) == 2
+        if value is not None and integer is None and not is_range:
+            continue
+        out += _key_hash(id, p)
+        if value is None:
+            out.append(TAG_NONE)
+        elif integer is not None:
+            out.append(TAG_INT)
+            _write_varint(out, integer)
+        else:
+            out.append(TAG_RANGE)
+            for steps in caching.range_steps(value, step):
+                _write_varint(out, steps)
+    return base64.urlsafe_b64encode(bytes(out)).rstrip(b"=").decode()
+
+
+@functools.lru_cache(maxsize=4096)
+def _decode_values(token, step):
+    # The key hashes and values of the entries
+    data = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    if not data or data[0] != STATE_TOKEN_VERSION:
+        raise ValueError("Unsupported state token version")
+    hashes = []
+    values = []
+    pos = 1
+    while pos < len(data):
+        hashes.append(data[pos : pos + KEY_HASH_SIZE])
+        pos += KEY_HASH_SIZE
+        tag = data[pos]
+        pos += 1
+        if tag == TAG_NONE:
+            values.append(None)
+        elif tag == TAG_INT:
+            value, pos = _read_varint(data, pos)
+            values.append(value)
+        elif tag == TAG_RANGE:
+            low, pos = _read_varint(data, pos)
+            high, pos = _read_varint(data, pos)
+            values.append((round(low * step, 10), round(high * step, 10)))
+        else:
+            raise ValueError(f"Unknown tag {tag} in state token")
+    return tuple(hashes), tuple(values)
+
+
+def decode_state(token, component_ids, step, strict=False):
+    """
+    Decodes a token from ``encode_state`` into the same state structure as
+    ``parse_state``. Values of component properties that are no longer in
+    ``component_ids`` are left out, and invalid tokens decode to an empty
+    state, or raise ValueError if ``strict``.
+    """
+    try:
+        hashes, values = _decode_values(token, step)
+    except (ValueError, IndexError) as e:
+        if strict:
+            raise ValueError(f"Invalid state token {token!r}") from e
+        return {}
+
+    by_hash = {_key_hash(id, p): (id, p) for id, p in _state_keys(component_ids)}
+    state = {}
+    for hash_, value in zip(hashes, values):
+        if hash_ not in by_hash:
+            continue
+        id, p = by_hash[hash_]
+        # Fresh lists, as the decoded values are shared through the cache
+        if isinstance(value, tuple):
+            value = list(value)
+        state.setdefault(id, {})[p] = value
+    return state